@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the backend API.
+
+Seeds a synthetic dataset at the requested scale into a temporary SQLite
+database (with the same models ``seed_data.py`` uses), starts the real app
+in a child process (on a threaded WSGI server, or with ``--server asgi`` on
+uvicorn via ``src/asgi.py``), then drives the lesson, progress and
+submission routes with concurrent clients. Prints (or writes) one JSON
+document with p50/p95/p99 latency and throughput per scenario, tagged with
+the current git commit so runs can be compared across commits.
+
+    python benchmarks/load.py --lessons 2000 --challenges 1000 --users 500 \\
+        --progress-rows 200000 --submissions 200000 --concurrency 16 --output run.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SEED_BATCH = 5000
+
+LESSON_HTML = (
+    '<h2>Section {n}</h2><p>' + 'React renders components from props and state. ' * 40 + '</p>'
+    '<h3>Example</h3><pre><code>function Example() {{ return null; }}</code></pre>'
+)
+TESTS = [
+    {'id': 'test-1', 'description': 'adds numbers', 'input': '"add(1, 2)"', 'expectedOutput': '3'},
+    {'id': 'test-2', 'description': 'adds negatives', 'input': '"add(-1, -2)"', 'expectedOutput': '-3'},
+]
+
+
+def insert_batches(db, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+    db.session.commit()
+
+
+def seed(app, args):
+    from src.migrations import migrate
+    from src.models.user import db
+    from src.models.lesson import Lesson, UserProgress
+    from src.models.blob import encode_json, store_blobs
+    from src.models.challenge import Challenge, ChallengeSubmission
+    from src.services.challenge_stats import rebuild_stats
+    from src.services.progress_summary import refresh_summary
+
+    rng = random.Random(args.seed)
+    migrate(app)
+    now = datetime.utcnow()
+    with app.app_context():
+        insert_batches(db, Lesson, ({
+            'id': f'lesson-{n}',
+            'title': f'Lesson {n}',
+            'description': f'Synthetic lesson number {n}',
+            'content': LESSON_HTML.format(n=n),
+            'duration': rng.randint(5, 40),
+            'difficulty': rng.choice(['beginner', 'intermediate', 'advanced']),
+            'prerequisites': [f'lesson-{n - 1}'] if n else [],
+            'order_index': n,
+            'created_at': now,
+        } for n in range(args.lessons)))
+
+        insert_batches(db, Challenge, ({
+            'id': f'challenge-{n}',
+            'title': f'Challenge {n}',
+            'description': f'Synthetic challenge number {n}',
+            'starter_code': 'function add(a, b) {\n  // Your code here\n}',
+            'solution': 'function add(a, b) {\n  return a + b;\n}',
+            'tests': TESTS,
+            'hints': ['Return the sum'],
+            'difficulty': rng.choice(['easy', 'medium', 'hard']),
+            'tags': ['functions'],
+            'created_at': now,
+        } for n in range(args.challenges)))
+
+        # Each user works through lessons in order, so (user, lesson) stays unique
+        per_user = max(1, min(args.lessons, args.progress_rows // max(args.users, 1)))
+        insert_batches(db, UserProgress, ({
+            'user_id': f'user-{user}',
+            'lesson_id': f'lesson-{lesson}',
+            'completed': lesson < per_user - 1,
+            'progress_percentage': 100 if lesson < per_user - 1 else rng.randint(0, 99),
+            'completed_at': now if lesson < per_user - 1 else None,
+        } for user in range(args.users) for lesson in range(per_user)))
+        for user in range(args.users):
+            refresh_summary(f'user-{user}')
+        db.session.commit()
+
+        results = [{'passed': True, 'description': test['description'], 'durationMs': 0.1} for test in TESTS]
+        results_hash, = store_blobs(db.session.connection(), [encode_json(results)])
+
+        def submissions():
+            for start in range(0, args.submissions, SEED_BATCH):
+                numbers = range(start, min(start + SEED_BATCH, args.submissions))
+                code_hashes = store_blobs(db.session.connection(), [
+                    f'function add(a, b) {{ return a + b; }} // attempt {n}'.encode('utf-8') for n in numbers
+                ])
+                for n, code_hash in zip(numbers, code_hashes):
+                    yield {
+                        'challenge_id': f'challenge-{rng.randrange(args.challenges)}',
+                        'user_id': f'user-{rng.randrange(args.users)}',
+                        'code_hash': code_hash,
+                        'passed': True,
+                        'results_hash': results_hash,
+                        'passed_tests': len(results),
+                        'total_tests': len(results),
+                        'submitted_at': now - timedelta(seconds=n),
+                    }
+
+        insert_batches(db, ChallengeSubmission, submissions())
+        rebuild_stats(db.session.connection())
+        db.session.commit()
+
+
+def serve(port, mode):
+    """Child process: run the app on a threaded WSGI server or under uvicorn"""
+    if mode == 'asgi':
+        import uvicorn
+        from src.asgi import application
+
+        uvicorn.run(application, host='127.0.0.1', port=port, log_level='warning', lifespan='on')
+        return
+
+    from werkzeug.serving import make_server
+    from src.main import app
+
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def server_usage(pid):
+    """Peak resident memory and current thread count of the server (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f)
+    except OSError:
+        return {}
+    return {
+        'peakRssBytes': int(fields['VmHWM'].split()[0]) * 1024,
+        'threads': int(fields['Threads']),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(base, method, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return response.status, response.read()
+
+
+def scenarios(args):
+    rng = random.Random(args.seed + 1)
+    # One user per submission, so the per-user cap of running jobs never applies
+    fresh_users = itertools.count()
+
+    def lessons_catalog(base):
+        request(base, 'GET', '/api/lessons?view=summary&limit=50')
+
+    def lesson_detail(base):
+        request(base, 'GET', f'/api/lessons/lesson-{rng.randrange(args.lessons)}')
+
+    def progress_update(base):
+        request(base, 'POST', '/api/lessons/progress', {
+            'lessonId': f'lesson-{rng.randrange(args.lessons)}',
+            'userId': f'user-{rng.randrange(args.users)}',
+            'progressPercentage': rng.randint(0, 100),
+        })
+
+    def progress_summary(base):
+        request(base, 'GET', f'/api/users/user-{rng.randrange(args.users)}/progress/summary')
+
+    def challenge_analytics(base):
+        request(base, 'GET', f'/api/challenges/challenge-{rng.randrange(args.challenges)}/analytics'
+                             f'?userId=user-{rng.randrange(args.users)}')
+
+    def submit(base):
+        # End to end: enqueue, then poll until the tests have run
+        _, body = request(base, 'POST', f'/api/challenges/challenge-{rng.randrange(args.challenges)}/submit', {
+            'code': f'function add(a, b) {{ return a + b + {rng.randint(0, 3)}; }}',
+            'userId': f'submit-{next(fresh_users)}',
+        })
+        job_id = json.loads(body)['jobId']
+        while True:
+            _, body = request(base, 'GET', f'/api/submission-jobs/{job_id}')
+            if json.loads(body)['status'] in ('completed', 'failed'):
+                return
+            time.sleep(0.01)
+
+    def submit_stream(base):
+        # End to end as the frontend does it: enqueue, then follow the event stream
+        _, body = request(base, 'POST', f'/api/challenges/challenge-{rng.randrange(args.challenges)}/submit', {
+            'code': f'function add(a, b) {{ return a + b + {rng.randint(0, 3)}; }}',
+            'userId': f'stream-{next(fresh_users)}',
+        })
+        stream_url = json.loads(body)['streamUrl']
+        with urllib.request.urlopen(base + stream_url, timeout=120) as response:
+            for line in response:
+                if line.startswith(b'event: done'):
+                    return
+        raise ValueError('event stream ended before the done event')
+
+    def flood(base):
+        # One abusive client resubmitting as fast as it can; rejections are expected
+        try:
+            request(base, 'POST', '/api/challenges/challenge-0/submit', {
+                'code': f'while (true) {{}} // {rng.random()}',
+                'userId': 'flooder',
+            })
+        except urllib.error.HTTPError:
+            pass
+
+    return {
+        'lessons_catalog': lessons_catalog,
+        'lesson_detail': lesson_detail,
+        'progress_update': progress_update,
+        'progress_summary': progress_summary,
+        'challenge_analytics': challenge_analytics,
+        'challenge_submit': submit,
+        'challenge_submit_stream': submit_stream,
+        # Lesson reads measured while flooders hammer the submit route
+        'lesson_detail_under_flood': (lesson_detail, flood),
+        # Lesson reads measured while background clients follow streamed submissions
+        'lesson_detail_under_submissions': (lesson_detail, submit_stream),
+    }
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+
+def drive(base, action, total, concurrency):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    remaining = iter(range(total))
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            try:
+                action(base)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': len(errors),
+        'throughputPerSecond': round(len(latencies) / wall, 1) if wall else None,
+        'p50Ms': percentile(latencies, 0.50),
+        'p95Ms': percentile(latencies, 0.95),
+        'p99Ms': percentile(latencies, 0.99),
+    }
+
+
+def repeat_until(stop, action, base, errors):
+    while not stop.is_set():
+        try:
+            action(base)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            errors.append(str(e))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lessons', type=int, default=1000)
+    parser.add_argument('--challenges', type=int, default=500)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--progress-rows', type=int, default=100000)
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--scenarios', help='comma-separated subset of scenarios to run')
+    parser.add_argument('--background-clients', type=int, default=2,
+                        help='clients running the background action of the *_under_* scenarios')
+    parser.add_argument('--rate-limits', action='store_true',
+                        help='keep submission rate limits on (all clients share one IP)')
+    parser.add_argument('--server', choices=('threaded', 'asgi'), default='threaded')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here as well')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.server)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                   RATE_LIMIT_ENABLED='1' if args.rate_limits else '0')
+        os.environ.update(env)
+        from src.main import create_app
+
+        seed_started = time.perf_counter()
+        seed(create_app(), args)
+        seed_seconds = time.perf_counter() - seed_started
+
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port),
+                                   '--server', args.server],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base = f'http://127.0.0.1:{port}'
+        try:
+            for _ in range(100):
+                try:
+                    request(base, 'GET', '/metrics')
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+            selected = scenarios(args)
+            if args.scenarios:
+                selected = {name: selected[name] for name in args.scenarios.split(',')}
+            results = {}
+            for name, action in selected.items():
+                if isinstance(action, tuple):
+                    action, background = action
+                    stop = threading.Event()
+                    background_errors = []
+                    flooders = [
+                        threading.Thread(target=repeat_until, args=(stop, background, base, background_errors))
+                        for _ in range(args.background_clients)
+                    ]
+                    for thread in flooders:
+                        thread.start()
+                    try:
+                        results[name] = drive(base, action, args.requests, args.concurrency)
+                    finally:
+                        stop.set()
+                        for thread in flooders:
+                            thread.join()
+                    results[name]['backgroundErrors'] = len(background_errors)
+                else:
+                    results[name] = drive(base, action, args.requests, args.concurrency)
+            usage = server_usage(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'benchmark': 'load',
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'dataset': {
+            'lessons': args.lessons,
+            'challenges': args.challenges,
+            'users': args.users,
+            'progressRows': args.progress_rows,
+            'submissions': args.submissions,
+            'seedSeconds': round(seed_seconds, 2),
+        },
+        'concurrency': args.concurrency,
+        'server': dict(usage, mode=args.server),
+        'rateLimits': args.rate_limits,
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
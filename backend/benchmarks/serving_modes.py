@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Concurrent-submission benchmark: threaded WSGI server vs the ASGI mode.
+
+Runs ``load.py`` once per serving mode on the same synthetic dataset. Each
+of ``--in-flight`` clients submits code and follows the submission's event
+stream to the end, so that many submissions are always queued or running;
+the report gives completed submissions per second and end-to-end latency,
+plus lesson read latency while the same number of background clients keep
+submitting, and the server's peak memory and thread count, for each mode.
+
+    python benchmarks/serving_modes.py --in-flight 200 --output serving.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+LOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load.py')
+MODES = ('threaded', 'asgi')
+
+
+def run_mode(mode, args, workdir):
+    output = os.path.join(workdir, f'{mode}.json')
+    env = dict(
+        os.environ,
+        NODE_POOL_SIZE=str(args.node_workers),
+        # Let every client's submission be accepted, so both modes hold the same backlog
+        SUBMISSION_QUEUE_MAX_PENDING=str(2 * args.in_flight),
+    )
+    subprocess.run([
+        sys.executable, LOAD,
+        '--server', mode,
+        '--scenarios', 'challenge_submit_stream,lesson_detail,lesson_detail_under_submissions',
+        '--concurrency', str(args.in_flight),
+        '--background-clients', str(args.in_flight),
+        '--requests', str(args.submissions),
+        '--lessons', str(args.lessons),
+        '--challenges', str(args.challenges),
+        '--users', '100',
+        '--progress-rows', '10000',
+        '--submissions', '10000',
+        '--seed', str(args.seed),
+        '--output', output,
+    ], env=env, check=True, stdout=subprocess.DEVNULL)
+    with open(output) as f:
+        report = json.load(f)
+    scenarios = report['scenarios']
+    return {
+        'commit': report['commit'],
+        'server': report['server'],
+        'submissions': scenarios['challenge_submit_stream'],
+        'lessonDetail': scenarios['lesson_detail'],
+        'lessonDetailUnderSubmissions': scenarios['lesson_detail_under_submissions'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--in-flight', type=int, default=200, help='concurrent submitting clients')
+    parser.add_argument('--submissions', type=int, default=1000, help='submissions (and lesson reads) per scenario')
+    parser.add_argument('--node-workers', type=int, default=4)
+    parser.add_argument('--lessons', type=int, default=500)
+    parser.add_argument('--challenges', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here as well')
+    args = parser.parse_args()
+
+    report = {'benchmark': 'serving_modes', 'inFlight': args.in_flight, 'nodeWorkers': args.node_workers}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in MODES:
+            report[mode] = run_mode(mode, args, workdir)
+    report['submissionThroughputRatio'] = round(
+        report['asgi']['submissions']['throughputPerSecond'] / report['threaded']['submissions']['throughputPerSecond'], 2
+    )
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Load test: read throughput while submissions are being written.
+
+For each SQLite profile, copies the bundled database to a temp file, then
+runs reader threads against the submission-history and progress-summary
+routes while writer threads insert ``ChallengeSubmission`` rows as fast as
+they can. Prints one JSON document with per-profile throughput, latency
+percentiles and lock errors.
+
+    python benchmarks/sqlite_concurrency.py --duration 5 --readers 8 --writers 2
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(BACKEND_DIR, 'src', 'database', 'app.db')
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_profile(args):
+    """Runs inside a child process whose environment selects the profile"""
+    sys.path.insert(0, BACKEND_DIR)
+    from src.main import app, db
+    from src.migrations import migrate
+    from src.models.challenge import ChallengeSubmission
+
+    migrate(app)
+
+    stop = threading.Event()
+    read_latencies, write_latencies = [], []
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def reader(index):
+        client = app.test_client()
+        paths = [
+            f'/api/challenges/props-basic/submissions?userId=reader-{index}',
+            f'/api/users/reader-{index}/progress/summary',
+        ]
+        count = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.get(paths[count % len(paths)])
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 200:
+                    read_latencies.append(elapsed)
+                else:
+                    errors['read'] += 1
+            count += 1
+
+    def writer(index):
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.session.add(ChallengeSubmission(
+                        challenge_id='props-basic',
+                        user_id=f'writer-{index}',
+                        code='function UserCard(props) { return null; }',
+                        passed=False,
+                        test_results=[{'passed': False, 'description': 'load test'}]
+                    ))
+                    db.session.commit()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        write_latencies.append(elapsed)
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        errors['write'] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    print(json.dumps({
+        'reads': len(read_latencies),
+        'readsPerSecond': round(len(read_latencies) / args.duration, 1),
+        'readP50Ms': ms(percentile(read_latencies, 0.50)),
+        'readP95Ms': ms(percentile(read_latencies, 0.95)),
+        'readP99Ms': ms(percentile(read_latencies, 0.99)),
+        'writes': len(write_latencies),
+        'writesPerSecond': round(len(write_latencies) / args.duration, 1),
+        'writeP95Ms': ms(percentile(write_latencies, 0.95)),
+        'errors': errors,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--profiles', default='default,tuned')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_profile(args)
+        return
+
+    results = {}
+    for profile in args.profiles.split(','):
+        with tempfile.TemporaryDirectory() as workdir:
+            database = os.path.join(workdir, 'bench.db')
+            shutil.copy(SOURCE_DB, database)
+            env = dict(os.environ, SQLITE_PROFILE=profile, DATABASE_URL=f'sqlite:///{database}')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child',
+                 '--duration', str(args.duration),
+                 '--readers', str(args.readers),
+                 '--writers', str(args.writers)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            results[profile] = json.loads(output.strip().splitlines()[-1])
+
+    print(json.dumps({
+        'benchmark': 'sqlite_concurrency',
+        'durationSeconds': args.duration,
+        'readers': args.readers,
+        'writers': args.writers,
+        'profiles': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time to import the app and to serve the first request.
+
+Each sample runs in a fresh interpreter, as a new worker would, against a
+temporary database that ``seed_data.py`` migrates and seeds first. Prints
+median/max timings as JSON; with ``--baseline`` it also compares against a
+stored result and exits non-zero when either median regressed by more than
+``--tolerance``.
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --baseline benchmarks/startup_baseline.json
+    python benchmarks/startup.py --write-baseline benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from src.main import app
+imported = time.perf_counter()
+response = app.test_client().get('/api/lessons?view=summary')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{'importMs': (imported - started) * 1000, 'firstRequestMs': (served - imported) * 1000}}))
+'''
+
+
+def prepare_database(workdir):
+    """Environment for the samples, with DATABASE_URL at a migrated, seeded copy in ``workdir``"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+    subprocess.run([sys.executable, os.path.join(BACKEND_DIR, 'src', 'seed_data.py')],
+                   env=env, capture_output=True, check=True)
+    return env
+
+
+def sample(env):
+    output = subprocess.run(
+        [sys.executable, '-c', SAMPLE.format(backend=BACKEND_DIR)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--baseline', help='compare against this result file')
+    parser.add_argument('--write-baseline', help='store the result in this file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative regression of a median (default 0.25)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = prepare_database(workdir)
+        samples = [sample(env) for _ in range(args.runs)]
+    result = {'benchmark': 'startup', 'runs': args.runs}
+    for metric in ('importMs', 'firstRequestMs'):
+        values = [s[metric] for s in samples]
+        result[metric] = {
+            'median': round(statistics.median(values), 2),
+            'max': round(max(values), 2),
+        }
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        result['regressions'] = {}
+        for metric in ('importMs', 'firstRequestMs'):
+            limit = baseline[metric]['median'] * (1 + args.tolerance)
+            regressed = result[metric]['median'] > limit
+            result['regressions'][metric] = regressed
+            failed = failed or regressed
+
+    print(json.dumps(result, indent=2))
+    if args.write_baseline:
+        with open(args.write_baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Storage benchmark for submission bodies: verbatim rows vs the blob store.
+
+Generates one synthetic submission history and writes it twice: once in the
+old layout (``code`` and ``test_results`` text on every row) and once with
+the schema ``db-upgrade`` produces (hashes into the deduplicated, compressed
+``submission_blob`` table). Reports database size after VACUUM, the
+latency of the per-user history query including decoding, and the time of
+a full scan over the submission table, for each.
+
+    python benchmarks/submission_storage.py --submissions 200000 --output storage.json
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BATCH = 5000
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE challenge_submission (
+        id INTEGER NOT NULL PRIMARY KEY,
+        challenge_id VARCHAR(50) NOT NULL,
+        user_id VARCHAR(50) NOT NULL,
+        code TEXT NOT NULL,
+        passed BOOLEAN NOT NULL,
+        test_results TEXT NOT NULL,
+        submitted_at DATETIME
+    );
+    CREATE INDEX ix_challenge_submission_challenge_user_submitted
+        ON challenge_submission (challenge_id, user_id, submitted_at);
+'''
+
+LEGACY_HISTORY = '''
+    SELECT id, challenge_id, user_id, code, passed, test_results, submitted_at
+    FROM challenge_submission WHERE challenge_id = ? AND user_id = ?
+    ORDER BY submitted_at DESC
+'''
+BLOB_HISTORY = '''
+    SELECT s.id, s.challenge_id, s.user_id, code.encoding, code.data, s.passed,
+           results.encoding, results.data, s.submitted_at
+    FROM challenge_submission s
+    JOIN submission_blob code ON code.hash = s.code_hash
+    JOIN submission_blob results ON results.hash = s.results_hash
+    WHERE s.challenge_id = ? AND s.user_id = ?
+    ORDER BY s.submitted_at DESC
+'''
+# Touches every submission row; its cost follows the row size
+SCAN = 'SELECT challenge_id, COUNT(*), SUM(passed) FROM challenge_submission NOT INDEXED GROUP BY challenge_id'
+
+CODE_TEMPLATE = '''function {name}(props) {{
+  const [state, setState] = React.useState({initial});
+  // attempt {variant}
+  React.useEffect(() => {{
+    if (props.items && props.items.length > {threshold}) {{
+      setState(props.items.map(item => item.value * {factor}).reduce((a, b) => a + b, 0));
+    }}
+  }}, [props.items]);
+  return React.createElement('div', {{ className: 'result' }}, String(state));
+}}
+'''
+
+
+def generate(args):
+    """Yield synthetic submissions; most are resubmissions of a few variants per challenge"""
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    for n in range(args.submissions):
+        challenge = rng.randrange(args.challenges)
+        if rng.random() < args.unique_fraction:
+            variant = f'unique-{n}'
+        else:
+            variant = rng.randrange(args.variants)
+        code = CODE_TEMPLATE.format(
+            name=f'Solution{challenge}', initial=challenge % 7, variant=variant,
+            threshold=challenge % 5, factor=challenge % 3 + 1
+        ) * args.code_repeat
+        passed = rng.random() < 0.4
+        results = [{
+            'passed': passed or index % 2 == 0,
+            'description': f'renders the expected output for case {index}',
+            'durationMs': round(rng.uniform(0.05, 3.0), 3) if args.timings else 0.0,
+            'message': None if passed else 'Expected 6 but received 5',
+        } for index in range(args.tests)]
+        yield {
+            'challenge_id': f'challenge-{challenge}',
+            'user_id': f'user-{rng.randrange(args.users)}',
+            'code': code,
+            'passed': passed,
+            'test_results': json.dumps(results, separators=(',', ':')),
+            'submitted_at': (now - timedelta(seconds=n)).isoformat(sep=' '),
+        }
+
+
+def batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_legacy(path, args):
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    for batch in batches(generate(args)):
+        connection.executemany(
+            'INSERT INTO challenge_submission (challenge_id, user_id, code, passed, test_results, submitted_at) '
+            'VALUES (:challenge_id, :user_id, :code, :passed, :test_results, :submitted_at)', batch
+        )
+    connection.commit()
+    connection.execute('VACUUM')
+    connection.close()
+
+
+def build_blobs(path, args):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from src.main import create_app
+    from src.migrations import migrate
+    from src.models.blob import store_blobs
+    from src.models.challenge import ChallengeSubmission
+    from src.models.user import db
+
+    app = create_app({'SQLITE_PROFILE': 'default'})
+    migrate(app)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('PRAGMA foreign_keys = OFF')
+            for batch in batches(generate(args)):
+                code_hashes = store_blobs(connection, [row['code'].encode('utf-8') for row in batch])
+                results_hashes = store_blobs(connection, [row['test_results'].encode('utf-8') for row in batch])
+                connection.execute(db.insert(ChallengeSubmission), [{
+                    'challenge_id': row['challenge_id'],
+                    'user_id': row['user_id'],
+                    'code_hash': code_hash,
+                    'passed': row['passed'],
+                    'results_hash': results_hash,
+                    'submitted_at': datetime.fromisoformat(row['submitted_at']),
+                } for row, code_hash, results_hash in zip(batch, code_hashes, results_hashes)])
+        db.engine.dispose()
+    connection = sqlite3.connect(path)
+    connection.execute('VACUUM')
+    connection.close()
+
+
+def time_history(path, args, query, decode):
+    rng = random.Random(args.seed + 1)
+    connection = sqlite3.connect(path)
+    timings = []
+    for _ in range(args.queries):
+        params = (f'challenge-{rng.randrange(args.challenges)}', f'user-{rng.randrange(args.users)}')
+        started = time.perf_counter()
+        decode(connection.execute(query, params).fetchall())
+        timings.append(time.perf_counter() - started)
+    connection.close()
+    timings.sort()
+    return {
+        'p50Ms': round(statistics.median(timings) * 1000, 3),
+        'p95Ms': round(timings[int(0.95 * (len(timings) - 1))] * 1000, 3),
+    }
+
+
+def time_scan(path, runs=5):
+    connection = sqlite3.connect(path)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        connection.execute(SCAN).fetchall()
+        timings.append(time.perf_counter() - started)
+    connection.close()
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def decode_legacy(rows):
+    return [(row[3], row[5]) for row in rows]
+
+
+def decode_blobs(rows):
+    from src.models.blob import decode_payload
+
+    return [(decode_payload(row[3], row[4]).decode('utf-8'), decode_payload(row[6], row[7]).decode('utf-8'))
+            for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--challenges', type=int, default=100)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--variants', type=int, default=20, help='distinct solutions per challenge')
+    parser.add_argument('--unique-fraction', type=float, default=0.2,
+                        help='share of submissions whose code appears only once')
+    parser.add_argument('--code-repeat', type=int, default=2, help='scales the size of each solution')
+    parser.add_argument('--tests', type=int, default=5, help='test results per submission')
+    parser.add_argument('--no-timings', dest='timings', action='store_false',
+                        help='store zero durations so identical runs give identical results')
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here as well')
+    args = parser.parse_args()
+
+    report = {'benchmark': 'submission_storage', 'submissions': args.submissions}
+    with tempfile.TemporaryDirectory() as workdir:
+        legacy_path = os.path.join(workdir, 'legacy.db')
+        blob_path = os.path.join(workdir, 'blobs.db')
+        build_legacy(legacy_path, args)
+        build_blobs(blob_path, args)
+
+        legacy_bytes = os.path.getsize(legacy_path)
+        blob_bytes = os.path.getsize(blob_path)
+        connection = sqlite3.connect(blob_path)
+        blobs = connection.execute('SELECT COUNT(*) FROM submission_blob').fetchone()[0]
+        connection.close()
+
+        report['verbatim'] = {'databaseBytes': legacy_bytes,
+                              'history': time_history(legacy_path, args, LEGACY_HISTORY, decode_legacy),
+                              'fullScanMs': time_scan(legacy_path)}
+        report['blobs'] = {'databaseBytes': blob_bytes, 'distinctBlobs': blobs,
+                           'history': time_history(blob_path, args, BLOB_HISTORY, decode_blobs),
+                           'fullScanMs': time_scan(blob_path)}
+        report['storageReduction'] = round(1 - blob_bytes / legacy_bytes, 3)
+        report['historySpeedup'] = round(
+            report['verbatim']['history']['p50Ms'] / report['blobs']['history']['p50Ms'], 2
+        )
+        report['fullScanSpeedup'] = round(report['verbatim']['fullScanMs'] / report['blobs']['fullScanMs'], 2)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+ASGI serving mode: the same Flask app, served from an asyncio event loop.
+
+    uvicorn src.asgi:application --host 0.0.0.0 --port 5000
+    python src/asgi.py
+
+Every blueprint runs unchanged on a bounded pool of ``ASGI_THREADS``
+threads. Submissions are queued by the same submit route but execute as
+coroutines (``AsyncSubmissionQueue`` on the asyncio Node pool), and the
+Server-Sent Event streams of their progress are served directly on the
+loop. A client following an in-flight submission therefore holds no
+thread, so hundreds of them leave the pool free for lesson reads. Those
+streams are not part of the per-route request metrics.
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from a2wsgi import WSGIMiddleware
+
+from src.main import app
+from src.routes.challenges import run_submission_job_async
+from src.services.async_node_pool import shutdown_async_pool
+from src.services.submission_queue import (
+    KEEP_ALIVE_SECONDS, AsyncSubmissionQueue, install_submission_queue, sse_message
+)
+
+_job_events_path = re.compile(r'^/api/submission-jobs/(?P<job_id>[^/]+)/events$')
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def _cors_headers(scope):
+    # What CORS(app) adds to every Flask response: any origin is allowed
+    origin = dict(scope['headers']).get(b'origin')
+    if origin is None:
+        return [(b'access-control-allow-origin', b'*')]
+    return [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+
+
+class AsyncServer:
+    """ASGI application wrapping a Flask app"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_THREADS', 32))
+        self.submissions = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and scope['method'] == 'GET' and self.submissions is not None:
+            match = _job_events_path.match(scope['path'])
+            job = self.submissions.get(match.group('job_id')) if match else None
+            if job is not None:
+                await self._stream_job(job, scope, send)
+                return
+        # Everything else, including unknown jobs' 404s, is answered by Flask
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                config = self.flask_app.config
+                self.submissions = AsyncSubmissionQueue(
+                    self.flask_app,
+                    run_submission_job_async,
+                    workers=config.get('SUBMISSION_QUEUE_WORKERS', 4),
+                    max_pending=config.get('SUBMISSION_QUEUE_MAX_PENDING', 100),
+                    job_ttl=config.get('SUBMISSION_JOB_TTL', 600),
+                    max_per_user=config.get('SUBMISSION_MAX_PER_USER', 2)
+                )
+                install_submission_queue(self.submissions)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.submissions.close()
+                await shutdown_async_pool()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _stream_job(self, job, scope, send):
+        """Same stream as the Flask route ``stream_submission_job``"""
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS + _cors_headers(scope)})
+        cursor = 0
+        while True:
+            events = await job.wait_for_events_async(cursor, KEEP_ALIVE_SECONDS)
+            if not events:
+                # Comment line keeps idle proxies from closing the stream
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            cursor += len(events)
+            done = events[-1][0] == 'done'
+            body = ''.join(sse_message(event, payload) for event, payload in events)
+            await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': not done})
+            if done:
+                return
+
+
+application = AsyncServer(app)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
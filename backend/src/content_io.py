@@ -0,0 +1,205 @@
+"""
+Streaming NDJSON import/export of lessons and challenges.
+
+A content pack is one JSON object per line, shaped like the objects the
+create routes accept plus a ``type`` of ``"lesson"`` or ``"challenge"``.
+Imports read lines incrementally, validate each item (including the
+prerequisite graph, so no line can close a cycle) and upsert them with
+``executemany`` in batched transactions, so memory stays constant whatever
+the pack size, apart from the lessons' prerequisite lists. Re-imported
+items keep the ``createdAt`` already stored. Exports stream rows from the
+cursor and copy JSON columns through without decoding them.
+"""
+from datetime import datetime
+import json
+
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.challenge import db, Challenge
+from src.models.lesson import Lesson
+from src.models.serialization import RawJSON, dumps, raw_json
+from src.services.response_cache import bump_content_version
+from src.services.result_cache import invalidate_challenges
+from src.services.lesson_graph import PrerequisiteCycle, cycle_through, prerequisite_edges
+from src.services.lesson_sections import sync_sections
+from src.services.search_index import index_items
+
+MODELS = {'lesson': Lesson, 'challenge': Challenge}
+REQUIRED_FIELDS = {
+    'lesson': ('id', 'title', 'description', 'content', 'duration', 'difficulty', 'orderIndex'),
+    'challenge': ('id', 'title', 'description', 'starterCode', 'solution', 'tests', 'hints',
+                  'difficulty', 'tags'),
+}
+STRING_FIELDS = {
+    'lesson': ('title', 'description', 'content', 'difficulty'),
+    'challenge': ('title', 'description', 'starterCode', 'solution', 'difficulty'),
+}
+INTEGER_FIELDS = ('duration', 'orderIndex')
+LIST_ITEMS = {  # JSON list field -> (entry type, description)
+    'prerequisites': (str, 'strings'),
+    'hints': (str, 'strings'),
+    'tags': (str, 'strings'),
+    'tests': (dict, 'objects'),
+}
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_ROWS = 500
+
+
+def parse_item(line):
+    """Validate one NDJSON line, returning (type, column values) or raising ValueError"""
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f'Invalid JSON: {e}')
+    if not isinstance(item, dict):
+        raise ValueError('Each line must be a JSON object')
+
+    item_type = item.get('type')
+    if item_type not in MODELS:
+        raise ValueError('type must be "lesson" or "challenge"')
+    model = MODELS[item_type]
+
+    missing = [field for field in REQUIRED_FIELDS[item_type] if field not in item]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    if not isinstance(item['id'], str) or not item['id']:
+        raise ValueError('id must be a non-empty string')
+    for field in STRING_FIELDS[item_type]:
+        if not isinstance(item[field], str):
+            raise ValueError(f'{field} must be a string')
+    for field in INTEGER_FIELDS:
+        if field in item and (not isinstance(item[field], int) or isinstance(item[field], bool)):
+            raise ValueError(f'{field} must be an integer')
+    for field in model.JSON_FIELDS:
+        entry_type, entries = LIST_ITEMS[field]
+        if field in item and not (
+            isinstance(item[field], list) and all(isinstance(entry, entry_type) for entry in item[field])
+        ):
+            raise ValueError(f'{field} must be a list of {entries}')
+
+    values = {}
+    for field, column in model.API_FIELDS.items():
+        if field in item:
+            values[column] = item[field]
+    if item_type == 'lesson':
+        values.setdefault('prerequisites', [])
+    if 'created_at' in values:
+        try:
+            values['created_at'] = datetime.fromisoformat(values['created_at'])
+        except (TypeError, ValueError):
+            raise ValueError('createdAt must be an ISO 8601 timestamp')
+    else:
+        values['created_at'] = datetime.utcnow()
+    return item_type, values
+
+
+def _upsert(model, rows):
+    table = model.__table__
+    statement = insert(table)
+    columns = [column.name for column in table.columns if column.name not in ('id', 'created_at')]
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={name: statement.excluded[name] for name in columns}
+        ),
+        rows
+    )
+
+
+def _flush(batches):
+    for item_type, rows in batches.items():
+        if rows:
+            _upsert(MODELS[item_type], rows)
+            # Core upserts skip the mapper events that maintain the search index
+            index_items(db.session.connection(), item_type, rows)
+    for row in batches['lesson']:
+        sync_sections(db.session.connection(), row['id'], row['content'])
+    challenge_ids = [row['id'] for row in batches['challenge']]
+    if challenge_ids:
+        invalidate_challenges(db.session, challenge_ids)
+    written = [item_type for item_type, rows in batches.items() if rows]
+    if written:
+        # Core upserts bypass the ORM event that normally bumps the versions
+        bump_content_version(db.session, written)
+    db.session.commit()
+    for rows in batches.values():
+        rows.clear()
+
+
+def import_ndjson(lines, dry_run=False, batch_size=500):
+    """
+    Import an iterable of NDJSON lines (str or bytes). Invalid lines are
+    skipped and reported; with ``dry_run`` nothing is written.
+    """
+    batches = {'lesson': [], 'challenge': []}
+    counts = {'lesson': 0, 'challenge': 0}
+    errors = []
+    error_count = 0
+    pending = 0
+    # Prerequisites of every lesson, stored or imported so far
+    graph = prerequisite_edges()
+
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            item_type, values = parse_item(line)
+            if item_type == 'lesson':
+                cycle = cycle_through(graph, values['id'], values['prerequisites'])
+                if cycle:
+                    raise PrerequisiteCycle(cycle)
+                graph[values['id']] = values['prerequisites']
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': number, 'error': str(e)})
+            continue
+
+        counts[item_type] += 1
+        if dry_run:
+            continue
+        batches[item_type].append(values)
+        pending += 1
+        if pending >= batch_size:
+            _flush(batches)
+            pending = 0
+
+    if pending:
+        _flush(batches)
+
+    return {
+        'dryRun': dry_run,
+        'lessons': counts['lesson'],
+        'challenges': counts['challenge'],
+        'errorCount': error_count,
+        'errors': errors,
+    }
+
+
+def _export_rows(item_type):
+    model = MODELS[item_type]
+    columns = [
+        raw_json(getattr(model, column), field) if field in model.JSON_FIELDS
+        else getattr(model, column).label(field)
+        for field, column in model.API_FIELDS.items()
+    ]
+    result = db.session.execute(
+        db.select(*columns).order_by(model.id).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+    for row in result:
+        item = {'type': item_type}
+        for field, value in row._mapping.items():
+            if field in model.JSON_FIELDS:
+                value = RawJSON(value or '[]')
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            item[field] = value
+        yield dumps(item) + '\n'
+
+
+def export_ndjson(types=('lesson', 'challenge')):
+    """Yield NDJSON lines for every item of the given types"""
+    for item_type in types:
+        yield from _export_rows(item_type)
@@ -0,0 +1,188 @@
+"""
+Per-request timing and SQL instrumentation.
+
+Every request records wall time, the number and total time of SQL
+statements (via SQLAlchemy cursor events) and response size. Each response
+carries a ``Server-Timing`` header, and all measurements are aggregated
+into histograms per route served at ``/metrics`` in Prometheus text format.
+Slow statements and statements repeated many times within one request
+(likely N+1 queries) are logged with the offending route.
+"""
+from collections import Counter
+import logging
+import re
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_settings = {'slow_query_ms': 100, 'n_plus_one_threshold': 5}
+_collectors = []
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _labels(self, label_values, extra=None):
+        pairs = list(zip(self.label_names, label_values)) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = self._labels(label_values, ('le', f'{bound:g}'))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                lines.append(f'{self.name}_bucket{self._labels(label_values, ("le", "+Inf"))} {count}')
+                lines.append(f'{self.name}_sum{self._labels(label_values)} {total:g}')
+                lines.append(f'{self.name}_count{self._labels(label_values)} {count}')
+        return lines
+
+
+ROUTE_LABELS = ('method', 'route', 'status')
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Wall time spent handling a request.', DURATION_BUCKETS, ROUTE_LABELS)
+request_sql_statements = Histogram(
+    'http_request_sql_statements', 'SQL statements executed per request.', COUNT_BUCKETS, ROUTE_LABELS)
+request_sql_duration = Histogram(
+    'http_request_sql_duration_seconds', 'Total SQL time per request.', DURATION_BUCKETS, ROUTE_LABELS)
+response_size = Histogram(
+    'http_response_size_bytes', 'Response body size.', SIZE_BUCKETS, ROUTE_LABELS)
+node_execution = Histogram(
+    'node_execution_seconds', 'Time spent running a submission\'s tests in Node.', DURATION_BUCKETS)
+
+HISTOGRAMS = (request_duration, request_sql_statements, request_sql_duration, response_size, node_execution)
+
+
+def record_node_time(seconds):
+    """Record Node execution time, attributing it to the current request if any"""
+    node_execution.observe(seconds)
+    if has_request_context() and hasattr(g, 'metrics_node_time'):
+        g.metrics_node_time += seconds
+
+
+# Start times live on the statement's execution context rather than on a
+# per-connection stack, which a failed statement (no after_cursor_execute)
+# would leave unbalanced
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_query_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if not has_request_context() or not hasattr(g, 'metrics_sql_count'):
+        return
+    g.metrics_sql_count += 1
+    g.metrics_sql_time += elapsed
+    g.metrics_statements[_literals.sub('?', statement)] += 1
+    if elapsed * 1000 >= g.metrics_slow_query_ms:
+        logger.warning('Slow query (%.1f ms) in %s %s: %s',
+                       elapsed * 1000, request.method, _route(), statement)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql_count = 0
+    g.metrics_sql_time = 0.0
+    g.metrics_node_time = 0.0
+    g.metrics_statements = Counter()
+    g.metrics_slow_query_ms = _settings['slow_query_ms']
+
+
+def _after_request(response):
+    if not hasattr(g, 'metrics_started'):
+        return response
+    elapsed = time.perf_counter() - g.metrics_started
+    labels = (request.method, _route(), str(response.status_code))
+
+    request_duration.observe(elapsed, *labels)
+    request_sql_statements.observe(g.metrics_sql_count, *labels)
+    request_sql_duration.observe(g.metrics_sql_time, *labels)
+    # Streamed responses (e.g. Server-Sent Events) have no size up front
+    if not response.is_streamed:
+        response_size.observe(response.calculate_content_length() or 0, *labels)
+
+    timings = [
+        f'app;dur={elapsed * 1000:.2f}',
+        f'db;dur={g.metrics_sql_time * 1000:.2f};desc="{g.metrics_sql_count} queries"',
+    ]
+    if g.metrics_node_time:
+        timings.append(f'node;dur={g.metrics_node_time * 1000:.2f}')
+    response.headers.add('Server-Timing', ', '.join(timings))
+
+    repeated = [(statement, count) for statement, count in g.metrics_statements.items()
+                if count >= _settings['n_plus_one_threshold']]
+    for statement, count in repeated:
+        logger.warning('Possible N+1 in %s %s: statement ran %d times: %s',
+                       request.method, _route(), count, statement)
+    return response
+
+
+def register_collector(collector):
+    """Add a callable returning extra Prometheus exposition lines"""
+    _collectors.append(collector)
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+def init_instrumentation(app):
+    _settings['slow_query_ms'] = app.config.get('SLOW_QUERY_MS', 100)
+    _settings['n_plus_one_threshold'] = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
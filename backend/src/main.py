@@ -1,50 +1,147 @@
+import json
 import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from src.models.user import db
-from src.models.challenge import Challenge, ChallengeSubmission
-from src.models.lesson import Lesson, UserProgress
+from src.models.challenge import (
+    Challenge, ChallengeStats, ChallengeSubmission, ChallengeTestStats, SubmissionResultCache, UserChallengeStats
+)
+from src.models.content import ContentVersion
+from src.models.lesson import Lesson, UserProgress, UserProgressSummary
+from src.models.rate_limit import RateLimitBucket
+from src.models.sqlite import engine_options, install_pragmas, profile_pragmas
+from src.migrations import migrate
+from src.instrumentation import init_instrumentation
+from src.static_assets import StaticManifest
 from src.routes.user import user_bp
 from src.routes.challenges import challenges_bp
 from src.routes.lessons import lessons_bp
+from src.routes.content import content_bp
+from src.routes.search import search_bp
+from src.routes.dashboard import dashboard_bp
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-# Enable CORS for all routes
-CORS(app)
+def create_app(config=None):
+    """
+    Build the application. Booting does no DDL and no database I/O; the
+    schema is brought up to date separately with ``flask db-upgrade``
+    (or ``python src/migrations.py``) once per deploy.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(challenges_bp, url_prefix='/api')
-app.register_blueprint(lessons_bp, url_prefix='/api')
+    # Enable CORS for all routes
+    CORS(app)
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(challenges_bp, url_prefix='/api')
+    app.register_blueprint(lessons_bp, url_prefix='/api')
+    app.register_blueprint(content_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
+    # uncomment if you need to use database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL',
+        f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 'tuned' (WAL, relaxed fsync, busy timeout, bigger cache/mmap, pooled
+    # connections) or 'default' (SQLite's stock settings)
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'tuned')
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    # Node.js workers used to run challenge tests, one job per process
+    app.config['NODE_POOL_SIZE'] = int(os.environ.get('NODE_POOL_SIZE', 4))
+    app.config['NODE_WORKER_MAX_HEAP_MB'] = 256
+    app.config['NODE_TEST_TIMEOUT'] = 5.0
+    # 'shared' evaluates the submission once for all tests, 'per-test' isolates each test
+    app.config['NODE_TEST_ISOLATION'] = os.environ.get('NODE_TEST_ISOLATION', 'shared')
+
+    # Background executor for submissions; submit returns a job id immediately
+    app.config['SUBMISSION_QUEUE_WORKERS'] = app.config['NODE_POOL_SIZE']
+    app.config['SUBMISSION_QUEUE_MAX_PENDING'] = int(os.environ.get('SUBMISSION_QUEUE_MAX_PENDING', 100))
+    app.config['SUBMISSION_JOB_TTL'] = 600
+
+    # Threads running Flask routes under the ASGI server (src/asgi.py); the
+    # submission queue and progress streams run on its event loop instead
+    app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 32))
+
+    # Admission control for submissions: token buckets per user and per
+    # client IP ('memory', or 'sqlite' to share them between workers) and a
+    # cap on each user's unfinished jobs; rejections carry Retry-After
+    app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+    app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    app.config['SUBMIT_RATE_PER_USER'] = 0.5  # tokens per second
+    app.config['SUBMIT_BURST_PER_USER'] = 5
+    app.config['SUBMIT_RATE_PER_IP'] = 2.0
+    app.config['SUBMIT_BURST_PER_IP'] = 20
+    app.config['SUBMISSION_MAX_PER_USER'] = 2
+    # Longest submission accepted, in UTF-8 bytes
+    app.config['SUBMISSION_MAX_CODE_BYTES'] = 64 * 1024
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted for
+    # the client IP of the per-IP buckets; with 0 it is the connecting address
+    app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+    # In-memory LRU tier of the submission result cache
+    app.config['RESULT_CACHE_MAX_ENTRIES'] = 1024
+
+    # Pre-serialized GET responses for lessons and challenges
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = 512
+    # Seconds a worker may serve them after another worker changed the content
+    app.config['CONTENT_VERSION_TTL'] = 1.0
+
+    # Request instrumentation: log statements slower than this, and
+    # statements repeated this many times in one request (likely N+1)
+    app.config['SLOW_QUERY_MS'] = 100
+    app.config['N_PLUS_ONE_THRESHOLD'] = 5
+
+    app.config.update(config or {})
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in (config or {}):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    # JSON columns are stored minified so they can be spliced into responses as-is
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].setdefault(
+        'json_serializer', lambda value: json.dumps(value, separators=(',', ':'))
+    )
+
+    if app.config['TRUSTED_PROXY_COUNT']:
+        # request.remote_addr becomes the client address the proxies forwarded
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+
+    db.init_app(app)
+    with app.app_context():
+        # Only registers a connect hook; no connection is opened here
+        install_pragmas(db.engine, profile_pragmas(app.config))
+
+    # Server-Timing headers and Prometheus histograms at /metrics
+    init_instrumentation(app)
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Create missing tables and apply pending migrations"""
+        applied = migrate(app)
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+    # The SPA bundle is loaded and compressed once; requests are served from memory
+    static_manifest = StaticManifest(app.static_folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        return static_manifest.response(path)
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == '__main__':
+    # Local development: bring the schema up to date before serving
+    migrate(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,283 @@
+"""
+Versioned migrations for existing SQLite databases.
+
+``db.create_all()`` only creates missing tables, so changes to existing
+tables and data are applied here. The applied version is kept in SQLite's
+``PRAGMA user_version``; each migration runs once, in its own transaction,
+and must also be safe on a database freshly created by ``create_all()``.
+
+Run once per deploy, before starting workers:
+
+    flask --app src.main db-upgrade
+    python src/migrations.py
+"""
+import json
+import os
+import sys
+
+from sqlalchemy import text
+
+MIGRATIONS = []
+SUBMISSION_BATCH = 1000
+
+
+def migration(version):
+    def register(func):
+        MIGRATIONS.append((version, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return register
+
+
+def current_version(connection):
+    return connection.execute(text('PRAGMA user_version')).scalar()
+
+
+def upgrade(engine):
+    """Apply all pending migrations, returning the list of versions applied"""
+    applied = []
+    for version, func in MIGRATIONS:
+        with engine.connect() as connection:
+            # pysqlite runs DDL outside any transaction unless one is opened
+            # explicitly; IMMEDIATE also keeps a second deployer out until commit
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            if current_version(connection) >= version:
+                continue
+            func(connection)
+            connection.execute(text(f'PRAGMA user_version = {int(version)}'))
+            connection.commit()
+        applied.append(version)
+    return applied
+
+
+def table_columns(connection, table):
+    return {row[1] for row in connection.execute(text(f'PRAGMA table_info({table})'))}
+
+
+def table_exists(connection, table):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': table}
+    ).first() is not None
+
+
+def migrate(app):
+    """Create missing tables, then apply pending migrations"""
+    from src.models.user import db
+
+    with app.app_context():
+        db.create_all()
+        return upgrade(db.engine)
+
+
+JSON_COLUMNS = (
+    ('lesson', 'prerequisites'),
+    ('challenge', 'tests'),
+    ('challenge', 'hints'),
+    ('challenge', 'tags'),
+    ('challenge_submission', 'test_results'),
+    ('submission_result_cache', 'test_results'),
+)
+
+
+@migration(1)
+def normalize_json_columns(connection):
+    """
+    JSON columns used to be TEXT decoded by hand. Make every stored value
+    valid, minified JSON so it can be spliced into responses verbatim.
+    """
+    for table, column in JSON_COLUMNS:
+        if column not in table_columns(connection, table):
+            continue  # moved out of the table by a later schema
+        connection.execute(text(
+            f"UPDATE {table} SET {column} = '[]' "
+            f"WHERE {column} IS NULL OR {column} = '' OR NOT json_valid({column})"
+        ))
+        connection.execute(text(f'UPDATE {table} SET {column} = json({column})'))
+
+
+@migration(2)
+def add_lookup_indexes(connection):
+    """
+    Index the progress and submission lookups. Duplicate progress rows for a
+    user/lesson pair are merged into the oldest row first so the unique
+    index can be built.
+    """
+    connection.execute(text('''
+        UPDATE user_progress SET
+            progress_percentage = (SELECT MAX(p.progress_percentage) FROM user_progress p
+                                   WHERE p.user_id = user_progress.user_id AND p.lesson_id = user_progress.lesson_id),
+            completed = (SELECT MAX(p.completed) FROM user_progress p
+                         WHERE p.user_id = user_progress.user_id AND p.lesson_id = user_progress.lesson_id),
+            completed_at = (SELECT MIN(p.completed_at) FROM user_progress p
+                            WHERE p.user_id = user_progress.user_id AND p.lesson_id = user_progress.lesson_id)
+        WHERE id IN (SELECT MIN(id) FROM user_progress GROUP BY user_id, lesson_id HAVING COUNT(*) > 1)
+    '''))
+    connection.execute(text('''
+        DELETE FROM user_progress
+        WHERE id NOT IN (SELECT MIN(id) FROM user_progress GROUP BY user_id, lesson_id)
+    '''))
+    for statement in (
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_user_progress_user_lesson ON user_progress (user_id, lesson_id)',
+        'CREATE INDEX IF NOT EXISTS ix_user_progress_user_completed ON user_progress (user_id, completed)',
+        'CREATE INDEX IF NOT EXISTS ix_challenge_submission_challenge_user_submitted '
+        'ON challenge_submission (challenge_id, user_id, submitted_at)',
+        'CREATE INDEX IF NOT EXISTS ix_lesson_order_index_id ON lesson (order_index, id)',
+    ):
+        connection.execute(text(statement))
+
+
+@migration(3)
+def backfill_progress_summaries(connection):
+    """Build the materialized per-user progress summaries from existing rows"""
+    connection.execute(text('''
+        CREATE TABLE IF NOT EXISTS user_progress_summary (
+            user_id VARCHAR(50) NOT NULL,
+            lessons_started INTEGER NOT NULL,
+            completed_lessons INTEGER NOT NULL,
+            total_progress INTEGER NOT NULL,
+            PRIMARY KEY (user_id)
+        )
+    '''))
+    connection.execute(text('DELETE FROM user_progress_summary'))
+    connection.execute(text('''
+        INSERT INTO user_progress_summary (user_id, lessons_started, completed_lessons, total_progress)
+        SELECT user_id, COUNT(*), COALESCE(SUM(completed), 0), COALESCE(SUM(progress_percentage), 0)
+        FROM user_progress
+        GROUP BY user_id
+    '''))
+
+
+
+@migration(4)
+def create_search_index(connection):
+    """Create the FTS5 search table and index existing lessons and challenges"""
+    from src.services.search_index import rebuild_index
+
+    rebuild_index(connection)
+
+
+
+@migration(5)
+def move_submission_bodies_to_blobs(connection):
+    """
+    Replace challenge_submission's code and test_results text with hashes
+    into the deduplicated, compressed submission_blob table. The table is
+    rebuilt so the new columns are NOT NULL; run ``flask challenges
+    compact-submissions`` afterwards to return the freed pages to the OS.
+    A ``challenge_submission_legacy`` table left by an interrupted run is
+    copied again, skipping the rows that made it across.
+    """
+    from src.models.blob import SubmissionBlob, store_blobs
+    from src.models.challenge import ChallengeSubmission
+
+    if not table_exists(connection, 'challenge_submission_legacy'):
+        if 'code' not in table_columns(connection, 'challenge_submission'):
+            return
+        connection.execute(text('DROP INDEX IF EXISTS ix_challenge_submission_challenge_user_submitted'))
+        connection.execute(text('ALTER TABLE challenge_submission RENAME TO challenge_submission_legacy'))
+    SubmissionBlob.__table__.create(connection, checkfirst=True)
+    ChallengeSubmission.__table__.create(connection, checkfirst=True)
+
+    legacy = connection.execution_options(yield_per=SUBMISSION_BATCH).execute(text(
+        'SELECT id, challenge_id, user_id, code, passed, test_results, submitted_at '
+        'FROM challenge_submission_legacy '
+        'WHERE id NOT IN (SELECT id FROM challenge_submission) ORDER BY id'
+    ))
+    insert = text(
+        'INSERT INTO challenge_submission '
+        '(id, challenge_id, user_id, code_hash, passed, results_hash, submitted_at) '
+        'VALUES (:id, :challenge_id, :user_id, :code_hash, :passed, :results_hash, :submitted_at)'
+    )
+    for rows in legacy.partitions():
+        code_hashes = store_blobs(connection, [(row.code or '').encode('utf-8') for row in rows])
+        results_hashes = store_blobs(connection, [(row.test_results or '[]').encode('utf-8') for row in rows])
+        connection.execute(insert, [{
+            'id': row.id,
+            'challenge_id': row.challenge_id,
+            'user_id': row.user_id,
+            'code_hash': code_hash,
+            'passed': row.passed,
+            'results_hash': results_hash,
+            'submitted_at': row.submitted_at
+        } for row, code_hash, results_hash in zip(rows, code_hashes, results_hashes)])
+    connection.execute(text('DROP TABLE challenge_submission_legacy'))
+
+
+@migration(6)
+def add_submission_test_counts(connection):
+    """Store each submission's passed/total test counts on its row"""
+    from src.models.blob import decode_payload
+
+    columns = table_columns(connection, 'challenge_submission')
+    for column in ('passed_tests', 'total_tests'):
+        if column not in columns:
+            connection.execute(text(
+                f'ALTER TABLE challenge_submission ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0'
+            ))
+
+    # Count once per distinct results blob, then update every row in one statement
+    connection.execute(text(
+        'CREATE TEMP TABLE result_counts (hash VARCHAR(64) PRIMARY KEY, passed INTEGER, total INTEGER)'
+    ))
+    blobs = connection.execution_options(yield_per=SUBMISSION_BATCH).execute(text(
+        'SELECT hash, encoding, data FROM submission_blob '
+        'WHERE hash IN (SELECT results_hash FROM challenge_submission)'
+    ))
+    for rows in blobs.partitions():
+        counts = []
+        for row in rows:
+            results = json.loads(decode_payload(row.encoding, row.data))
+            counts.append({
+                'hash': row.hash,
+                'passed': sum(1 for result in results if result.get('passed')),
+                'total': len(results)
+            })
+        connection.execute(text('INSERT INTO result_counts VALUES (:hash, :passed, :total)'), counts)
+    connection.execute(text('''
+        UPDATE challenge_submission SET
+            passed_tests = (SELECT passed FROM result_counts WHERE hash = results_hash),
+            total_tests = (SELECT total FROM result_counts WHERE hash = results_hash)
+        WHERE results_hash IN (SELECT hash FROM result_counts)
+    '''))
+    connection.execute(text('DROP TABLE result_counts'))
+
+
+@migration(7)
+def split_lesson_sections(connection):
+    """Split every existing lesson into sections"""
+    from src.models.lesson import LessonSection
+    from src.services.lesson_sections import sync_sections
+
+    LessonSection.__table__.create(connection, checkfirst=True)
+    lessons = connection.execute(text('SELECT id, content FROM lesson')).all()
+    for lesson in lessons:
+        sync_sections(connection, lesson.id, lesson.content)
+
+
+@migration(8)
+def add_submission_user_index(connection):
+    """Index submissions by user for the dashboard's per-challenge status"""
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_challenge_submission_user_challenge '
+        'ON challenge_submission (user_id, challenge_id, passed, submitted_at)'
+    ))
+
+
+@migration(9)
+def backfill_challenge_stats(connection):
+    """Build the per-challenge analytics tables from existing submissions"""
+    from src.models.challenge import ChallengeStats, ChallengeTestStats, UserChallengeStats
+    from src.services.challenge_stats import rebuild_stats
+
+    for model in (ChallengeStats, UserChallengeStats, ChallengeTestStats):
+        model.__table__.create(connection, checkfirst=True)
+    rebuild_stats(connection)
+
+
+if __name__ == '__main__':
+    # Add the project root to the path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+    from src.main import app
+
+    applied = migrate(app)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
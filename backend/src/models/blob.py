@@ -0,0 +1,111 @@
+"""
+Content-addressed, compressed storage for large submission bodies.
+
+Submission code and test results are stored once per distinct payload in
+``submission_blob``, keyed by the SHA-256 of the raw bytes and compressed
+with zlib (payloads that do not shrink are kept as-is). Submission rows
+hold only the hashes, so identical resubmissions cost a few bytes and the
+history table stays small enough to scan quickly.
+"""
+import hashlib
+import json
+import zlib
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src.models.user import db
+
+COMPRESSION_LEVEL = 6
+ENCODINGS = ('raw', 'zlib')
+
+
+class SubmissionBlob(db.Model):
+    hash = db.Column(db.String(64), primary_key=True)  # sha256 of the raw payload
+    encoding = db.Column(db.String(10), nullable=False)  # raw, zlib
+    size = db.Column(db.Integer, nullable=False)  # raw payload size in bytes
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    def payload(self):
+        return decode_payload(self.encoding, self.data)
+
+
+def encode_json(value):
+    """Canonical payload for a JSON value, matching how JSON columns are stored"""
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def payload_hash(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+def encode_payload(raw):
+    """(encoding, stored bytes) for a raw payload"""
+    compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+    if len(compressed) < len(raw):
+        return 'zlib', compressed
+    return 'raw', raw
+
+
+def decode_payload(encoding, data):
+    if encoding == 'zlib':
+        return zlib.decompress(data)
+    if encoding == 'raw':
+        return bytes(data)
+    raise ValueError(f'Unknown blob encoding: {encoding}')
+
+
+def blob_row(raw):
+    encoding, data = encode_payload(raw)
+    return {'hash': payload_hash(raw), 'encoding': encoding, 'size': len(raw), 'data': data}
+
+
+def store_blobs(connection, payloads):
+    """Insert the raw payloads that are not stored yet; returns their hashes in order"""
+    rows = {}
+    for raw in payloads:
+        row = blob_row(raw)
+        rows.setdefault(row['hash'], row)
+    if rows:
+        table = SubmissionBlob.__table__
+        connection.execute(
+            insert(table).on_conflict_do_nothing(index_elements=[table.c.hash]),
+            list(rows.values())
+        )
+    return [payload_hash(raw) for raw in payloads]
+
+
+class BlobBacked:
+    """
+    Mixin for models that keep payload columns in ``submission_blob``.
+    Assigning a payload attribute sets its hash column right away; the blob
+    itself is written just before the row is flushed.
+    """
+
+    def _stage_blob(self, hash_attribute, raw):
+        digest = payload_hash(raw)
+        setattr(self, hash_attribute, digest)
+        if not hasattr(self, '_pending_blobs'):
+            self._pending_blobs = {}
+        self._pending_blobs[digest] = raw
+
+    def _read_blob(self, hash_attribute, blob_attribute):
+        digest = getattr(self, hash_attribute)
+        pending = getattr(self, '_pending_blobs', {})
+        if digest in pending:
+            return pending[digest]
+        blob = getattr(self, blob_attribute)
+        return blob.payload() if blob is not None else None
+
+
+@event.listens_for(Session, 'before_flush')
+def _store_pending_blobs(session, flush_context, instances):
+    payloads = []
+    for instance in session.new | session.dirty:
+        pending = getattr(instance, '_pending_blobs', None)
+        if isinstance(instance, BlobBacked) and pending:
+            payloads.extend(pending.values())
+            pending.clear()
+    if payloads:
+        store_blobs(session.connection(), payloads)
@@ -1,4 +1,5 @@
 from src.models.user import db
+from src.models.blob import BlobBacked, SubmissionBlob, encode_json
 from datetime import datetime
 import json
 
@@ -8,12 +9,28 @@ class Challenge(db.Model):
     description = db.Column(db.Text, nullable=False)
     starter_code = db.Column(db.Text, nullable=False)
     solution = db.Column(db.Text, nullable=False)
-    tests = db.Column(db.Text, nullable=False)  # JSON string
-    hints = db.Column(db.Text, nullable=False)  # JSON string
+    tests = db.Column(db.JSON, nullable=False)
+    hints = db.Column(db.JSON, nullable=False)
     difficulty = db.Column(db.String(20), nullable=False)  # easy, medium, hard
-    tags = db.Column(db.Text, nullable=False)  # JSON string
+    tags = db.Column(db.JSON, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # API field name -> column attribute, for sparse fieldsets and list views
+    API_FIELDS = {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'starterCode': 'starter_code',
+        'solution': 'solution',
+        'tests': 'tests',
+        'hints': 'hints',
+        'difficulty': 'difficulty',
+        'tags': 'tags',
+        'createdAt': 'created_at'
+    }
+    JSON_FIELDS = ('tests', 'hints', 'tags')
+    SUMMARY_FIELDS = ('id', 'title', 'difficulty', 'tags')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -21,22 +38,56 @@ class Challenge(db.Model):
             'description': self.description,
             'starterCode': self.starter_code,
             'solution': self.solution,
-            'tests': json.loads(self.tests) if self.tests else [],
-            'hints': json.loads(self.hints) if self.hints else [],
+            'tests': self.tests or [],
+            'hints': self.hints or [],
             'difficulty': self.difficulty,
-            'tags': json.loads(self.tags) if self.tags else [],
+            'tags': self.tags or [],
             'createdAt': self.created_at.isoformat()
         }
 
-class ChallengeSubmission(db.Model):
+class ChallengeSubmission(BlobBacked, db.Model):
+    __table_args__ = (
+        # Submission history: one user's attempts at a challenge, newest first
+        db.Index('ix_challenge_submission_challenge_user_submitted', 'challenge_id', 'user_id', 'submitted_at'),
+        # Per-user pass status across challenges (dashboard)
+        db.Index('ix_challenge_submission_user_challenge', 'user_id', 'challenge_id', 'passed', 'submitted_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     challenge_id = db.Column(db.String(50), db.ForeignKey('challenge.id'), nullable=False)
     user_id = db.Column(db.String(50), nullable=False)
-    code = db.Column(db.Text, nullable=False)
+    # Code and test results live in submission_blob, deduplicated and compressed
+    code_hash = db.Column(db.String(64), db.ForeignKey('submission_blob.hash'), nullable=False)
     passed = db.Column(db.Boolean, nullable=False)
-    test_results = db.Column(db.Text, nullable=False)  # JSON string
+    results_hash = db.Column(db.String(64), db.ForeignKey('submission_blob.hash'), nullable=False)
+    # Test counts kept on the row so history lists never open the results blob
+    passed_tests = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_tests = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    code_blob = db.relationship(SubmissionBlob, foreign_keys=[code_hash], viewonly=True)
+    results_blob = db.relationship(SubmissionBlob, foreign_keys=[results_hash], viewonly=True)
+    
+    @property
+    def code(self):
+        raw = self._read_blob('code_hash', 'code_blob')
+        return raw.decode('utf-8') if raw is not None else None
+    
+    @code.setter
+    def code(self, value):
+        self._stage_blob('code_hash', value.encode('utf-8'))
+    
+    @property
+    def test_results(self):
+        raw = self._read_blob('results_hash', 'results_blob')
+        return json.loads(raw) if raw is not None else None
+    
+    @test_results.setter
+    def test_results(self, value):
+        self._stage_blob('results_hash', encode_json(value))
+        self.passed_tests = sum(1 for result in value if result.get('passed'))
+        self.total_tests = len(value)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -44,7 +95,84 @@ class ChallengeSubmission(db.Model):
             'userId': self.user_id,
             'code': self.code,
             'passed': self.passed,
-            'testResults': json.loads(self.test_results) if self.test_results else [],
+            'testResults': self.test_results or [],
             'submittedAt': self.submitted_at.isoformat()
         }
 
+class SubmissionResultCache(db.Model):
+    """Persistent tier of the submission result cache (see services/result_cache.py)"""
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of tests version + code
+    challenge_id = db.Column(db.String(50), db.ForeignKey('challenge.id'), nullable=False, index=True)
+    test_results = db.Column(db.JSON, nullable=False)
+    duration_ms = db.Column(db.Float, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ChallengeStats(db.Model):
+    """Per-challenge submission totals, maintained incrementally (see services/challenge_stats.py)"""
+    challenge_id = db.Column(db.String(50), db.ForeignKey('challenge.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    passes = db.Column(db.Integer, nullable=False, default=0)
+    users_attempted = db.Column(db.Integer, nullable=False, default=0)
+    users_passed = db.Column(db.Integer, nullable=False, default=0)
+    # Sums over users who passed, for the averages
+    first_pass_seconds = db.Column(db.Float, nullable=False, default=0)
+    first_pass_attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_submitted_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'challengeId': self.challenge_id,
+            'attempts': self.attempts,
+            'passes': self.passes,
+            'passRate': (self.passes / self.attempts) * 100 if self.attempts else 0,
+            'usersAttempted': self.users_attempted,
+            'usersPassed': self.users_passed,
+            'userPassRate': (self.users_passed / self.users_attempted) * 100 if self.users_attempted else 0,
+            'averageSecondsToFirstPass': (self.first_pass_seconds / self.users_passed) if self.users_passed else None,
+            'averageAttemptsToFirstPass': (self.first_pass_attempts / self.users_passed) if self.users_passed else None,
+            'lastSubmittedAt': self.last_submitted_at.isoformat() if self.last_submitted_at else None
+        }
+
+class UserChallengeStats(db.Model):
+    """One user's submission totals for one challenge"""
+    user_id = db.Column(db.String(50), primary_key=True)
+    challenge_id = db.Column(db.String(50), db.ForeignKey('challenge.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    passes = db.Column(db.Integer, nullable=False, default=0)
+    first_attempt_at = db.Column(db.DateTime)
+    first_pass_at = db.Column(db.DateTime)
+    attempts_to_first_pass = db.Column(db.Integer)  # includes the passing attempt
+    last_submitted_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'userId': self.user_id,
+            'challengeId': self.challenge_id,
+            'attempts': self.attempts,
+            'passes': self.passes,
+            'firstAttemptAt': self.first_attempt_at.isoformat() if self.first_attempt_at else None,
+            'firstPassAt': self.first_pass_at.isoformat() if self.first_pass_at else None,
+            'secondsToFirstPass': (
+                (self.first_pass_at - self.first_attempt_at).total_seconds()
+                if self.first_pass_at and self.first_attempt_at else None
+            ),
+            'attemptsToFirstPass': self.attempts_to_first_pass,
+            'lastSubmittedAt': self.last_submitted_at.isoformat() if self.last_submitted_at else None
+        }
+
+class ChallengeTestStats(db.Model):
+    """How often each of a challenge's tests has run and failed, by test position"""
+    challenge_id = db.Column(db.String(50), db.ForeignKey('challenge.id'), primary_key=True)
+    test_index = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.Text, nullable=False, default='')  # as of the latest run
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'index': self.test_index,
+            'description': self.description,
+            'runs': self.runs,
+            'failures': self.failures,
+            'failureRate': (self.failures / self.runs) * 100 if self.runs else 0
+        }
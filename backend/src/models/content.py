@@ -0,0 +1,6 @@
+from src.models.user import db
+
+class ContentVersion(db.Model):
+    """Count of writes to one kind of content, shared by every worker (see services/response_cache.py)"""
+    kind = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -1,18 +1,37 @@
 from src.models.user import db
 from datetime import datetime
-import json
 
 class Lesson(db.Model):
+    __table_args__ = (
+        # Catalog listing and keyset pagination order
+        db.Index('ix_lesson_order_index_id', 'order_index', 'id'),
+    )
+    
     id = db.Column(db.String(50), primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
     content = db.Column(db.Text, nullable=False)
     duration = db.Column(db.Integer, nullable=False)  # in minutes
     difficulty = db.Column(db.String(20), nullable=False)  # beginner, intermediate, advanced
-    prerequisites = db.Column(db.Text, nullable=False)  # JSON string
+    prerequisites = db.Column(db.JSON, nullable=False)
     order_index = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # API field name -> column attribute, for sparse fieldsets and list views
+    API_FIELDS = {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'content': 'content',
+        'duration': 'duration',
+        'difficulty': 'difficulty',
+        'prerequisites': 'prerequisites',
+        'orderIndex': 'order_index',
+        'createdAt': 'created_at'
+    }
+    JSON_FIELDS = ('prerequisites',)
+    SUMMARY_FIELDS = ('id', 'title', 'difficulty', 'duration', 'orderIndex')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -21,12 +40,17 @@ class Lesson(db.Model):
             'content': self.content,
             'duration': self.duration,
             'difficulty': self.difficulty,
-            'prerequisites': json.loads(self.prerequisites) if self.prerequisites else [],
+            'prerequisites': self.prerequisites or [],
             'orderIndex': self.order_index,
             'createdAt': self.created_at.isoformat()
         }
 
 class UserProgress(db.Model):
+    __table_args__ = (
+        db.Index('uq_user_progress_user_lesson', 'user_id', 'lesson_id', unique=True),
+        db.Index('ix_user_progress_user_completed', 'user_id', 'completed'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(50), nullable=False)
     lesson_id = db.Column(db.String(50), db.ForeignKey('lesson.id'), nullable=False)
@@ -44,3 +68,44 @@ class UserProgress(db.Model):
             'completedAt': self.completed_at.isoformat() if self.completed_at else None
         }
 
+class UserProgressSummary(db.Model):
+    """Per-user progress totals, maintained incrementally on every progress write"""
+    user_id = db.Column(db.String(50), primary_key=True)
+    lessons_started = db.Column(db.Integer, nullable=False, default=0)
+    completed_lessons = db.Column(db.Integer, nullable=False, default=0)
+    total_progress = db.Column(db.Integer, nullable=False, default=0)
+
+WORDS_PER_MINUTE = 200
+
+def reading_minutes(word_count):
+    return max(1, -(-word_count // WORDS_PER_MINUTE))
+
+class LessonSection(db.Model):
+    """A lesson's content split at its headings (see services/lesson_sections.py)"""
+    __table_args__ = (
+        # Table of contents order
+        db.Index('ix_lesson_section_lesson_position', 'lesson_id', 'position'),
+    )
+    
+    # Keyed by anchor, so inserting a heading does not re-key the sections after it
+    lesson_id = db.Column(db.String(50), db.ForeignKey('lesson.id'), primary_key=True)
+    anchor = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    level = db.Column(db.Integer, nullable=False)  # heading level, 0 for text before the first heading
+    html = db.Column(db.Text, nullable=False)
+    word_count = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(40), nullable=False)  # sha1 of anchor, title and html
+    
+    def to_toc_entry(self):
+        return {
+            'index': self.position,
+            'anchor': self.anchor,
+            'title': self.title,
+            'level': self.level,
+            'wordCount': self.word_count,
+            'readingMinutes': reading_minutes(self.word_count)
+        }
+    
+    def to_dict(self):
+        return dict(self.to_toc_entry(), lessonId=self.lesson_id, html=self.html)
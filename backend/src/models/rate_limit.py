@@ -0,0 +1,7 @@
+from src.models.user import db
+
+class RateLimitBucket(db.Model):
+    """Shared token-bucket state for multi-worker deployments (see services/rate_limit.py)"""
+    key = db.Column(db.String(120), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated = db.Column(db.Float, nullable=False)  # unix time of the last refill
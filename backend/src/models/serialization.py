@@ -0,0 +1,57 @@
+"""
+JSON encoding that splices already-encoded fragments into the output.
+
+JSON columns are stored as JSON text, so list routes can select them with
+``raw_json(column)`` and wrap the text in ``RawJSON``; ``dumps`` then copies
+it into the response verbatim instead of decoding and re-encoding it.
+Output matches Flask's compact ``jsonify`` (sorted keys, ASCII-escaped).
+"""
+import json
+
+from flask import Response
+
+from src.models.user import db
+
+_encode = json.JSONEncoder(ensure_ascii=True, separators=(',', ':')).encode
+
+
+class RawJSON(str):
+    """A string holding valid, already-encoded JSON"""
+
+
+def raw_json(column, label=None):
+    """Select a JSON column as its stored text, skipping the JSON result processor"""
+    return db.type_coerce(column, db.Text).label(label or column.key)
+
+
+def _write(value, parts):
+    if isinstance(value, RawJSON):
+        parts.append(value)
+    elif isinstance(value, dict):
+        parts.append('{')
+        for index, key in enumerate(sorted(value)):
+            if index:
+                parts.append(',')
+            parts.append(_encode(key))
+            parts.append(':')
+            _write(value[key], parts)
+        parts.append('}')
+    elif isinstance(value, (list, tuple)):
+        parts.append('[')
+        for index, item in enumerate(value):
+            if index:
+                parts.append(',')
+            _write(item, parts)
+        parts.append(']')
+    else:
+        parts.append(_encode(value))
+
+
+def dumps(value):
+    parts = []
+    _write(value, parts)
+    return ''.join(parts)
+
+
+def json_response(value, status=200):
+    return Response(dumps(value) + '\n', status=status, mimetype='application/json')
@@ -0,0 +1,68 @@
+"""
+SQLite engine profiles.
+
+The ``tuned`` profile switches file databases to WAL so readers no longer
+block on the writer, relaxes fsyncs to ``synchronous=NORMAL`` (still safe in
+WAL mode), waits on locks instead of failing, and enlarges the page cache
+and memory map. Pragmas are applied to every new pool connection. The
+``default`` profile leaves SQLite's settings alone; in-memory databases
+(used by tests and benchmarks) skip the file-only pragmas.
+"""
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+
+TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # ms
+    'cache_size': -64000,          # KiB, negative means size rather than pages
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Pragmas that only make sense for an on-disk database
+FILE_ONLY_PRAGMAS = ('journal_mode', 'mmap_size')
+
+
+def is_memory_database(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def profile_pragmas(config):
+    if config.get('SQLITE_PROFILE', 'tuned') == 'default':
+        return {}
+    pragmas = dict(TUNED_PRAGMAS)
+    pragmas.update(config.get('SQLITE_PRAGMAS', {}))
+    if is_memory_database(config['SQLALCHEMY_DATABASE_URI']):
+        for name in FILE_ONLY_PRAGMAS:
+            pragmas.pop(name, None)
+    return pragmas
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database and profile"""
+    options = {'connect_args': {'check_same_thread': False}}
+    if is_memory_database(config['SQLALCHEMY_DATABASE_URI']):
+        # One shared connection, otherwise each connection gets its own empty database
+        options['poolclass'] = StaticPool
+    elif config.get('SQLITE_PROFILE', 'tuned') != 'default':
+        # A connection per worker thread plus headroom; SQLite connections are cheap
+        options['pool_size'] = config.get('SQLITE_POOL_SIZE', 10)
+        options['max_overflow'] = config.get('SQLITE_POOL_MAX_OVERFLOW', 20)
+        options['pool_timeout'] = config.get('SQLITE_POOL_TIMEOUT', 10)
+        # Python's sqlite3 lock wait, in seconds; matches busy_timeout
+        options['connect_args']['timeout'] = profile_pragmas(config).get('busy_timeout', 5000) / 1000
+    return options
+
+
+def install_pragmas(engine, pragmas):
+    """Apply ``pragmas`` to every new DBAPI connection of ``engine``"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check that the hot progress and submission queries are served by indexes.
+
+Runs ``EXPLAIN QUERY PLAN`` on the queries issued by the progress and
+submission-history routes, built by the same functions the routes use,
+and fails if any of them scans a hot table or sorts in a temporary B-tree.
+Exits non-zero on failure so it can gate deploys.
+"""
+import os
+import re
+import sys
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.challenge import ChallengeSubmission
+from src.routes.challenges import _submission_history_query, _submission_query
+from src.routes.lessons import _progress_row_query
+from src.services.dashboard import challenge_status_query, progress_query
+from src.services.lesson_graph import completed_lessons_query
+from src.services.progress_summary import aggregate_progress_query
+
+# Tables that grow with users and submissions; any full scan of them is a problem
+HOT_TABLES = ('user_progress', 'challenge_submission', 'submission_blob')
+# "SCAN submission_blob_1 USING ..." for db.aliased(SubmissionBlob)
+SCAN_STEP = re.compile(r'^SCAN (\w+?)(?:_\d+)?(?: |$)')
+
+
+def hot_queries():
+    """{name: select} built by the same functions the routes execute"""
+    cursor = (datetime(2024, 1, 1), 1)
+    return {
+        'progress for user and lesson': _progress_row_query('user', 'lesson'),
+        'progress for user': progress_query('user'),
+        'progress aggregate for user': aggregate_progress_query('user'),
+        'completed lessons for user': completed_lessons_query('user'),
+        'challenge status for user': challenge_status_query('user'),
+        'submission history': _submission_history_query('challenge', 'user', full=True),
+        'submission history summary': _submission_history_query('challenge', 'user', full=False),
+        'submission history page': _submission_history_query('challenge', 'user', full=True, after=cursor).limit(21),
+        'submission detail': _submission_query(full=True).where(ChallengeSubmission.id == 1),
+    }
+
+
+def explain(connection, query):
+    compiled = query.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))]
+
+
+def scanned_table(step):
+    """Table scanned by a plan step, with SQLAlchemy's anonymous alias suffix removed"""
+    match = SCAN_STEP.match(step)
+    return match and match.group(1)
+
+
+def plan_problems(plan):
+    """Plan steps that grow with table size: any scan of a hot table, even of a covering index, and sorts"""
+    return [
+        step for step in plan
+        if scanned_table(step) in HOT_TABLES or 'TEMP B-TREE' in step
+    ]
+
+
+def check_query_plans(engine):
+    """Return {query name: (plan, problems)} for every hot query"""
+    results = {}
+    with engine.connect() as connection:
+        for name, query in hot_queries().items():
+            plan = explain(connection, query)
+            results[name] = (plan, plan_problems(plan))
+    return results
+
+
+def main():
+    from src.main import app
+
+    with app.app_context():
+        failed = False
+        for name, (plan, problems) in check_query_plans(db.engine).items():
+            print(f"{'❌' if problems else '✅'} {name}: {' | '.join(plan)}")
+            failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
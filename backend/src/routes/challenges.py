@@ -1,23 +1,41 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app
 from src.models.challenge import db, Challenge, ChallengeSubmission
+from src.instrumentation import record_node_time
+from src.models.blob import SubmissionBlob, decode_payload
+from src.models.serialization import RawJSON, json_response
+from src.routes.listing import ListArgsError, decode_cursor, encode_cursor, list_items, page_size
+from src.services.challenge_stats import analytics_overview, challenge_analytics, rebuild_stats, record_submission
+from src.services.response_cache import cached_content
+from src.services.async_node_pool import get_async_pool
+from src.services.node_pool import get_pool
+from src.services.result_cache import cache_key, get_result_cache, is_cacheable
+from src.services.rate_limit import RateLimited, admit_submission, record_rejection
+from src.services.submission_queue import (
+    KEEP_ALIVE_SECONDS, QueueFull, UserBusy, get_submission_queue, sse_message
+)
+from src.services.submission_storage import compact
+from datetime import datetime
+import asyncio
+import click
 import json
-import subprocess
-import tempfile
-import os
-import sys
+import math
+import time
 
 challenges_bp = Blueprint('challenges', __name__)
 
 @challenges_bp.route('/challenges', methods=['GET'])
+@cached_content('challenge')
 def get_challenges():
-    """Get all challenges"""
+    """Get challenges, optionally projected and paginated"""
     try:
-        challenges = Challenge.query.all()
-        return jsonify([challenge.to_dict() for challenge in challenges])
+        return json_response(list_items(Challenge, [Challenge.id], request.args))
+    except ListArgsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @challenges_bp.route('/challenges/<challenge_id>', methods=['GET'])
+@cached_content('challenge')
 def get_challenge(challenge_id):
     """Get a specific challenge"""
     try:
@@ -38,10 +56,10 @@ def create_challenge():
             description=data['description'],
             starter_code=data['starterCode'],
             solution=data['solution'],
-            tests=json.dumps(data['tests']),
-            hints=json.dumps(data['hints']),
+            tests=data['tests'],
+            hints=data['hints'],
             difficulty=data['difficulty'],
-            tags=json.dumps(data['tags'])
+            tags=data['tags']
         )
         
         db.session.add(challenge)
@@ -53,147 +71,361 @@ def create_challenge():
 
 @challenges_bp.route('/challenges/<challenge_id>/submit', methods=['POST'])
 def submit_challenge(challenge_id):
-    """Submit code for a challenge and run tests"""
+    """Queue submitted code for a challenge; tests run in the background"""
     try:
-        data = request.get_json()
-        user_code = data.get('code', '')
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        user_code = data.get('code')
         user_id = data.get('userId', 'anonymous')
+        if not isinstance(user_code, str) or not user_code.strip():
+            return jsonify({'error': 'code must be a non-empty string'}), 400
+        max_bytes = current_app.config.get('SUBMISSION_MAX_CODE_BYTES', 64 * 1024)
+        if len(user_code.encode('utf-8')) > max_bytes:
+            return jsonify({'error': f'code must be at most {max_bytes} bytes'}), 400
+        if not isinstance(user_id, str) or not user_id:
+            return jsonify({'error': 'userId must be a non-empty string'}), 400
         
-        challenge = Challenge.query.get_or_404(challenge_id)
-        tests = json.loads(challenge.tests)
-        
-        # Run tests against the submitted code
-        test_results = run_code_tests(user_code, tests)
-        
-        # Check if all tests passed
-        all_passed = all(result['passed'] for result in test_results)
+        # A primary-key read, so that unknown challenges spend no tokens
+        if db.session.get(Challenge, challenge_id) is None:
+            return jsonify({'error': 'Challenge not found'}), 404
         
-        # Save submission
-        submission = ChallengeSubmission(
-            challenge_id=challenge_id,
-            user_id=user_id,
-            code=user_code,
-            passed=all_passed,
-            test_results=json.dumps(test_results)
-        )
+        # Shed excess load before any other work
+        try:
+            admit_submission(current_app.config, user_id, request.remote_addr)
+        except RateLimited as e:
+            return _rejected(str(e), e.status, e.retry_after)
         
-        db.session.add(submission)
-        db.session.commit()
+        submissions = _submission_queue()
+        try:
+            job = submissions.submit(challenge_id, user_id, user_code)
+        except UserBusy as e:
+            record_rejection('user_busy')
+            return _rejected('Wait for your previous submissions to finish', 429, e.retry_after)
+        except QueueFull as e:
+            record_rejection('queue_full')
+            return _rejected('Too many pending submissions, try again shortly', 503, e.retry_after)
         
         return jsonify({
-            'submissionId': submission.id,
-            'passed': all_passed,
-            'testResults': test_results,
-            'message': 'All tests passed! Great job!' if all_passed else 'Some tests failed. Keep trying!'
-        })
+            'jobId': job.id,
+            'status': job.status,
+            'statusUrl': f'/api/submission-jobs/{job.id}',
+            'streamUrl': f'/api/submission-jobs/{job.id}/events'
+        }), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def run_code_tests(user_code, tests):
-    """Run JavaScript/React code tests in a safe environment"""
-    test_results = []
+@challenges_bp.route('/submission-jobs/<job_id>', methods=['GET'])
+def get_submission_job(job_id):
+    """Get the status and any finished test results of a queued submission"""
+    try:
+        job = _submission_queue().get(job_id)
+        if job is None:
+            return jsonify({'error': 'Submission job not found'}), 404
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@challenges_bp.route('/submission-jobs/<job_id>/events', methods=['GET'])
+def stream_submission_job(job_id):
+    """Stream a queued submission's progress as Server-Sent Events"""
+    job = _submission_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Submission job not found'}), 404
     
-    for test in tests:
-        try:
-            # Create a temporary file with the user's code and test
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-                # Write a simple test runner
-                test_code = f"""
-// User's code
-{user_code}
-
-// Test case
-try {{
-    const testInput = {test.get('input', '{}')};
-    const expectedOutput = {test.get('expectedOutput', 'null')};
+    def generate():
+        cursor = 0
+        while True:
+            events = job.wait_for_events(cursor, timeout=KEEP_ALIVE_SECONDS)
+            if not events:
+                # Comment line keeps idle proxies from closing the stream
+                yield ': keep-alive\n\n'
+                continue
+            for event, payload in events:
+                yield sse_message(event, payload)
+            cursor += len(events)
+            if events[-1][0] == 'done':
+                return
     
-    // Simple evaluation - in a real implementation, you'd use a proper test framework
-    let result;
-    if (typeof testInput === 'object' && testInput.props) {{
-        // For React component tests
-        result = eval('(' + testInput.code + ')');
-    }} else {{
-        // For function tests
-        result = eval(testInput);
-    }}
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@challenges_bp.route('/result-cache/stats', methods=['GET'])
+def get_result_cache_stats():
+    """Get hit rate and saved execution time of the submission result cache"""
+    try:
+        return jsonify(get_result_cache(current_app.config).stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _rejected(message, status, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({'error': message, 'retryAfter': retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def _submission_queue():
+    return get_submission_queue(current_app._get_current_object(), run_submission_job)
+
+def _prepare_submission(job):
+    """Load a job's tests and any cached results for its code; None if the challenge is gone"""
+    challenge = db.session.get(Challenge, job.challenge_id)
+    if challenge is None:
+        job.fail('Challenge not found')
+        return None
+    tests = challenge.tests
+    job.start(len(tests))
     
-    const passed = JSON.stringify(result) === JSON.stringify(expectedOutput);
-    console.log(JSON.stringify({{
-        passed: passed,
-        input: testInput,
-        expected: expectedOutput,
-        actual: result,
-        description: "{test.get('description', '')}"
-    }}));
-}} catch (error) {{
-    console.log(JSON.stringify({{
-        passed: false,
-        input: {test.get('input', '{}')},
-        expected: {test.get('expectedOutput', 'null')},
-        actual: null,
-        error: error.message,
-        description: "{test.get('description', '')}"
-    }}));
-}}
-"""
-                f.write(test_code)
-                f.flush()
-                
-                # Run the test with Node.js
-                try:
-                    result = subprocess.run(
-                        ['node', f.name],
-                        capture_output=True,
-                        text=True,
-                        timeout=5
-                    )
-                    
-                    if result.stdout:
-                        test_result = json.loads(result.stdout.strip())
-                        test_results.append(test_result)
-                    else:
-                        test_results.append({
-                            'passed': False,
-                            'description': test.get('description', ''),
-                            'error': result.stderr or 'No output from test'
-                        })
-                        
-                except subprocess.TimeoutExpired:
-                    test_results.append({
-                        'passed': False,
-                        'description': test.get('description', ''),
-                        'error': 'Test timed out'
-                    })
-                except json.JSONDecodeError:
-                    test_results.append({
-                        'passed': False,
-                        'description': test.get('description', ''),
-                        'error': 'Invalid test output'
-                    })
-                finally:
-                    os.unlink(f.name)
-                    
-        except Exception as e:
-            test_results.append({
-                'passed': False,
-                'description': test.get('description', ''),
-                'error': str(e)
-            })
+    # Identical code against identical tests gives identical results
+    key = cache_key(
+        challenge.id,
+        json.dumps(tests, sort_keys=True),
+        current_app.config.get('NODE_TEST_ISOLATION', 'shared'),
+        job.code
+    )
+    test_results = get_result_cache(current_app.config).get(key)
+    if test_results is not None:
+        for index, result in enumerate(test_results):
+            job.add_result(index, result)
+    return tests, key, test_results
+
+def _save_submission(job, key, test_results, duration_ms=None):
+    """Cache freshly run results, store the submission and complete the job"""
+    if duration_ms is not None and is_cacheable(test_results):
+        get_result_cache(current_app.config).put(key, job.challenge_id, test_results, duration_ms)
+    
+    # Check if all tests passed
+    all_passed = all(result['passed'] for result in test_results)
+    
+    # Save submission
+    submission = ChallengeSubmission(
+        challenge_id=job.challenge_id,
+        user_id=job.user_id,
+        code=job.code,
+        passed=all_passed,
+        test_results=test_results
+    )
+    
+    db.session.add(submission)
+    db.session.flush()
+    # Keep the per-challenge analytics in step, in the same transaction
+    record_submission(submission, test_results)
+    db.session.commit()
     
-    return test_results
+    job.complete(submission.id, all_passed, test_results)
+
+def run_submission_job(job):
+    """Run a queued submission's tests and save the result (executor thread)"""
+    prepared = _prepare_submission(job)
+    if prepared is None:
+        return
+    tests, key, test_results = prepared
+    duration_ms = None
+    if test_results is None:
+        # Run tests against the submitted code, streaming each result to the job
+        started = time.perf_counter()
+        test_results = run_code_tests(job.code, tests, on_result=job.add_result)
+        duration_ms = (time.perf_counter() - started) * 1000
+    _save_submission(job, key, test_results, duration_ms)
+
+def _in_app_context(app, func, *args):
+    # Each call gets its own app context, and so its own database session
+    with app.app_context():
+        return func(*args)
+
+async def run_submission_job_async(job):
+    """``run_submission_job`` for the ASGI server: database work in a thread, tests awaited (event loop)"""
+    app = current_app._get_current_object()
+    prepared = await asyncio.to_thread(_in_app_context, app, _prepare_submission, job)
+    if prepared is None:
+        return
+    tests, key, test_results = prepared
+    duration_ms = None
+    if test_results is None:
+        started = time.perf_counter()
+        test_results = await run_code_tests_async(job.code, tests, on_result=job.add_result)
+        duration_ms = (time.perf_counter() - started) * 1000
+    await asyncio.to_thread(_in_app_context, app, _save_submission, job, key, test_results, duration_ms)
+
+def _failed_results(tests, error):
+    return [{
+        'passed': False,
+        'description': test.get('description', ''),
+        'error': str(error),
+        'completed': False
+    } for test in tests]
+
+def run_code_tests(user_code, tests, on_result=None):
+    """Run JavaScript/React code tests in a single-use Node worker"""
+    started = time.perf_counter()
+    try:
+        return get_pool(current_app.config).run(user_code, tests, on_result=on_result)
+    except Exception as e:
+        return _failed_results(tests, e)
+    finally:
+        record_node_time(time.perf_counter() - started)
+
+async def run_code_tests_async(user_code, tests, on_result=None):
+    """``run_code_tests`` on the asyncio worker pool"""
+    started = time.perf_counter()
+    try:
+        return await get_async_pool(current_app.config).run(user_code, tests, on_result=on_result)
+    except Exception as e:
+        return _failed_results(tests, e)
+    finally:
+        record_node_time(time.perf_counter() - started)
+
+def _submission_query(full):
+    """Select submission columns; ``full`` adds the code and results blobs"""
+    columns = [
+        ChallengeSubmission.id,
+        ChallengeSubmission.passed,
+        ChallengeSubmission.passed_tests,
+        ChallengeSubmission.total_tests,
+        ChallengeSubmission.submitted_at
+    ]
+    if not full:
+        return db.select(*columns)
+    code_blob = db.aliased(SubmissionBlob)
+    results_blob = db.aliased(SubmissionBlob)
+    return db.select(
+        *columns,
+        ChallengeSubmission.challenge_id,
+        ChallengeSubmission.user_id,
+        code_blob.encoding.label('code_encoding'),
+        code_blob.data.label('code_data'),
+        results_blob.encoding.label('results_encoding'),
+        results_blob.data.label('results_data')
+    ).join(
+        code_blob, code_blob.hash == ChallengeSubmission.code_hash
+    ).join(
+        results_blob, results_blob.hash == ChallengeSubmission.results_hash
+    )
+
+def _submission_history_query(challenge_id, user_id, full, after=None):
+    """A user's submissions for a challenge, newest first, after the (submitted_at, id) keyset ``after``"""
+    order = (ChallengeSubmission.submitted_at, ChallengeSubmission.id)
+    query = _submission_query(full).where(
+        ChallengeSubmission.challenge_id == challenge_id,
+        ChallengeSubmission.user_id == user_id
+    ).order_by(*(column.desc() for column in order))
+    if after is not None:
+        query = query.where(db.tuple_(*order) < db.tuple_(*after))
+    return query
+
+def _serialize_submission(row, full):
+    item = {
+        'id': row.id,
+        'passed': row.passed,
+        'passedTests': row.passed_tests,
+        'totalTests': row.total_tests,
+        'submittedAt': row.submitted_at.isoformat()
+    }
+    if full:
+        # test_results is decompressed into the response without JSON decoding
+        item.update({
+            'challengeId': row.challenge_id,
+            'userId': row.user_id,
+            'code': decode_payload(row.code_encoding, row.code_data).decode('utf-8'),
+            'testResults': RawJSON(decode_payload(row.results_encoding, row.results_data).decode('utf-8'))
+        })
+    return item
 
 @challenges_bp.route('/challenges/<challenge_id>/submissions', methods=['GET'])
 def get_challenge_submissions(challenge_id):
-    """Get submissions for a challenge"""
+    """
+    Get a user's submissions for a challenge, newest first. ``view=summary``
+    leaves out code and results; ``limit``/``cursor`` return keyset pages
+    over (submitted_at, id).
+    """
     try:
         user_id = request.args.get('userId', 'anonymous')
-        submissions = ChallengeSubmission.query.filter_by(
-            challenge_id=challenge_id,
-            user_id=user_id
-        ).order_by(ChallengeSubmission.submitted_at.desc()).all()
+        view = request.args.get('view', 'full')
+        if view not in ('summary', 'full'):
+            raise ListArgsError('view must be "summary" or "full"')
+        full = view == 'full'
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        
+        after = None
+        if request.args.get('cursor'):
+            submitted_at, submission_id = decode_cursor(request.args['cursor'], 2)
+            try:
+                submitted_at = datetime.fromisoformat(submitted_at)
+            except (TypeError, ValueError):
+                raise ListArgsError('Invalid cursor')
+            after = (submitted_at, submission_id)
+        query = _submission_history_query(challenge_id, user_id, full, after)
+        
+        limit = page_size(request.args) if paginated else None
+        if limit is not None:
+            query = query.limit(limit + 1)
+        
+        rows = db.session.execute(query).all()
+        items = [_serialize_submission(row, full) for row in rows[:limit]]
+        if not paginated:
+            return json_response(items)
         
-        return jsonify([submission.to_dict() for submission in submissions])
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor([last.submitted_at.isoformat(), last.id])
+        return json_response({'items': items, 'nextCursor': next_cursor})
+    except ListArgsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@challenges_bp.route('/submissions/<int:submission_id>', methods=['GET'])
+def get_submission(submission_id):
+    """Get one submission with its code and test results"""
+    try:
+        row = db.session.execute(
+            _submission_query(full=True).where(ChallengeSubmission.id == submission_id)
+        ).first()
+        if row is None:
+            return jsonify({'error': 'Submission not found'}), 404
+        return json_response(_serialize_submission(row, full=True))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@challenges_bp.route('/challenges/<challenge_id>/analytics', methods=['GET'])
+def get_challenge_analytics(challenge_id):
+    """Attempts, pass rates, time to first pass and per-test failures for a challenge"""
+    try:
+        analytics = challenge_analytics(challenge_id, user_id=request.args.get('userId'))
+        if analytics is None:
+            return jsonify({'error': 'Challenge not found'}), 404
+        return json_response(analytics)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@challenges_bp.route('/analytics/challenges', methods=['GET'])
+def get_analytics_overview():
+    """Submission totals for every challenge"""
+    try:
+        return json_response(analytics_overview())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@challenges_bp.cli.command('compact-submissions')
+@click.option('--reencode', is_flag=True, help='Re-encode every blob with the current encoding')
+def compact_submissions_command(reencode):
+    """Drop unreferenced submission blobs and VACUUM the database"""
+    result = compact(db.engine, reencode=reencode)
+    before, after = result['before'], result['after']
+    print(f"Dropped {result['orphansDropped']} unreferenced blobs, re-encoded {result['reencoded']}")
+    print(f"{before['submissions']} submissions share {after['blobs']} blobs: "
+          f"{after['logicalBytes']} bytes of payload stored in {after['storedBytes']}")
+    print(f"Database size {before['databaseBytes']} -> {after['databaseBytes']} bytes")
+
+@challenges_bp.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the challenge analytics from the full submission history"""
+    with db.engine.begin() as connection:
+        counts = rebuild_stats(connection)
+    print(f"Rebuilt stats for {counts['challenges']} challenges, {counts['userChallenges']} user/challenge "
+          f"pairs and {counts['tests']} tests")
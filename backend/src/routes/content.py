@@ -0,0 +1,53 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.content_io import MODELS, export_ndjson, import_ndjson
+import click
+import sys
+
+content_bp = Blueprint('content', __name__)
+
+@content_bp.route('/content/import', methods=['POST'])
+def import_content():
+    """Import an NDJSON content pack streamed in the request body"""
+    try:
+        dry_run = request.args.get('dryRun', 'false').lower() in ('1', 'true', 'yes')
+        batch_size = max(1, min(int(request.args.get('batchSize', 500)), 5000))
+        # request.stream is read line by line; the body is never held in memory
+        return jsonify(import_ndjson(request.stream, dry_run=dry_run, batch_size=batch_size))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/content/export', methods=['GET'])
+def export_content():
+    """Stream lessons and challenges as an NDJSON content pack"""
+    types = request.args.get('types', 'lesson,challenge').split(',')
+    if any(item_type not in MODELS for item_type in types):
+        return jsonify({'error': 'types must be lesson and/or challenge'}), 400
+    return Response(
+        stream_with_context(export_ndjson(types)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename="content.ndjson"'}
+    )
+
+@content_bp.cli.command('import')
+@click.argument('source', type=click.File('rb'), default='-')
+@click.option('--dry-run', is_flag=True, help='Validate only, write nothing')
+@click.option('--batch-size', default=500, show_default=True)
+def import_command(source, dry_run, batch_size):
+    """Import an NDJSON content pack from SOURCE (default stdin)"""
+    result = import_ndjson(source, dry_run=dry_run, batch_size=batch_size)
+    click.echo(f"{'Validated' if dry_run else 'Imported'} {result['lessons']} lessons "
+               f"and {result['challenges']} challenges, {result['errorCount']} errors")
+    for error in result['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+    if result['errorCount']:
+        sys.exit(1)
+
+@content_bp.cli.command('export')
+@click.argument('target', type=click.File('w'), default='-')
+@click.option('--types', default='lesson,challenge', show_default=True)
+def export_command(target, types):
+    """Export lessons and challenges as NDJSON to TARGET (default stdout)"""
+    for line in export_ndjson(types.split(',')):
+        target.write(line)
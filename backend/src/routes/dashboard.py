@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from src.models.serialization import json_response
+from src.services.dashboard import bootstrap
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('/users/<user_id>/bootstrap', methods=['GET'])
+def get_bootstrap(user_id):
+    """Get everything the dashboard needs for first paint in one response"""
+    try:
+        return json_response(bootstrap(user_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
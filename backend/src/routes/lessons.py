@@ -1,20 +1,40 @@
 from flask import Blueprint, request, jsonify
-from src.models.lesson import db, Lesson, UserProgress
+from src.models.lesson import db, Lesson, LessonSection, UserProgress, reading_minutes
+from src.models.serialization import json_response
+from src.routes.listing import ListArgsError, list_items
+from src.services.lesson_sections import table_of_contents, toc_etag
+from src.services.lesson_graph import PrerequisiteCycle, check_prerequisites, lesson_status
+from src.services.progress_summary import apply_progress_delta, get_summary, refresh_summary
+from src.services.response_cache import cached_content
+from sqlalchemy.dialects.sqlite import insert
 from datetime import datetime
-import json
 
 lessons_bp = Blueprint('lessons', __name__)
 
+MAX_PROGRESS_BATCH = 500
+
+def _clamped_percentage(value):
+    """``value`` clamped to 0-100, or None if it is not an integer"""
+    if not isinstance(value, int) or isinstance(value, bool):
+        return None
+    return max(0, min(value, 100))
+
+def _progress_row_query(user_id, lesson_id):
+    return db.select(UserProgress).filter_by(user_id=user_id, lesson_id=lesson_id)
+
 @lessons_bp.route('/lessons', methods=['GET'])
+@cached_content('lesson')
 def get_lessons():
-    """Get all lessons ordered by index"""
+    """Get lessons ordered by index, optionally projected and paginated"""
     try:
-        lessons = Lesson.query.order_by(Lesson.order_index).all()
-        return jsonify([lesson.to_dict() for lesson in lessons])
+        return json_response(list_items(Lesson, [Lesson.order_index, Lesson.id], request.args))
+    except ListArgsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @lessons_bp.route('/lessons/<lesson_id>', methods=['GET'])
+@cached_content('lesson')
 def get_lesson(lesson_id):
     """Get a specific lesson"""
     try:
@@ -23,11 +43,51 @@ def get_lesson(lesson_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@lessons_bp.route('/lessons/<lesson_id>/toc', methods=['GET'])
+def get_lesson_toc(lesson_id):
+    """Get a lesson's table of contents with per-section word counts"""
+    try:
+        toc = table_of_contents(lesson_id)
+        if toc is None:
+            return jsonify({'error': 'Lesson not found'}), 404
+        title, sections = toc
+        word_count = sum(section.word_count for section in sections)
+        response = jsonify({
+            'lessonId': lesson_id,
+            'title': title,
+            'sections': [section.to_toc_entry() for section in sections],
+            'wordCount': word_count,
+            'readingMinutes': reading_minutes(word_count)
+        })
+        response.set_etag(toc_etag(sections))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@lessons_bp.route('/lessons/<lesson_id>/sections/<anchor>', methods=['GET'])
+def get_lesson_section(lesson_id, anchor):
+    """Get one section of a lesson by anchor; its ETag changes only when that section does"""
+    try:
+        section = db.session.get(LessonSection, (lesson_id, anchor))
+        if section is None:
+            return jsonify({'error': 'Section not found'}), 404
+        response = jsonify(section.to_dict())
+        response.set_etag(section.content_hash)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @lessons_bp.route('/lessons', methods=['POST'])
 def create_lesson():
     """Create a new lesson"""
     try:
         data = request.get_json()
+        prerequisites = data.get('prerequisites', [])
+        if not isinstance(prerequisites, list) or not all(isinstance(p, str) for p in prerequisites):
+            return jsonify({'error': 'prerequisites must be a list of lesson ids'}), 400
+        check_prerequisites(data['id'], prerequisites)
         
         lesson = Lesson(
             id=data['id'],
@@ -36,7 +96,7 @@ def create_lesson():
             content=data['content'],
             duration=data['duration'],
             difficulty=data['difficulty'],
-            prerequisites=json.dumps(data.get('prerequisites', [])),
+            prerequisites=prerequisites,
             order_index=data['orderIndex']
         )
         
@@ -44,42 +104,122 @@ def create_lesson():
         db.session.commit()
         
         return jsonify(lesson.to_dict()), 201
+    except PrerequisiteCycle as e:
+        return jsonify({'error': str(e), 'cycle': e.cycle}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@lessons_bp.route('/lessons/progress', methods=['POST'])
 @lessons_bp.route('/lessons/<lesson_id>/progress', methods=['POST'])
-def update_lesson_progress():
+def update_lesson_progress(lesson_id=None):
     """Update user progress for a lesson"""
     try:
-        data = request.get_json()
-        lesson_id = data['lessonId']
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        # The lesson in the URL always wins; the body names it only on /lessons/progress
+        if lesson_id is None:
+            lesson_id = data.get('lessonId')
+            if not isinstance(lesson_id, str) or not lesson_id:
+                return jsonify({'error': 'lessonId must be a non-empty string'}), 400
         user_id = data.get('userId', 'anonymous')
-        progress_percentage = data.get('progressPercentage', 0)
-        completed = data.get('completed', False)
+        if not isinstance(user_id, str) or not user_id:
+            return jsonify({'error': 'userId must be a non-empty string'}), 400
+        progress_percentage = _clamped_percentage(data.get('progressPercentage', 0))
+        if progress_percentage is None:
+            return jsonify({'error': 'progressPercentage must be an integer'}), 400
+        completed = bool(data.get('completed', False))
         
-        # Find existing progress or create new
-        progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            lesson_id=lesson_id
-        ).first()
-        
-        if not progress:
-            progress = UserProgress(
-                user_id=user_id,
-                lesson_id=lesson_id
-            )
-            db.session.add(progress)
+        # Create the row if it is missing. Being a write, this also takes
+        # SQLite's write lock, so the row read next cannot change before commit
+        table = UserProgress.__table__
+        created = db.session.execute(
+            insert(table).values(user_id=user_id, lesson_id=lesson_id, completed=False, progress_percentage=0)
+            .on_conflict_do_nothing(index_elements=[table.c.user_id, table.c.lesson_id])
+            .returning(table.c.id)
+        ).first() is not None
+        progress = db.session.execute(_progress_row_query(user_id, lesson_id)).scalar_one()
+        started = int(created)
+        old_percentage, old_completed = progress.progress_percentage or 0, bool(progress.completed)
         
+        # Like the batch route: progress never goes backwards and the first
+        # completion time is kept
+        progress_percentage = max(progress_percentage, old_percentage)
+        completed = completed or old_completed
         progress.progress_percentage = progress_percentage
         progress.completed = completed
         
         if completed and not progress.completed_at:
             progress.completed_at = datetime.utcnow()
         
+        # Keep the materialized summary in step, in the same transaction
+        apply_progress_delta(
+            user_id,
+            started=started,
+            completed=int(completed) - int(old_completed),
+            progress=progress_percentage - old_percentage
+        )
         db.session.commit()
         
         return jsonify(progress.to_dict())
     except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@lessons_bp.route('/users/<user_id>/progress/batch', methods=['POST'])
+def update_lesson_progress_batch(user_id):
+    """Apply many progress updates for a user in one atomic upsert"""
+    try:
+        data = request.get_json()
+        updates = data.get('updates') if isinstance(data, dict) else data
+        if not isinstance(updates, list) or not updates:
+            return jsonify({'error': 'updates must be a non-empty list'}), 400
+        if len(updates) > MAX_PROGRESS_BATCH:
+            return jsonify({'error': f'At most {MAX_PROGRESS_BATCH} updates per batch'}), 400
+        
+        now = datetime.utcnow()
+        rows = []
+        for update in updates:
+            if not isinstance(update, dict) or not isinstance(update.get('lessonId'), str):
+                return jsonify({'error': 'Each update needs a lessonId'}), 400
+            percentage = _clamped_percentage(update.get('progressPercentage', 0))
+            if percentage is None:
+                return jsonify({'error': 'progressPercentage must be an integer'}), 400
+            completed = bool(update.get('completed', False))
+            rows.append({
+                'user_id': user_id,
+                'lesson_id': update['lessonId'],
+                'progress_percentage': percentage,
+                'completed': completed,
+                'completed_at': now if completed else None
+            })
+        
+        # Progress never goes backwards and the first completion time is kept
+        table = UserProgress.__table__
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.lesson_id],
+            set_={
+                'progress_percentage': db.func.max(table.c.progress_percentage, statement.excluded.progress_percentage),
+                'completed': db.func.max(table.c.completed, statement.excluded.completed),
+                'completed_at': db.func.coalesce(table.c.completed_at, statement.excluded.completed_at)
+            }
+        ).returning(*table.c)
+        
+        written = db.session.execute(statement).all()
+        refresh_summary(user_id)
+        db.session.commit()
+        
+        return jsonify([{
+            'id': row.id,
+            'userId': row.user_id,
+            'lessonId': row.lesson_id,
+            'completed': bool(row.completed),
+            'progressPercentage': row.progress_percentage,
+            'completedAt': row.completed_at.isoformat() if row.completed_at else None
+        } for row in written])
+    except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @lessons_bp.route('/users/<user_id>/progress', methods=['GET'])
@@ -95,22 +235,15 @@ def get_user_progress(user_id):
 def get_user_progress_summary(user_id):
     """Get progress summary for a user"""
     try:
-        total_lessons = Lesson.query.count()
-        completed_lessons = UserProgress.query.filter_by(
-            user_id=user_id,
-            completed=True
-        ).count()
-        
-        progress_records = UserProgress.query.filter_by(user_id=user_id).all()
-        total_progress = sum(p.progress_percentage for p in progress_records)
-        average_progress = total_progress / max(total_lessons, 1)
-        
-        return jsonify({
-            'totalLessons': total_lessons,
-            'completedLessons': completed_lessons,
-            'averageProgress': average_progress,
-            'completionRate': (completed_lessons / max(total_lessons, 1)) * 100
-        })
+        return jsonify(get_summary(user_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@lessons_bp.route('/users/<user_id>/lessons/unlocked', methods=['GET'])
+def get_unlocked_lessons(user_id):
+    """Get a user's completed, unlocked and locked lessons and the next one to take"""
+    try:
+        return jsonify(lesson_status(user_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,115 @@
+"""
+Column-level projections and keyset pagination for catalog list routes.
+
+``?view=summary`` selects only a model's ``SUMMARY_FIELDS`` and
+``?fields=a,b`` selects an explicit set of API fields, both at the SQL
+column level. ``?limit=`` / ``?cursor=`` switch the response to a page
+envelope ``{"items": [...], "nextCursor": ...}`` where the cursor encodes
+the sort key of the last row, so every page is an index range scan.
+"""
+import base64
+import json
+
+from src.models.serialization import RawJSON, raw_json
+from src.models.user import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class ListArgsError(ValueError):
+    """Raised for malformed list query parameters (reported as 400)"""
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except ValueError:
+        raise ListArgsError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ListArgsError('Invalid cursor')
+    return values
+
+
+def requested_fields(model, args):
+    """API fields to return, or None for every field"""
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in model.API_FIELDS]
+        if unknown:
+            raise ListArgsError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+    if args.get('view') == 'summary':
+        return list(model.SUMMARY_FIELDS)
+    if args.get('view') not in (None, 'full'):
+        raise ListArgsError('view must be "summary" or "full"')
+    return None
+
+
+def page_size(args):
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ListArgsError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def serialize_row(model, row, fields):
+    item = {}
+    for field in fields:
+        value = row._mapping[field]
+        if field in model.JSON_FIELDS:
+            # Stored JSON text goes into the response as-is
+            value = RawJSON(value or '[]')
+        elif hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        item[field] = value
+    return item
+
+
+def _column(model, field):
+    column = getattr(model, model.API_FIELDS[field])
+    if field in model.JSON_FIELDS:
+        return raw_json(column, field)
+    return column.label(field)
+
+
+def list_items(model, order_by, args):
+    """
+    List ``model`` rows ordered by the ``order_by`` columns (which must end
+    in a unique column), honoring the projection and pagination arguments.
+    Returns a list, or a page envelope when ``limit``/``cursor`` is given;
+    JSON columns come back as ``RawJSON`` for ``serialization.dumps``.
+    """
+    fields = requested_fields(model, args) or list(model.API_FIELDS)
+    paginated = 'limit' in args or 'cursor' in args
+
+    # Sort columns are always selected so the next cursor can be built
+    columns = [_column(model, field) for field in fields]
+    columns += [column.label(f'_sort_{index}') for index, column in enumerate(order_by)]
+    query = db.select(*columns).order_by(*order_by)
+
+    if args.get('cursor'):
+        after = decode_cursor(args['cursor'], len(order_by))
+        query = query.where(db.tuple_(*order_by) > db.tuple_(*after))
+
+    limit = page_size(args) if paginated else None
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    items = [serialize_row(model, row, fields) for row in rows[:limit]]
+    if not paginated:
+        return items
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]._mapping
+        next_cursor = encode_cursor([last[f'_sort_{index}'] for index in range(len(order_by))])
+    return {'items': items, 'nextCursor': next_cursor}
@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.services.response_cache import cached_content
+from src.services.search_index import DEFAULT_LIMIT, MAX_LIMIT, SearchQueryError, rebuild_index, search
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/search', methods=['GET'])
+@cached_content('lesson', 'challenge')
+def search_content():
+    """Ranked full-text search over lessons and challenges"""
+    try:
+        query = request.args.get('q', '')
+        kinds = request.args.get('type', 'lesson,challenge').split(',')
+        if any(kind not in ('lesson', 'challenge') for kind in kinds):
+            raise SearchQueryError('type must be lesson and/or challenge')
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+        except ValueError:
+            raise SearchQueryError('limit must be an integer')
+        return jsonify({'query': query, 'results': search(query, kinds, limit)})
+    except SearchQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search_bp.cli.command('reindex')
+def reindex_command():
+    """Rebuild the search index from all lessons and challenges"""
+    with db.engine.begin() as connection:
+        rebuild_index(connection)
+    print('Search index rebuilt')
@@ -4,12 +4,12 @@ Seed script to populate the database with sample lessons and challenges
 """
 import os
 import sys
-import json
 
 # Add the project root to the path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.main import app, db
+from src.migrations import migrate
 from src.models.lesson import Lesson
 from src.models.challenge import Challenge
 
@@ -159,7 +159,7 @@ function Counter() {
             content=lesson_data['content'],
             duration=lesson_data['duration'],
             difficulty=lesson_data['difficulty'],
-            prerequisites=json.dumps(lesson_data['prerequisites']),
+            prerequisites=lesson_data['prerequisites'],
             order_index=lesson_data['order_index']
         )
         db.session.add(lesson)
@@ -288,10 +288,10 @@ export default Counter;''',
             description=challenge_data['description'],
             starter_code=challenge_data['starter_code'],
             solution=challenge_data['solution'],
-            tests=json.dumps(challenge_data['tests']),
-            hints=json.dumps(challenge_data['hints']),
+            tests=challenge_data['tests'],
+            hints=challenge_data['hints'],
             difficulty=challenge_data['difficulty'],
-            tags=json.dumps(challenge_data['tags'])
+            tags=challenge_data['tags']
         )
         db.session.add(challenge)
     
@@ -303,7 +303,7 @@ def main():
     with app.app_context():
         print("🌱 Seeding database with sample data...")
         # Create all tables first
-        db.create_all()
+        migrate(app)
         print("📊 Database tables created")
         seed_lessons()
         seed_challenges()
@@ -0,0 +1,186 @@
+"""
+Asyncio client for the Node.js test workers, used when serving over ASGI.
+
+Speaks the same line protocol to the same ``node_worker.js`` as
+``NodeWorkerPool``, with the same rules (one job per process, a ping before
+a started worker is used, the same command line and deadlines), but on
+``asyncio`` subprocess pipes: a job waiting for a worker or for its results
+holds a suspended coroutine on the event loop rather than a thread.
+"""
+import asyncio
+import itertools
+import json
+import time
+
+from src.services.node_pool import (
+    PING_TIMEOUT, STARTUP_TIMEOUT, WorkerTimeout, build_job, job_deadline, ordered_results, worker_command
+)
+
+LINE_LIMIT = 16 * 1024 * 1024  # longest result line accepted from a worker
+
+
+class AsyncNodeWorker:
+    """A single ``node`` process driven through asyncio pipes"""
+
+    def __init__(self, process):
+        self.process = process
+        self.started = time.monotonic()
+
+    @classmethod
+    async def spawn(cls, node_path='node', max_heap_mb=256):
+        process = await asyncio.create_subprocess_exec(
+            *worker_command(node_path, max_heap_mb),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env={},
+            limit=LINE_LIMIT
+        )
+        return cls(process)
+
+    def is_alive(self):
+        return self.process.returncode is None
+
+    async def _send(self, message):
+        self.process.stdin.write((json.dumps(message) + '\n').encode('utf-8'))
+        await self.process.stdin.drain()
+
+    async def _next_message(self, message_id, deadline):
+        """The next message answering ``message_id``, before ``deadline``"""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout()
+            try:
+                line = await asyncio.wait_for(self.process.stdout.readline(), remaining)
+            except asyncio.TimeoutError:
+                raise WorkerTimeout()
+            if not line:
+                raise RuntimeError('Node worker exited unexpectedly')
+            message = json.loads(line)
+            if message.get('id') == message_id:
+                return message
+
+    async def ping(self):
+        """Whether the worker answers a ping in time; a new process also gets time to start"""
+        deadline = max(time.monotonic() + PING_TIMEOUT, self.started + STARTUP_TIMEOUT)
+        try:
+            await self._send({'id': 'ping', 'type': 'ping'})
+            message = await self._next_message('ping', deadline)
+        except (OSError, ValueError, RuntimeError, WorkerTimeout):
+            return False
+        return message['type'] == 'pong'
+
+    async def run(self, job, deadline, results, on_result=None):
+        """Send a job and collect per-test results into ``results`` until ``done``"""
+        await self._send(job)
+        while True:
+            message = await self._next_message(job['id'], deadline)
+            if message['type'] == 'result':
+                results[message['index']] = message['result']
+                if on_result:
+                    on_result(message['index'], message['result'])
+            elif message['type'] == 'done':
+                return
+
+    async def kill(self):
+        if self.is_alive():
+            self.process.kill()
+        try:
+            await asyncio.wait_for(self.process.wait(), 1)
+        except asyncio.TimeoutError:
+            pass
+
+
+class AsyncNodeWorkerPool:
+    """Up to ``size`` single-job Node workers for coroutines on one event loop"""
+
+    def __init__(self, size=4, test_timeout=5.0, isolation='shared', node_path='node', max_heap_mb=256):
+        self.size = size
+        self.test_timeout = test_timeout
+        self.isolation = isolation
+        self.node_path = node_path
+        self.max_heap_mb = max_heap_mb
+        self._idle = []  # started workers that have not run a job, newest last
+        self._live = 0
+        self._slots = asyncio.Semaphore(size)
+        self._job_ids = itertools.count(1)
+        self._closed = False
+
+    async def _spawn(self):
+        self._live += 1
+        try:
+            return await AsyncNodeWorker.spawn(self.node_path, self.max_heap_mb)
+        except BaseException:
+            self._live -= 1
+            raise
+
+    async def _acquire(self):
+        while True:
+            worker = self._idle.pop() if self._idle else await self._spawn()
+            if await worker.ping():
+                return worker
+            await self._discard(worker)
+
+    async def _discard(self, worker):
+        self._live -= 1
+        await worker.kill()
+
+    async def _replenish(self):
+        # Start the next job's worker now, so that it does not wait for node to boot
+        if self._closed or self._live >= self.size:
+            return
+        try:
+            self._idle.append(await self._spawn())
+        except Exception:
+            pass
+
+    async def run(self, code, tests, on_result=None, isolation=None):
+        """Same contract as ``NodeWorkerPool.run``, awaited instead of blocking"""
+        job = build_job(next(self._job_ids), code, tests, self.test_timeout, isolation or self.isolation)
+
+        results = {}
+        # Holding a slot is what bounds the number of running workers
+        async with self._slots:
+            worker = await self._acquire()
+            deadline = job_deadline(tests, self.test_timeout)
+            try:
+                await worker.run(job, deadline, results, on_result)
+                timed_out = False
+            except WorkerTimeout:
+                timed_out = True
+            finally:
+                # Never reused: the worker may still be running the submission's code
+                await self._discard(worker)
+                await self._replenish()
+        return ordered_results(tests, results, timed_out, on_result)
+
+    async def shutdown(self):
+        self._closed = True
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+
+_pool = None
+
+
+def get_async_pool(config=None):
+    """Return the process-wide async pool, creating it on first use (on the event loop's thread)"""
+    global _pool
+    if _pool is None:
+        config = config or {}
+        _pool = AsyncNodeWorkerPool(
+            size=config.get('NODE_POOL_SIZE', 4),
+            test_timeout=config.get('NODE_TEST_TIMEOUT', 5.0),
+            isolation=config.get('NODE_TEST_ISOLATION', 'shared'),
+            node_path=config.get('NODE_PATH', 'node'),
+            max_heap_mb=config.get('NODE_WORKER_MAX_HEAP_MB', 256)
+        )
+    return _pool
+
+
+async def shutdown_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.shutdown()
+        _pool = None
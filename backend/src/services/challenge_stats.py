@@ -0,0 +1,199 @@
+"""
+Per-challenge submission analytics, maintained incrementally.
+
+Every saved submission adds itself to three aggregate tables in the same
+transaction: the user's row for the challenge (``UserChallengeStats``),
+the challenge's totals (``ChallengeStats``) and one row per test
+(``ChallengeTestStats``). Whether the submission is the user's first
+attempt or first pass comes back from the user row's UPSERT, so the
+challenge totals never have to look at other submissions. Analytics reads
+touch only these tables, whatever the number of submissions.
+``rebuild_stats`` recomputes all three from the submission history.
+"""
+import json
+from collections import defaultdict
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.blob import decode_payload
+from src.models.challenge import db, Challenge, ChallengeStats, ChallengeTestStats, UserChallengeStats
+
+
+def record_submission(submission, test_results):
+    """Add a flushed submission to the aggregates; commits with the caller's session"""
+    passed = bool(submission.passed)
+    submitted_at = submission.submitted_at
+
+    users = UserChallengeStats.__table__
+    statement = insert(users).values(
+        user_id=submission.user_id,
+        challenge_id=submission.challenge_id,
+        attempts=1,
+        passes=int(passed),
+        first_attempt_at=submitted_at,
+        first_pass_at=submitted_at if passed else None,
+        attempts_to_first_pass=1 if passed else None,
+        last_submitted_at=submitted_at
+    )
+    # SET expressions all see the row as it was before the update
+    attempts, first_attempt_at, first_pass_at, attempts_to_first_pass = db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[users.c.user_id, users.c.challenge_id],
+            set_={
+                'attempts': users.c.attempts + 1,
+                'passes': users.c.passes + statement.excluded.passes,
+                'first_pass_at': db.func.coalesce(users.c.first_pass_at, statement.excluded.first_pass_at),
+                'attempts_to_first_pass': db.func.coalesce(
+                    users.c.attempts_to_first_pass,
+                    db.case((statement.excluded.passes > 0, users.c.attempts + 1))
+                ),
+                'last_submitted_at': statement.excluded.last_submitted_at
+            }
+        ).returning(users.c.attempts, users.c.first_attempt_at, users.c.first_pass_at,
+                    users.c.attempts_to_first_pass)
+    ).one()
+    first_pass = passed and attempts_to_first_pass == attempts
+    seconds_to_pass = (first_pass_at - first_attempt_at).total_seconds() if first_pass and first_attempt_at else 0
+
+    challenges = ChallengeStats.__table__
+    statement = insert(challenges).values(
+        challenge_id=submission.challenge_id,
+        attempts=1,
+        passes=int(passed),
+        users_attempted=int(attempts == 1),
+        users_passed=int(first_pass),
+        first_pass_seconds=seconds_to_pass,
+        first_pass_attempts=attempts if first_pass else 0,
+        last_submitted_at=submitted_at
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[challenges.c.challenge_id],
+        set_={
+            **{name: challenges.c[name] + statement.excluded[name] for name in (
+                'attempts', 'passes', 'users_attempted', 'users_passed',
+                'first_pass_seconds', 'first_pass_attempts'
+            )},
+            'last_submitted_at': statement.excluded.last_submitted_at
+        }
+    ))
+
+    if test_results:
+        tests = ChallengeTestStats.__table__
+        statement = insert(tests)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[tests.c.challenge_id, tests.c.test_index],
+            set_={
+                'description': statement.excluded.description,
+                'runs': tests.c.runs + statement.excluded.runs,
+                'failures': tests.c.failures + statement.excluded.failures
+            }
+        ), [{
+            'challenge_id': submission.challenge_id,
+            'test_index': index,
+            'description': result.get('description') or '',
+            'runs': 1,
+            'failures': int(not result.get('passed'))
+        } for index, result in enumerate(test_results)])
+
+
+def _rebuild_test_stats(connection):
+    # Results are deduplicated, so each distinct results blob is decoded once
+    # and weighted by the number of submissions that share it
+    rows = connection.execute(text('''
+        SELECT s.challenge_id, COUNT(*), MAX(s.submitted_at), b.encoding, b.data
+        FROM challenge_submission s
+        JOIN submission_blob b ON b.hash = s.results_hash
+        WHERE s.challenge_id IN (SELECT id FROM challenge)
+        GROUP BY s.challenge_id, s.results_hash
+    '''))
+    stats = defaultdict(lambda: {'runs': 0, 'failures': 0, 'description': '', 'seen': ''})
+    for challenge_id, count, submitted_at, encoding, data in rows:
+        for index, result in enumerate(json.loads(decode_payload(encoding, data))):
+            entry = stats[challenge_id, index]
+            entry['runs'] += count
+            entry['failures'] += count * int(not result.get('passed'))
+            if (submitted_at or '') >= entry['seen']:
+                entry['description'], entry['seen'] = result.get('description') or '', submitted_at or ''
+    if stats:
+        connection.execute(ChallengeTestStats.__table__.insert(), [{
+            'challenge_id': challenge_id,
+            'test_index': index,
+            'description': entry['description'],
+            'runs': entry['runs'],
+            'failures': entry['failures']
+        } for (challenge_id, index), entry in stats.items()])
+    return len(stats)
+
+
+def rebuild_stats(connection):
+    """Recompute every aggregate from the submission history; returns row counts"""
+    for model in (ChallengeTestStats, ChallengeStats, UserChallengeStats):
+        connection.execute(model.__table__.delete())
+    connection.execute(text('''
+        INSERT INTO user_challenge_stats (user_id, challenge_id, attempts, passes, first_attempt_at,
+                                          first_pass_at, attempts_to_first_pass, last_submitted_at)
+        SELECT user_id, challenge_id, COUNT(*), SUM(passed), MIN(submitted_at),
+               MIN(CASE WHEN passed THEN submitted_at END), MIN(CASE WHEN passed THEN attempt END),
+               MAX(submitted_at)
+        FROM (
+            SELECT user_id, challenge_id, passed, submitted_at,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, challenge_id ORDER BY submitted_at, id) AS attempt
+            FROM challenge_submission
+            WHERE challenge_id IN (SELECT id FROM challenge)
+        )
+        GROUP BY user_id, challenge_id
+    '''))
+    connection.execute(text('''
+        INSERT INTO challenge_stats (challenge_id, attempts, passes, users_attempted, users_passed,
+                                     first_pass_seconds, first_pass_attempts, last_submitted_at)
+        SELECT challenge_id, SUM(attempts), SUM(passes), COUNT(*), COUNT(first_pass_at),
+               COALESCE(SUM((julianday(first_pass_at) - julianday(first_attempt_at)) * 86400), 0),
+               COALESCE(SUM(attempts_to_first_pass), 0), MAX(last_submitted_at)
+        FROM user_challenge_stats
+        GROUP BY challenge_id
+    '''))
+    tests = _rebuild_test_stats(connection)
+    challenges, user_challenges = (
+        connection.execute(db.select(db.func.count()).select_from(model)).scalar()
+        for model in (ChallengeStats, UserChallengeStats)
+    )
+    return {'challenges': challenges, 'userChallenges': user_challenges, 'tests': tests}
+
+
+def _empty_stats(challenge_id):
+    return ChallengeStats(challenge_id=challenge_id, attempts=0, passes=0, users_attempted=0, users_passed=0,
+                          first_pass_seconds=0, first_pass_attempts=0)
+
+
+def challenge_analytics(challenge_id, user_id=None):
+    """Aggregates for one challenge (and optionally one user), or None for an unknown challenge"""
+    stats = db.session.get(ChallengeStats, challenge_id)
+    if stats is None:
+        if db.session.execute(db.select(Challenge.id).where(Challenge.id == challenge_id)).scalar() is None:
+            return None
+        stats = _empty_stats(challenge_id)
+    tests = db.session.execute(
+        db.select(ChallengeTestStats)
+        .where(ChallengeTestStats.challenge_id == challenge_id)
+        .order_by(ChallengeTestStats.test_index)
+    ).scalars().all()
+    result = stats.to_dict()
+    result['tests'] = [test.to_dict() for test in tests]
+    if user_id is not None:
+        user_stats = db.session.get(UserChallengeStats, (user_id, challenge_id))
+        result['user'] = user_stats.to_dict() if user_stats else None
+    return result
+
+
+def analytics_overview():
+    """Totals for every challenge, read from ChallengeStats only"""
+    rows = db.session.execute(
+        db.select(Challenge.id, Challenge.title, Challenge.difficulty, ChallengeStats)
+        .outerjoin(ChallengeStats, ChallengeStats.challenge_id == Challenge.id)
+        .order_by(Challenge.id)
+    ).all()
+    return [
+        dict((stats or _empty_stats(challenge_id)).to_dict(), title=title, difficulty=difficulty)
+        for challenge_id, title, difficulty, stats in rows
+    ]
@@ -0,0 +1,105 @@
+"""
+Single-request dashboard bootstrap.
+
+The lesson and challenge catalogs are the same for every user, so their
+summary views are serialized once per content version and spliced into
+each response. The per-user part costs two indexed queries: the user's
+progress rows (from which the summary stats and unlocked lessons are also
+derived) and one grouped read of their submissions.
+"""
+import threading
+
+from src.models.challenge import db, Challenge, ChallengeSubmission
+from src.models.lesson import Lesson, UserProgress
+from src.models.serialization import RawJSON, dumps
+from src.routes.listing import list_items
+from src.services.lesson_graph import get_graph
+from src.services.response_cache import content_version
+
+_catalog = (None, None)  # (content version, {'lessons': RawJSON, 'challenges': RawJSON, 'lessonCount': int})
+_catalog_lock = threading.Lock()
+
+
+def catalog():
+    global _catalog
+    version = content_version('lesson', 'challenge')
+    cached_version, value = _catalog
+    if cached_version != version:
+        lessons = list_items(Lesson, [Lesson.order_index, Lesson.id], {'view': 'summary'})
+        challenges = list_items(Challenge, [Challenge.id], {'view': 'summary'})
+        value = {
+            'lessons': RawJSON(dumps(lessons)),
+            'challenges': RawJSON(dumps(challenges)),
+            'lessonCount': len(lessons),
+        }
+        with _catalog_lock:
+            _catalog = (version, value)
+    return value
+
+
+def challenge_status_query(user_id):
+    return db.select(
+        ChallengeSubmission.challenge_id,
+        db.func.count(),
+        db.func.max(ChallengeSubmission.passed),
+        db.func.max(ChallengeSubmission.submitted_at)
+    ).where(ChallengeSubmission.user_id == user_id).group_by(ChallengeSubmission.challenge_id)
+
+
+def progress_query(user_id):
+    return db.select(
+        UserProgress.lesson_id,
+        UserProgress.completed,
+        UserProgress.progress_percentage,
+        UserProgress.completed_at
+    ).where(UserProgress.user_id == user_id)
+
+
+def challenge_status(user_id):
+    """{challenge id: attempts, whether any passed, last attempt} for one user's submissions"""
+    rows = db.session.execute(challenge_status_query(user_id)).all()
+    return {
+        challenge_id: {
+            'attempts': attempts,
+            'passed': bool(passed),
+            'lastSubmittedAt': submitted_at.isoformat() if submitted_at else None
+        }
+        for challenge_id, attempts, passed, submitted_at in rows
+    }
+
+
+def bootstrap(user_id):
+    content = catalog()
+    progress_rows = db.session.execute(progress_query(user_id)).all()
+
+    progress = {}
+    completed_ids = []
+    total_progress = 0
+    for lesson_id, completed, percentage, completed_at in progress_rows:
+        progress[lesson_id] = {
+            'completed': bool(completed),
+            'progressPercentage': percentage or 0,
+            'completedAt': completed_at.isoformat() if completed_at else None
+        }
+        total_progress += percentage or 0
+        if completed:
+            completed_ids.append(lesson_id)
+
+    # Same figures as /progress/summary, taken from the rows already loaded
+    total_lessons = content['lessonCount']
+    status = get_graph().status(completed_ids)
+    return {
+        'userId': user_id,
+        'lessons': content['lessons'],
+        'challenges': content['challenges'],
+        'progress': progress,
+        'summary': {
+            'totalLessons': total_lessons,
+            'completedLessons': len(completed_ids),
+            'averageProgress': total_progress / max(total_lessons, 1),
+            'completionRate': (len(completed_ids) / max(total_lessons, 1)) * 100
+        },
+        'unlockedLessons': status['unlocked'],
+        'nextLesson': status['next'],
+        'challengeStatus': challenge_status(user_id),
+    }
@@ -0,0 +1,200 @@
+"""
+Lesson prerequisite graph.
+
+The ``prerequisites`` lists of all lessons are compiled once into a DAG:
+lessons in topological order (ties broken by ``order_index``), each with
+its direct prerequisites and the transitive closure of its prerequisites
+as integer bitsets over that order. The graph is rebuilt only when the
+content version changes, so a user's unlocked lessons are computed from
+one progress query and a pass of bitwise checks.
+"""
+import heapq
+import logging
+import threading
+
+from src.models.lesson import db, Lesson, UserProgress
+from src.services.response_cache import content_version
+
+logger = logging.getLogger(__name__)
+
+
+class PrerequisiteCycle(ValueError):
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__(f"Prerequisites form a cycle: {' -> '.join(cycle)}")
+
+
+def _topological_order(nodes, edges):
+    """
+    Kahn's algorithm over ``nodes`` (id -> sort key), where ``edges`` maps
+    a lesson to its prerequisites. Returns (order, ids left in cycles).
+    """
+    dependents = {node: [] for node in nodes}
+    waiting = {}
+    for node in nodes:
+        prerequisites = [p for p in edges.get(node, ()) if p in nodes]
+        waiting[node] = len(prerequisites)
+        for prerequisite in prerequisites:
+            dependents[prerequisite].append(node)
+
+    ready = [(nodes[node], node) for node, count in waiting.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        _, node = heapq.heappop(ready)
+        order.append(node)
+        for dependent in dependents[node]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, (nodes[dependent], dependent))
+    remaining = [node for node, count in waiting.items() if count > 0]
+    return order, remaining
+
+
+def find_cycle(nodes, edges):
+    """Return one prerequisite cycle as a list of ids, or None"""
+    _, remaining = _topological_order(nodes, edges)
+    if not remaining:
+        return None
+    # Every leftover node has a leftover prerequisite; walk until one repeats
+    left = set(remaining)
+    path, seen = [], {}
+    node = min(remaining)
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = min(p for p in edges[node] if p in left)
+    return path[seen[node]:] + [node]
+
+
+class LessonGraph:
+    def __init__(self, rows):
+        nodes = {row.id: (row.order_index, row.id) for row in rows}
+        edges = {row.id: list(row.prerequisites or []) for row in rows}
+        order, remaining = _topological_order(nodes, edges)
+        if remaining:
+            # Writes are checked for cycles, but rows predating the checks may
+            # still form one; those lessons stay locked until completed some other way
+            logger.warning('Lesson prerequisites contain a cycle: %s', find_cycle(nodes, edges))
+            order.extend(sorted(remaining, key=nodes.get))
+
+        self.order = order
+        self.index = {lesson_id: position for position, lesson_id in enumerate(order)}
+        self.direct = []     # bitset of direct prerequisites, by position
+        self.ancestors = []  # bitset of all transitive prerequisites, by position
+        for lesson_id in order:
+            direct = 0
+            ancestors = 0
+            for prerequisite in edges[lesson_id]:
+                position = self.index.get(prerequisite)
+                if position is None:
+                    continue  # unknown lesson: nothing to wait for
+                direct |= 1 << position
+                if position < len(self.ancestors):
+                    ancestors |= self.ancestors[position]
+            self.direct.append(direct)
+            self.ancestors.append(ancestors | direct)
+
+    def mask(self, lesson_ids):
+        bits = 0
+        for lesson_id in lesson_ids:
+            position = self.index.get(lesson_id)
+            if position is not None:
+                bits |= 1 << position
+        return bits
+
+    def ids(self, bits):
+        return [self.order[position] for position in range(bits.bit_length()) if bits >> position & 1]
+
+    def status(self, completed_ids):
+        """Split lessons into completed, unlocked and locked for a set of completed ids"""
+        completed = self.mask(completed_ids)
+        result = {'completed': [], 'unlocked': [], 'locked': [], 'next': None}
+        for position, lesson_id in enumerate(self.order):
+            if completed >> position & 1:
+                result['completed'].append(lesson_id)
+                continue
+            missing = self.direct[position] & ~completed
+            if not missing:
+                result['unlocked'].append(lesson_id)
+                if result['next'] is None:
+                    result['next'] = lesson_id
+            else:
+                result['locked'].append({
+                    'id': lesson_id,
+                    'missing': self.ids(missing),
+                    'remaining': (self.ancestors[position] & ~completed).bit_count()
+                })
+        return result
+
+
+_graph = (None, None)  # (content version, graph)
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    global _graph
+    version = content_version('lesson')
+    cached_version, graph = _graph
+    if cached_version != version:
+        rows = db.session.execute(
+            db.select(Lesson.id, Lesson.order_index, Lesson.prerequisites)
+        ).all()
+        graph = LessonGraph(rows)
+        with _graph_lock:
+            _graph = (version, graph)
+    return graph
+
+
+def prerequisite_edges():
+    """{lesson id: prerequisites} for every stored lesson"""
+    rows = db.session.execute(db.select(Lesson.id, Lesson.prerequisites))
+    return {row.id: list(row.prerequisites or []) for row in rows}
+
+
+def cycle_through(edges, lesson_id, prerequisites):
+    """The cycle that giving ``lesson_id`` these prerequisites would close in ``edges``, or None"""
+    # Walk prerequisites depth-first from the new ones; reaching the lesson closes a cycle
+    parents = {}
+    stack = []
+    for prerequisite in prerequisites:
+        if prerequisite not in parents:
+            parents[prerequisite] = lesson_id
+            stack.append(prerequisite)
+    while stack:
+        node = stack.pop()
+        if node == lesson_id:
+            path = [lesson_id]
+            node = parents[lesson_id]
+            while node != lesson_id:
+                path.append(node)
+                node = parents[node]
+            path.append(lesson_id)
+            return path[::-1]
+        for prerequisite in edges.get(node, ()):
+            if prerequisite not in parents:
+                parents[prerequisite] = node
+                stack.append(prerequisite)
+    return None
+
+
+def check_prerequisites(lesson_id, prerequisites):
+    """
+    Raise PrerequisiteCycle if giving this lesson these prerequisites would
+    close a cycle through it; cycles elsewhere in the stored graph are left alone.
+    """
+    cycle = cycle_through(prerequisite_edges(), lesson_id, prerequisites)
+    if cycle:
+        raise PrerequisiteCycle(cycle)
+
+
+def completed_lessons_query(user_id):
+    return db.select(UserProgress.lesson_id).where(
+        UserProgress.user_id == user_id,
+        UserProgress.completed.is_(True)
+    )
+
+
+def lesson_status(user_id):
+    completed_ids = db.session.execute(completed_lessons_query(user_id)).scalars()
+    return get_graph().status(completed_ids)
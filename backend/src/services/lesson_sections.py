@@ -0,0 +1,123 @@
+"""
+Lesson content split into sections at its headings.
+
+Lesson HTML is parsed once, when a lesson is written or imported, into
+``LessonSection`` rows: one per ``<h1>``-``<h3>`` heading, plus one for any
+text before the first heading. Rows are keyed by the section's anchor (a
+slug of its heading) and carry their position, title, word count and a
+content hash, so the table of contents is a single indexed read and every
+section can be fetched and cached on its own. Re-saving a lesson only
+rewrites the sections whose hash or position changed, and a section's ETag
+is its hash, so editing or inserting one section leaves the others' keys
+and caches valid.
+"""
+import hashlib
+import re
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.lesson import db, Lesson, LessonSection
+from src.services.search_index import strip_html
+
+INTRO_TITLE = 'Introduction'
+
+_heading = re.compile(r'<h([1-3])\b[^>]*>(.*?)</h\1\s*>', re.IGNORECASE | re.DOTALL)
+_slug = re.compile(r'[^a-z0-9]+')
+
+
+def _anchor(title, used):
+    base = _slug.sub('-', title.lower()).strip('-')[:80] or 'section'
+    anchor, suffix = base, 2
+    while anchor in used:
+        anchor, suffix = f'{base}-{suffix}', suffix + 1
+    used.add(anchor)
+    return anchor
+
+
+def split_sections(html):
+    """Split lesson HTML into a list of section column dicts, in order"""
+    html = html or ''
+    headings = list(_heading.finditer(html))
+    bounds = []
+    if not headings or html[:headings[0].start()].strip():
+        bounds.append((0, INTRO_TITLE, 0))
+    for match in headings:
+        bounds.append((match.start(), strip_html(match.group(2)) or INTRO_TITLE, int(match.group(1))))
+
+    sections, used = [], set()
+    for position, (start, title, level) in enumerate(bounds):
+        end = bounds[position + 1][0] if position + 1 < len(bounds) else len(html)
+        body = html[start:end].strip()
+        anchor = _anchor(title, used)
+        sections.append({
+            'position': position,
+            'anchor': anchor,
+            'title': title[:200],
+            'level': level,
+            'html': body,
+            'word_count': len(strip_html(body).split()),
+            'content_hash': hashlib.sha1(f'{anchor}\n{title}\n{body}'.encode('utf-8')).hexdigest(),
+        })
+    return sections
+
+
+def sync_sections(connection, lesson_id, html):
+    """Store a lesson's sections, writing only those whose content or position changed"""
+    table = LessonSection.__table__
+    stored = {
+        row.anchor: (row.position, row.content_hash)
+        for row in connection.execute(
+            db.select(table.c.anchor, table.c.position, table.c.content_hash)
+            .where(table.c.lesson_id == lesson_id)
+        )
+    }
+    sections = split_sections(html)
+    changed = [dict(section, lesson_id=lesson_id) for section in sections
+               if stored.get(section['anchor']) != (section['position'], section['content_hash'])]
+    if changed:
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.lesson_id, table.c.anchor],
+            set_={name: statement.excluded[name] for name in
+                  ('position', 'title', 'level', 'html', 'word_count', 'content_hash')}
+        ), changed)
+    removed = set(stored) - {section['anchor'] for section in sections}
+    if removed:
+        connection.execute(table.delete().where(
+            table.c.lesson_id == lesson_id, table.c.anchor.in_(removed)
+        ))
+    return len(changed)
+
+
+def table_of_contents(lesson_id):
+    """(lesson title, ordered sections) or None for an unknown lesson"""
+    title = db.session.execute(db.select(Lesson.title).where(Lesson.id == lesson_id)).scalar()
+    if title is None:
+        return None
+    sections = db.session.execute(
+        db.select(LessonSection).where(LessonSection.lesson_id == lesson_id).order_by(LessonSection.position)
+    ).scalars().all()
+    return title, sections
+
+
+def toc_etag(sections):
+    digest = hashlib.sha1('\n'.join(section.content_hash for section in sections).encode('ascii'))
+    return digest.hexdigest()
+
+
+@event.listens_for(Lesson, 'after_insert')
+def _split_new_lesson(mapper, connection, target):
+    sync_sections(connection, target.id, target.content)
+
+
+@event.listens_for(Lesson, 'after_update')
+def _resplit_lesson(mapper, connection, target):
+    if db.inspect(target).attrs.content.history.has_changes():
+        sync_sections(connection, target.id, target.content)
+
+
+@event.listens_for(Lesson, 'before_delete')
+def _drop_sections(mapper, connection, target):
+    connection.execute(LessonSection.__table__.delete().where(LessonSection.lesson_id == target.id))
+
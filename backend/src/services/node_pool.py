@@ -0,0 +1,270 @@
+"""
+Pool of Node.js workers used to run challenge tests.
+
+Each worker runs ``node_worker.js`` and accepts jobs (user code + test list)
+as JSON lines on stdin. A worker runs a single job and is then killed, so
+nothing one submission does inside its process can reach the next one; the
+pool keeps idle workers started ahead of time instead, and hands one out
+only after it has answered a ping. Workers run under Node's permission
+model (no file system writes, child processes or worker threads, reads
+limited to the worker script) with an empty environment and a capped heap,
+and a job that overruns its deadline is killed with its worker.
+"""
+import atexit
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), 'node_worker.js')
+
+PING_TIMEOUT = 1.0  # seconds a started worker has to answer a ping
+STARTUP_TIMEOUT = 10.0  # seconds a new process has to start answering
+
+
+class WorkerTimeout(Exception):
+    """Raised when a worker does not answer before the job deadline"""
+
+
+def build_job(job_id, code, tests, test_timeout, isolation):
+    return {
+        'id': job_id,
+        'code': code,
+        'tests': tests,
+        'timeoutMs': int(test_timeout * 1000),
+        'isolation': isolation
+    }
+
+
+def worker_command(node_path='node', max_heap_mb=256):
+    """Command line for one worker process"""
+    return [
+        shutil.which(node_path) or node_path,
+        '--experimental-permission',
+        '--allow-fs-read=' + WORKER_SCRIPT,
+        f'--max-old-space-size={max_heap_mb}',
+        WORKER_SCRIPT
+    ]
+
+
+def job_deadline(tests, test_timeout):
+    # Loading the code and each test get their own budget, plus a little
+    # slack for the round trip
+    return time.monotonic() + test_timeout * (len(tests) + 1) + 1.0
+
+
+def ordered_results(tests, results, timed_out, on_result=None):
+    """Results in test order, with a failure for every test that never reported"""
+    ordered = []
+    for index, test in enumerate(tests):
+        if index in results:
+            ordered.append(results[index])
+            continue
+        result = {
+            'passed': False,
+            'description': test.get('description', ''),
+            'error': 'Test timed out' if timed_out else 'No output from test',
+            'completed': False
+        }
+        if on_result:
+            on_result(index, result)
+        ordered.append(result)
+    return ordered
+
+
+class NodeWorker:
+    """A single ``node`` process speaking the line protocol of node_worker.js"""
+
+    def __init__(self, node_path='node', max_heap_mb=256):
+        self.process = subprocess.Popen(
+            worker_command(node_path, max_heap_mb),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env={},
+            text=True,
+            bufsize=1
+        )
+        self.started = time.monotonic()
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self._reader.start()
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def _send(self, message):
+        self.process.stdin.write(json.dumps(message) + '\n')
+        self.process.stdin.flush()
+
+    def _messages(self, message_id, deadline):
+        """Messages answering ``message_id``, until ``deadline``"""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout()
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise WorkerTimeout()
+            if line is None:
+                raise RuntimeError('Node worker exited unexpectedly')
+            message = json.loads(line)
+            if message.get('id') == message_id:
+                yield message
+
+    def ping(self):
+        """Whether the worker answers a ping in time; a new process also gets time to start"""
+        deadline = max(time.monotonic() + PING_TIMEOUT, self.started + STARTUP_TIMEOUT)
+        try:
+            self._send({'id': 'ping', 'type': 'ping'})
+            for message in self._messages('ping', deadline):
+                return message['type'] == 'pong'
+        except (OSError, ValueError, RuntimeError, WorkerTimeout):
+            return False
+
+    def run(self, job, deadline, results, on_result=None):
+        """Send a job and collect per-test results into ``results`` until ``done``"""
+        self._send(job)
+        for message in self._messages(job['id'], deadline):
+            if message['type'] == 'result':
+                results[message['index']] = message['result']
+                if on_result:
+                    on_result(message['index'], message['result'])
+            elif message['type'] == 'done':
+                return
+
+    def kill(self):
+        if self.is_alive():
+            self.process.kill()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+class NodeWorkerPool:
+    """Up to ``size`` single-job Node workers, started ahead of the jobs that use them"""
+
+    def __init__(self, size=4, test_timeout=5.0, isolation='shared', node_path='node', max_heap_mb=256):
+        self.size = size
+        self.test_timeout = test_timeout
+        self.isolation = isolation
+        self.node_path = node_path
+        self.max_heap_mb = max_heap_mb
+        self._idle = queue.LifoQueue()
+        self._spawned = 0
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._closed = False
+
+    def _take(self):
+        # Prefer a started worker, then a free slot; poll so that a waiter
+        # also notices a slot freed up by a finished job
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                can_spawn = self._spawned < self.size
+                if can_spawn:
+                    self._spawned += 1
+            if can_spawn:
+                break
+            try:
+                return self._idle.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        try:
+            return NodeWorker(self.node_path, self.max_heap_mb)
+        except Exception:
+            with self._lock:
+                self._spawned -= 1
+            raise
+
+    def _acquire(self):
+        while True:
+            worker = self._take()
+            if worker.ping():
+                return worker
+            self._discard(worker)
+
+    def _discard(self, worker):
+        worker.kill()
+        with self._lock:
+            self._spawned -= 1
+
+    def _replenish(self):
+        # Start the next job's worker now, so that it does not wait for node to boot
+        with self._lock:
+            if self._closed or self._spawned >= self.size:
+                return
+            self._spawned += 1
+        try:
+            self._idle.put(NodeWorker(self.node_path, self.max_heap_mb))
+        except Exception:
+            with self._lock:
+                self._spawned -= 1
+
+    def run(self, code, tests, on_result=None, isolation=None):
+        """
+        Run every test against ``code`` in one batched job and return the
+        results in test order. ``isolation`` is ``'shared'`` (evaluate the code
+        once for all tests) or ``'per-test'`` (fresh context per test).
+        """
+        job = build_job(next(self._job_ids), code, tests, self.test_timeout, isolation or self.isolation)
+
+        results = {}
+        worker = self._acquire()
+        deadline = job_deadline(tests, self.test_timeout)
+        try:
+            worker.run(job, deadline, results, on_result)
+            timed_out = False
+        except WorkerTimeout:
+            timed_out = True
+        finally:
+            # Never reused: the worker may still be running the submission's code
+            self._discard(worker)
+            self._replenish()
+        return ordered_results(tests, results, timed_out, on_result)
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(worker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config=None):
+    """Return the process-wide worker pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = config or {}
+                _pool = NodeWorkerPool(
+                    size=config.get('NODE_POOL_SIZE', 4),
+                    test_timeout=config.get('NODE_TEST_TIMEOUT', 5.0),
+                    isolation=config.get('NODE_TEST_ISOLATION', 'shared'),
+                    node_path=config.get('NODE_PATH', 'node'),
+                    max_heap_mb=config.get('NODE_WORKER_MAX_HEAP_MB', 256)
+                )
+                atexit.register(_pool.shutdown)
+    return _pool
@@ -0,0 +1,197 @@
+// Challenge test runner used by src/services/node_pool.py and
+// src/services/async_node_pool.py.
+//
+// Protocol: one JSON message per line on stdin, JSON messages per line on stdout.
+//   job:    {"id": 1, "code": "...", "tests": [...], "timeoutMs": 5000,
+//            "isolation": "shared" | "per-test"}
+//   reply:  {"id": 1, "type": "result", "index": 0, "result": {...}}  (one per test)
+//           {"id": 1, "type": "done"}
+//   ping:   {"id": 2, "type": "ping"}  ->  {"id": 2, "type": "pong"}
+//
+// The user code is compiled once per job. With "shared" isolation it is also
+// evaluated once and every test runs against that single context; with
+// "per-test" isolation each test gets a fresh context. A result carries
+// "completed": true when the test ran to an outcome that depends only on the
+// code (pass, wrong answer or error), and false when it was cut off by its
+// timeout.
+//
+// vm contexts are not a security boundary on their own, so the pools run a
+// single job per process and start it with Node's permission model and an
+// empty environment. Within the process, a context is built from a
+// null-prototype object so that no host object (and with it the host's
+// Function constructor and `process`) is reachable, its built-ins are frozen
+// before user code runs, microtasks are drained inside each evaluation's
+// timeout, and only strings are read back out of it.
+const vm = require('vm');
+const readline = require('readline');
+
+// Runs inside every new context, before the user code
+const PRELUDE = `
+(() => {
+  const noop = () => {};
+  const console = { log: noop, info: noop, warn: noop, error: noop, debug: noop };
+  Object.defineProperty(globalThis, 'console', { value: console, enumerable: false });
+
+  const seen = new Set();
+  const freeze = (value) => {
+    if ((typeof value !== 'object' && typeof value !== 'function') || value === null || seen.has(value)) {
+      return;
+    }
+    seen.add(value);
+    Object.freeze(value);
+    for (const key of Reflect.ownKeys(value)) {
+      const descriptor = Reflect.getOwnPropertyDescriptor(value, key);
+      freeze(descriptor.value);
+      freeze(descriptor.get);
+      freeze(descriptor.set);
+    }
+    freeze(Reflect.getPrototypeOf(value));
+  };
+  // Built-ins that are not reachable as globals
+  freeze([
+    function* () {}, async function () {}, async function* () {},
+    [][Symbol.iterator](), new Map().entries(), new Set().values(), ''[Symbol.iterator](),
+    ''.matchAll(/./g), new Uint8Array(0),
+  ]);
+  // Globals stay bound to the frozen built-ins; user code can still add its own
+  for (const name of Reflect.ownKeys(globalThis)) {
+    const descriptor = Reflect.getOwnPropertyDescriptor(globalThis, name);
+    if (name !== 'globalThis' && descriptor.configurable) {
+      freeze(descriptor.value);
+      Object.defineProperty(globalThis, name, { value: descriptor.value, writable: false, configurable: false });
+    }
+  }
+})();`;
+
+const prelude = new vm.Script(PRELUDE);
+
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function createContext(timeoutMs) {
+  const context = vm.createContext(Object.create(null), {
+    codeGeneration: { strings: true, wasm: false },
+    microtaskMode: 'afterEvaluate',
+  });
+  prelude.runInContext(context, { timeout: timeoutMs });
+  return context;
+}
+
+function testSource(test) {
+  // Serialised inside the context, so the result crosses back as one string
+  const input = test.input || '{}';
+  const expected = test.expectedOutput || 'null';
+  return `
+(() => {
+  const testInput = (${input});
+  const expectedOutput = (${expected});
+  let result;
+  if (typeof testInput === 'object' && testInput.props) {
+    result = eval('(' + testInput.code + ')');
+  } else {
+    result = eval(testInput);
+  }
+  return JSON.stringify({
+    passed: JSON.stringify(result) === JSON.stringify(expectedOutput),
+    input: testInput,
+    expected: expectedOutput,
+    actual: result === undefined ? null : result,
+  });
+})()`;
+}
+
+function evaluateTest(context, test, timeoutMs) {
+  try {
+    const output = new vm.Script(testSource(test)).runInContext(context, { timeout: timeoutMs });
+    if (typeof output !== 'string') {
+      return failure(test, 'Test result could not be serialised');
+    }
+    const result = JSON.parse(output);
+    result.description = test.description || '';
+    result.completed = true;
+    return result;
+  } catch (error) {
+    return failure(test, error);
+  }
+}
+
+function errorMessage(error) {
+  try {
+    return String(error && error.message ? error.message : error);
+  } catch (_) {
+    return 'Error';
+  }
+}
+
+function failure(test, error) {
+  const timedOut = Boolean(error && error.code === 'ERR_SCRIPT_EXECUTION_TIMEOUT');
+  return {
+    passed: false,
+    description: test.description || '',
+    error: timedOut ? 'Test timed out' : typeof error === 'string' ? error : errorMessage(error),
+    completed: !timedOut,
+  };
+}
+
+function loadUserCode(userScript, timeoutMs) {
+  // Returns [context, null] or [null, error]
+  try {
+    const context = createContext(timeoutMs);
+    userScript.runInContext(context, { timeout: timeoutMs });
+    return [context, null];
+  } catch (error) {
+    return [null, error];
+  }
+}
+
+function runJob(job) {
+  const tests = job.tests || [];
+  const timeoutMs = job.timeoutMs;
+  let userScript;
+  let loadError = null;
+  try {
+    userScript = new vm.Script(job.code || '', { filename: 'submission.js' });
+  } catch (error) {
+    loadError = error;
+  }
+
+  let shared = null;
+  if (!loadError && job.isolation !== 'per-test') {
+    [shared, loadError] = loadUserCode(userScript, timeoutMs);
+  }
+
+  tests.forEach((test, index) => {
+    const started = process.hrtime.bigint();
+    let result;
+    if (loadError) {
+      result = failure(test, loadError);
+    } else if (shared) {
+      result = evaluateTest(shared, test, timeoutMs);
+    } else {
+      const [context, error] = loadUserCode(userScript, timeoutMs);
+      result = context ? evaluateTest(context, test, timeoutMs) : failure(test, error);
+    }
+    result.durationMs = Number(process.hrtime.bigint() - started) / 1e6;
+    send({ id: job.id, type: 'result', index, result });
+  });
+}
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  let job;
+  try {
+    job = JSON.parse(line);
+  } catch (error) {
+    send({ id: null, type: 'error', error: 'Invalid job: ' + error.message });
+    return;
+  }
+  if (job.type === 'ping') {
+    send({ id: job.id, type: 'pong' });
+    return;
+  }
+  runJob(job);
+  send({ id: job.id, type: 'done' });
+});
@@ -0,0 +1,97 @@
+"""
+Per-user progress summary, maintained incrementally.
+
+Every progress write adds its delta to the user's ``UserProgressSummary``
+row in the same transaction, so the dashboard summary is a primary-key read
+instead of a scan over the user's progress rows. The lesson total is cached
+until lesson content changes.
+"""
+import threading
+
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.lesson import db, Lesson, UserProgress, UserProgressSummary
+from src.services.response_cache import content_version
+
+_lesson_count = (None, 0)  # (content version, count)
+_lesson_count_lock = threading.Lock()
+
+
+def lesson_count():
+    global _lesson_count
+    version = content_version('lesson')
+    cached_version, count = _lesson_count
+    if cached_version != version:
+        count = db.session.execute(db.select(db.func.count()).select_from(Lesson)).scalar()
+        with _lesson_count_lock:
+            _lesson_count = (version, count)
+    return count
+
+
+def apply_progress_delta(user_id, started=0, completed=0, progress=0):
+    """
+    Add deltas to the user's summary row; commits with the caller's session.
+    A user without a row yet (new, or restored data) gets it rebuilt from
+    their progress rows instead, which already include this write.
+    """
+    table = UserProgressSummary.__table__
+    updated = db.session.execute(table.update().where(table.c.user_id == user_id).values(
+        lessons_started=table.c.lessons_started + started,
+        completed_lessons=table.c.completed_lessons + completed,
+        total_progress=table.c.total_progress + progress
+    ))
+    if not updated.rowcount:
+        db.session.flush()
+        refresh_summary(user_id)
+
+
+def refresh_summary(user_id):
+    """Rebuild the user's summary row from their progress rows with one statement"""
+    table = UserProgressSummary.__table__
+    statement = insert(table).from_select(
+        ['user_id', 'lessons_started', 'completed_lessons', 'total_progress'],
+        db.select(
+            UserProgress.user_id,
+            db.func.count(),
+            db.func.coalesce(db.func.sum(db.cast(UserProgress.completed, db.Integer)), 0),
+            db.func.coalesce(db.func.sum(UserProgress.progress_percentage), 0)
+        ).where(UserProgress.user_id == user_id).group_by(UserProgress.user_id)
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={
+            'lessons_started': statement.excluded.lessons_started,
+            'completed_lessons': statement.excluded.completed_lessons,
+            'total_progress': statement.excluded.total_progress
+        }
+    ))
+
+
+def aggregate_progress_query(user_id):
+    return db.select(
+        db.func.count(),
+        db.func.coalesce(db.func.sum(db.cast(UserProgress.completed, db.Integer)), 0),
+        db.func.coalesce(db.func.sum(UserProgress.progress_percentage), 0)
+    ).where(UserProgress.user_id == user_id)
+
+
+def aggregate_progress(user_id):
+    """(lessons started, completed lessons, total progress) from progress rows in one query"""
+    row = db.session.execute(aggregate_progress_query(user_id)).one()
+    return tuple(row)
+
+
+def get_summary(user_id):
+    total_lessons = lesson_count()
+    summary = db.session.get(UserProgressSummary, user_id)
+    if summary is not None:
+        completed_lessons, total_progress = summary.completed_lessons, summary.total_progress
+    else:
+        # No materialized row yet (e.g. restored data): aggregate directly
+        _, completed_lessons, total_progress = aggregate_progress(user_id)
+    return {
+        'totalLessons': total_lessons,
+        'completedLessons': completed_lessons,
+        'averageProgress': total_progress / max(total_lessons, 1),
+        'completionRate': (completed_lessons / max(total_lessons, 1)) * 100
+    }
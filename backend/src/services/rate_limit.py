@@ -0,0 +1,188 @@
+"""
+Admission control for code submissions.
+
+Each submit draws a token from a bucket for its user and one for its
+client IP, and only when both have one: an empty bucket rejects the
+request with ``429`` and the time until a token is available, without
+spending the other bucket's token. The client IP is ``request.remote_addr``,
+which ``TRUSTED_PROXY_COUNT`` makes the address forwarded by that many
+reverse proxies. Buckets live in process memory by default, or in the
+``rate_limit_bucket`` table when several workers share one SQLite database.
+Per-user in-flight jobs and the global execution cap are enforced by the
+submission queue, which sheds load with ``503`` once its bounded wait queue
+is full. The checks run after request validation and the challenge lookup,
+so malformed or misdirected submissions spend no tokens, and before any
+other work on the request.
+"""
+from collections import Counter
+import math
+import threading
+import time
+
+from sqlalchemy.dialects.sqlite import insert
+
+from src.instrumentation import register_collector
+from src.models.rate_limit import db, RateLimitBucket
+
+IDLE_BUCKET_TTL = 3600  # seconds before an untouched, refilled bucket is dropped
+PRUNE_INTERVAL = 60  # seconds between sweeps of full buckets from the table
+
+
+class RateLimited(Exception):
+    """Raised when a request must be rejected; ``retry_after`` is in seconds"""
+
+    def __init__(self, reason, retry_after, status=429):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.status = status
+
+
+class MemoryTokenBuckets:
+    """Named kinds of token buckets (``{name: (rate, burst)}``) keyed by string, refilled lazily"""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._buckets = {}  # (name, key) -> [tokens, updated]
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def take(self, keys, now=None):
+        """
+        Take one token from each bucket in ``keys`` (``{name: key}``) if all of
+        them have one. Returns None if allowed, else the first empty bucket's
+        name and the seconds until it has a token.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._prune(now)
+            refilled = {}
+            for name, key in keys.items():
+                rate, burst = self.limits[name]
+                tokens, updated = self._buckets.get((name, key), (burst, now))
+                refilled[name, key] = min(burst, tokens + (now - updated) * rate)
+            for (name, key), tokens in refilled.items():
+                if tokens < 1:
+                    return name, (1 - tokens) / self.limits[name][0]
+            for bucket, tokens in refilled.items():
+                self._buckets[bucket] = [tokens - 1, now]
+            return None
+
+    def _prune(self, now):
+        if now - self._last_prune < IDLE_BUCKET_TTL:
+            return
+        self._last_prune = now
+        idle = [bucket for bucket, (_, updated) in self._buckets.items() if now - updated > IDLE_BUCKET_TTL]
+        for bucket in idle:
+            del self._buckets[bucket]
+
+
+class SQLiteTokenBuckets:
+    """
+    ``MemoryTokenBuckets`` in the application database. Each check is one
+    transaction that starts with a write, so it holds SQLite's write lock
+    from its first statement and concurrent workers never over-admit. A
+    missing row is a full bucket, so full ones are swept from the table.
+    """
+
+    def __init__(self, limits, prefix):
+        self.limits = limits
+        self.prefix = prefix
+        self._last_prune = time.time()
+
+    def _refill(self, connection, name, key, now):
+        rate, burst = self.limits[name]
+        table = RateLimitBucket.__table__
+        statement = insert(table).values(key=f'{self.prefix}-{name}:{key}', tokens=burst, updated=now)
+        return connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                'tokens': db.func.min(burst, table.c.tokens + (now - table.c.updated) * rate),
+                'updated': now,
+            }
+        ).returning(table.c.tokens)).scalar()
+
+    def take(self, keys, now=None):
+        now = time.time() if now is None else now
+        table = RateLimitBucket.__table__
+        with db.engine.begin() as connection:
+            refilled = {name: self._refill(connection, name, key, now) for name, key in keys.items()}
+            rejected = next(((name, tokens) for name, tokens in refilled.items() if tokens < 1), None)
+            if not rejected:
+                connection.execute(
+                    table.update()
+                    .where(table.c.key.in_([f'{self.prefix}-{name}:{key}' for name, key in keys.items()]))
+                    .values(tokens=table.c.tokens - 1)
+                )
+            self._prune(connection, now)
+        if rejected:
+            name, tokens = rejected
+            return name, (1 - tokens) / self.limits[name][0]
+        return None
+
+    def _prune(self, connection, now):
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        table = RateLimitBucket.__table__
+        for name, (rate, burst) in self.limits.items():
+            connection.execute(table.delete().where(
+                table.c.key.startswith(f'{self.prefix}-{name}:', autoescape=True),
+                table.c.tokens + (now - table.c.updated) * rate >= burst
+            ))
+
+
+_limiters = None
+_limiters_lock = threading.Lock()
+
+
+def get_limiters(config):
+    """Return the process-wide submission buckets (kinds ``ip`` and ``user``), creating them on first use"""
+    global _limiters
+    if _limiters is None:
+        with _limiters_lock:
+            if _limiters is None:
+                limits = {
+                    'ip': (config.get('SUBMIT_RATE_PER_IP', 2.0), config.get('SUBMIT_BURST_PER_IP', 20)),
+                    'user': (config.get('SUBMIT_RATE_PER_USER', 0.5), config.get('SUBMIT_BURST_PER_USER', 5)),
+                }
+                if config.get('RATE_LIMIT_BACKEND', 'memory') == 'sqlite':
+                    _limiters = SQLiteTokenBuckets(limits, 'submit')
+                else:
+                    _limiters = MemoryTokenBuckets(limits)
+    return _limiters
+
+
+def admit_submission(config, user_id, client_ip):
+    """Raise RateLimited unless both the user's and the IP's bucket have a token; only then take both"""
+    if not config.get('RATE_LIMIT_ENABLED', True):
+        return
+    rejected = get_limiters(config).take({'ip': client_ip or 'unknown', 'user': user_id or 'unknown'})
+    if rejected:
+        name, wait = rejected
+        record_rejection(f'{name}_rate')
+        raise RateLimited(f'Too many submissions from this {name}, slow down', wait)
+
+
+_rejections = Counter()
+_rejections_lock = threading.Lock()
+
+
+def record_rejection(reason):
+    with _rejections_lock:
+        _rejections[reason] += 1
+
+
+def _metrics():
+    with _rejections_lock:
+        counts = dict(_rejections)
+    lines = [
+        '# HELP submission_rejections_total Submissions rejected by admission control.',
+        '# TYPE submission_rejections_total counter',
+    ]
+    lines.extend(f'submission_rejections_total{{reason="{reason}"}} {count}'
+                 for reason, count in sorted(counts.items()))
+    return lines
+
+
+register_collector(_metrics)
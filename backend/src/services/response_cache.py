@@ -0,0 +1,153 @@
+"""
+Cache of pre-serialized responses for read-mostly content routes.
+
+Lessons and challenges only change through author writes, so GET responses
+for them are stored as bytes together with a strong ETag and reused until
+the version of the content they render changes. Versions are counters kept
+per kind (``ContentVersion``), bumped in the same transaction as any flush
+that inserted, updated or deleted a ``Lesson`` or ``Challenge`` and by bulk
+writers that bypass the ORM, so a challenge write leaves lesson responses
+alone and every worker process and the CLI share them. Each process keeps a
+copy of the counters, re-read at most every ``CONTENT_VERSION_TTL`` seconds
+and right after its own content commits: repeat reads cost no query and no
+JSON encoding, a write in another worker shows up within the TTL, and a
+matching ``If-None-Match`` gets a bodyless 304.
+"""
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import threading
+import time
+
+from flask import Response, current_app, request
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src.models.challenge import db, Challenge
+from src.models.content import ContentVersion
+from src.models.lesson import Lesson
+
+CONTENT_KINDS = {Lesson: 'lesson', Challenge: 'challenge'}
+
+_versions = (None, {})  # (monotonic time read, {kind: version})
+_versions_lock = threading.Lock()
+
+
+def content_version(*kinds):
+    """Versions of the given content kinds, from the process-local copy"""
+    global _versions
+    read_at, versions = _versions
+    now = time.monotonic()
+    if read_at is None or now - read_at >= current_app.config.get('CONTENT_VERSION_TTL', 1.0):
+        versions = dict(db.session.execute(db.select(ContentVersion.kind, ContentVersion.version)).all())
+        with _versions_lock:
+            _versions = (now, versions)
+    # Kinds never written have no row yet
+    return tuple(versions.get(kind, 0) for kind in kinds)
+
+
+def _forget_versions():
+    global _versions
+    with _versions_lock:
+        _versions = (None, {})
+
+
+def bump_content_version(session, kinds):
+    """Count a write to these content kinds; commits or rolls back with the session"""
+    table = ContentVersion.__table__
+    statement = insert(table).on_conflict_do_update(
+        index_elements=[table.c.kind],
+        set_={'version': table.c.version + 1}
+    )
+    session.connection().execute(statement, [{'kind': kind, 'version': 1} for kind in kinds])
+    session.info['content_written'] = True
+    _forget_versions()
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_content_write(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    kinds = {CONTENT_KINDS[type(instance)] for instance in changed if type(instance) in CONTENT_KINDS}
+    if kinds:
+        bump_content_version(session, sorted(kinds))
+
+
+@event.listens_for(Session, 'after_commit')
+def _reread_after_content_commit(session):
+    # A read between the flush and the commit may have cached the old versions
+    if session.info.pop('content_written', False):
+        _forget_versions()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_rolled_back_write(session):
+    session.info.pop('content_written', None)
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, body, etag, mimetype)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        entry = (version, body, '"%s"' % hashlib.sha1(body).hexdigest(), mimetype)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(config=None):
+    """Return the process-wide response cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(max_entries=(config or {}).get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    return _cache
+
+
+def _conditional(entry):
+    _, body, etag, mimetype = entry
+    response = Response(body, mimetype=mimetype)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def cached_content(*kinds):
+    """Serve a GET view from the response cache until content of these kinds changes"""
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache(current_app.config)
+            key = request.full_path
+            # Read the version before rendering so a concurrent write is never
+            # stored under the newer version
+            version = content_version(*kinds)
+
+            entry = cache.get(key, version)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = cache.put(key, version, response.get_data(), response.mimetype)
+            return _conditional(entry)
+        return wrapper
+    return decorate
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache of submission test results.
+
+Keys hash the challenge's tests, the isolation mode and the submitted code,
+so byte-identical resubmissions (including unchanged starter code) skip Node
+entirely. A bounded in-memory LRU sits in front of the
+``SubmissionResultCache`` table, and both tiers drop a challenge's entries
+when its tests change.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+
+from sqlalchemy import event
+
+from src.instrumentation import register_collector
+from src.models.challenge import db, Challenge, SubmissionResultCache
+
+
+def cache_key(challenge_id, tests_json, isolation, code):
+    digest = hashlib.sha256()
+    for part in (challenge_id, tests_json, isolation, code):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def is_cacheable(test_results):
+    """
+    Only results of tests that the worker ran to completion depend on the
+    code alone; timeouts and infrastructure failures (a worker that died or
+    never started) leave ``completed`` unset and are never cached.
+    """
+    return all(result.get('completed') for result in test_results)
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (challenge_id, test_results, duration_ms)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def get(self, key):
+        """Return cached test results for ``key`` or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_ms += entry[2]
+                return entry[1]
+
+        row = db.session.get(SubmissionResultCache, key)
+        # Rows written before results were marked are treated as misses
+        if row is None or not is_cacheable(row.test_results):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        test_results = row.test_results
+        with self._lock:
+            self.database_hits += 1
+            self.saved_ms += row.duration_ms
+            self._remember(key, (row.challenge_id, test_results, row.duration_ms))
+        return test_results
+
+    def put(self, key, challenge_id, test_results, duration_ms):
+        """Store results in both tiers; the row is committed with the caller's session"""
+        db.session.merge(SubmissionResultCache(
+            key=key,
+            challenge_id=challenge_id,
+            test_results=test_results,
+            duration_ms=duration_ms
+        ))
+        with self._lock:
+            self._remember(key, (challenge_id, test_results, duration_ms))
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget_challenge(self, challenge_id):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == challenge_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.database_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'memoryHits': self.memory_hits,
+                'databaseHits': self.database_hits,
+                'misses': self.misses,
+                'hitRate': hits / lookups if lookups else 0.0,
+                'savedExecutionMs': self.saved_ms
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache(config=None):
+    """Return the process-wide result cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(max_entries=(config or {}).get('RESULT_CACHE_MAX_ENTRIES', 1024))
+    return _cache
+
+
+def _metrics():
+    if _cache is None:
+        return []
+    stats = _cache.stats()
+    return [
+        '# HELP result_cache_hits_total Submissions answered from the result cache.',
+        '# TYPE result_cache_hits_total counter',
+        f'result_cache_hits_total{{tier="memory"}} {stats["memoryHits"]}',
+        f'result_cache_hits_total{{tier="database"}} {stats["databaseHits"]}',
+        '# HELP result_cache_misses_total Submissions that had to run in Node.',
+        '# TYPE result_cache_misses_total counter',
+        f'result_cache_misses_total {stats["misses"]}',
+        '# HELP result_cache_saved_seconds_total Node execution time saved by cache hits.',
+        '# TYPE result_cache_saved_seconds_total counter',
+        f'result_cache_saved_seconds_total {stats["savedExecutionMs"] / 1000:g}',
+    ]
+
+
+register_collector(_metrics)
+
+
+def invalidate_challenges(session, challenge_ids):
+    """Drop cached results of challenges written outside the ORM (bulk imports)"""
+    session.execute(
+        SubmissionResultCache.__table__.delete().where(
+            SubmissionResultCache.challenge_id.in_(challenge_ids)
+        )
+    )
+    if _cache is not None:
+        for challenge_id in challenge_ids:
+            _cache.forget_challenge(challenge_id)
+
+
+def _drop_challenge(connection, challenge_id):
+    connection.execute(
+        SubmissionResultCache.__table__.delete().where(
+            SubmissionResultCache.challenge_id == challenge_id
+        )
+    )
+    if _cache is not None:
+        _cache.forget_challenge(challenge_id)
+
+
+@event.listens_for(Challenge, 'after_update')
+def _invalidate_on_tests_change(mapper, connection, target):
+    if db.inspect(target).attrs.tests.history.has_changes():
+        _drop_challenge(connection, target.id)
+
+
+@event.listens_for(Challenge, 'before_delete')
+def _invalidate_on_delete(mapper, connection, target):
+    _drop_challenge(connection, target.id)
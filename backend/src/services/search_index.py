@@ -0,0 +1,201 @@
+"""
+Full-text search over lessons and challenges.
+
+Documents live in the SQLite FTS5 table ``content_search``: lesson titles,
+descriptions and HTML-stripped content, and challenge titles, descriptions
+and tags. Results are ranked with BM25 (titles weigh most), and the last
+query term matches as a prefix for type-ahead, served from FTS5 prefix
+indexes. ORM writes keep the index current through mapper events; bulk
+imports call ``index_items`` themselves.
+"""
+from html.parser import HTMLParser
+import re
+
+from sqlalchemy import event, text
+
+from src.models.challenge import db, Challenge
+from src.models.lesson import Lesson
+
+# BM25 column weights for (title, description, body)
+WEIGHTS = (10.0, 4.0, 1.0)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 10
+MIN_PREFIX = 2
+
+# Filtering on UNINDEXED columns scans the whole FTS table, so search_document
+# maps each item to the rowid of its FTS row and updates go straight to it
+CREATE_TABLES = (
+    '''
+    CREATE TABLE IF NOT EXISTS search_document (
+        id INTEGER PRIMARY KEY,
+        kind VARCHAR(20) NOT NULL,
+        item_id VARCHAR(50) NOT NULL,
+        UNIQUE (kind, item_id)
+    )
+    ''',
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS content_search USING fts5(
+        kind UNINDEXED, item_id UNINDEXED, title, description, body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    ''',
+)
+
+_terms = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchQueryError(ValueError):
+    """Raised for malformed search parameters (reported as 400)"""
+
+
+class _TextExtractor(HTMLParser):
+    SKIPPED = ('script', 'style')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def strip_html(html):
+    extractor = _TextExtractor()
+    extractor.feed(html or '')
+    extractor.close()
+    return ' '.join(' '.join(extractor.parts).split())
+
+
+def document(kind, values):
+    """FTS row for a lesson or challenge given its column values"""
+    if kind == 'lesson':
+        body = strip_html(values.get('content'))
+    else:
+        body = ' '.join(values.get('tags') or [])
+    return {
+        'kind': kind,
+        'item_id': values['id'],
+        'title': values.get('title') or '',
+        'description': values.get('description') or '',
+        'body': body,
+    }
+
+
+def index_items(connection, kind, rows):
+    """Replace the indexed documents of the given items (column value dicts)"""
+    if not rows:
+        return
+    keys = [{'kind': kind, 'item_id': row['id']} for row in rows]
+    connection.execute(
+        text('INSERT INTO search_document (kind, item_id) VALUES (:kind, :item_id) '
+             'ON CONFLICT (kind, item_id) DO NOTHING'),
+        keys
+    )
+    connection.execute(
+        text('DELETE FROM content_search WHERE rowid = '
+             '(SELECT id FROM search_document WHERE kind = :kind AND item_id = :item_id)'),
+        keys
+    )
+    connection.execute(
+        text('INSERT INTO content_search (rowid, kind, item_id, title, description, body) '
+             'SELECT id, :kind, :item_id, :title, :description, :body '
+             'FROM search_document WHERE kind = :kind AND item_id = :item_id'),
+        [document(kind, row) for row in rows]
+    )
+
+
+def unindex_item(connection, kind, item_id):
+    key = {'kind': kind, 'item_id': item_id}
+    connection.execute(
+        text('DELETE FROM content_search WHERE rowid = '
+             '(SELECT id FROM search_document WHERE kind = :kind AND item_id = :item_id)'),
+        key
+    )
+    connection.execute(text('DELETE FROM search_document WHERE kind = :kind AND item_id = :item_id'), key)
+
+
+def rebuild_index(connection):
+    """(Re)create the search table and index every lesson and challenge"""
+    for statement in CREATE_TABLES:
+        connection.execute(text(statement))
+    connection.execute(text('DELETE FROM content_search'))
+    connection.execute(text('DELETE FROM search_document'))
+    for kind, model, columns in (
+        ('lesson', Lesson, ('id', 'title', 'description', 'content')),
+        ('challenge', Challenge, ('id', 'title', 'description', 'tags')),
+    ):
+        table = model.__table__
+        result = connection.execution_options(yield_per=500).execute(
+            db.select(*(table.c[name] for name in columns))
+        )
+        for rows in result.mappings().partitions():
+            index_items(connection, kind, [dict(row) for row in rows])
+    connection.execute(text("INSERT INTO content_search (content_search) VALUES ('optimize')"))
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 expression: every term must match and the
+    last one matches as a prefix once it has ``MIN_PREFIX`` characters.
+    Terms are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    terms = _terms.findall(query)[:MAX_TERMS]
+    if not terms:
+        raise SearchQueryError('q must contain at least one word')
+    quoted = ['"%s"' % term for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(query, kinds=('lesson', 'challenge'), limit=DEFAULT_LIMIT):
+    statement = text(f'''
+        SELECT kind, item_id, title,
+               snippet(content_search, -1, '', '', '…', 16) AS snippet,
+               bm25(content_search, 0.0, 0.0, {WEIGHTS[0]}, {WEIGHTS[1]}, {WEIGHTS[2]}) AS score
+        FROM content_search
+        WHERE content_search MATCH :match AND kind IN ({', '.join(f':kind{n}' for n in range(len(kinds)))})
+        ORDER BY score
+        LIMIT :limit
+    ''')
+    params = {'match': match_expression(query), 'limit': limit}
+    params.update({f'kind{n}': kind for n, kind in enumerate(kinds)})
+    return [{
+        'type': row.kind,
+        'id': row.item_id,
+        'title': row.title,
+        'snippet': row.snippet,
+        # bm25() is lower-is-better; report higher-is-better
+        'score': round(-row.score, 4),
+    } for row in db.session.execute(statement, params)]
+
+
+def _values(model, target):
+    return {column.name: getattr(target, column.key) for column in model.__mapper__.columns}
+
+
+def _listen(model, kind):
+    @event.listens_for(model, 'after_insert')
+    @event.listens_for(model, 'after_update')
+    def _reindex(mapper, connection, target):
+        index_items(connection, kind, [_values(model, target)])
+
+    @event.listens_for(model, 'after_delete')
+    def _unindex(mapper, connection, target):
+        unindex_item(connection, kind, target.id)
+
+
+_listen(Lesson, 'lesson')
+_listen(Challenge, 'challenge')
@@ -0,0 +1,302 @@
+"""
+Bounded in-process queue for challenge submissions.
+
+The submit route only enqueues a job and returns its id; a fixed set of
+executor threads runs the tests on the Node worker pool and writes the
+``ChallengeSubmission`` row once all results are in. Job state lives in
+memory, so no external broker is needed. Under the ASGI server the same
+interface is provided by ``AsyncSubmissionQueue``, whose executors are
+coroutines on the server's event loop.
+"""
+from collections import Counter
+import asyncio
+import json
+import queue
+import threading
+import time
+import uuid
+
+
+KEEP_ALIVE_SECONDS = 15
+
+
+def sse_message(event, payload):
+    return f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+
+
+class QueueFull(Exception):
+    """Raised when the pending-job limit has been reached"""
+
+    def __init__(self, retry_after=1.0):
+        super().__init__('Submission queue is full')
+        self.retry_after = retry_after
+
+
+class UserBusy(Exception):
+    """Raised when a user already has the maximum number of unfinished jobs"""
+
+    def __init__(self, retry_after=1.0):
+        super().__init__('Too many unfinished submissions for this user')
+        self.retry_after = retry_after
+
+
+class SubmissionJob:
+    """State of one queued submission, observable while it runs"""
+
+    def __init__(self, challenge_id, user_id, code):
+        self.id = uuid.uuid4().hex
+        self.challenge_id = challenge_id
+        self.user_id = user_id
+        self.code = code
+        self.status = 'queued'
+        self.total_tests = None
+        self.test_results = []
+        self.submission_id = None
+        self.passed = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # (event, payload) pairs in the order they happened, for streaming
+        self.events = [('status', {'status': 'queued'})]
+        self._changed = threading.Condition()
+        self._async_waiters = []  # (loop, future) pairs of coroutines awaiting events
+
+    def _emit(self, event, payload):
+        with self._changed:
+            self.events.append((event, payload))
+            self._changed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def start(self, total_tests):
+        self.status = 'running'
+        self.total_tests = total_tests
+        self._emit('status', {'status': 'running', 'totalTests': total_tests})
+
+    def add_result(self, index, result):
+        self.test_results.append(result)
+        self._emit('result', {'index': index, 'result': result})
+
+    def complete(self, submission_id, passed, test_results):
+        self.submission_id = submission_id
+        self.passed = passed
+        self.test_results = test_results
+        self.status = 'completed'
+        self.finished_at = time.time()
+        self._emit('done', self.to_dict())
+
+    def fail(self, error):
+        self.error = error
+        self.status = 'failed'
+        self.finished_at = time.time()
+        self._emit('done', self.to_dict())
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def wait_for_events(self, cursor, timeout):
+        """Return events after ``cursor``, blocking up to ``timeout`` seconds for new ones"""
+        with self._changed:
+            if cursor >= len(self.events) and not self.finished:
+                self._changed.wait(timeout)
+            return self.events[cursor:]
+
+    async def wait_for_events_async(self, cursor, timeout):
+        """``wait_for_events`` for coroutines: suspends instead of blocking the thread"""
+        with self._changed:
+            if cursor < len(self.events) or self.finished:
+                return self.events[cursor:]
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._async_waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._changed:
+            return self.events[cursor:]
+
+    def to_dict(self):
+        data = {
+            'jobId': self.id,
+            'challengeId': self.challenge_id,
+            'userId': self.user_id,
+            'status': self.status,
+            'totalTests': self.total_tests,
+            'testResults': list(self.test_results)
+        }
+        if self.status == 'completed':
+            data['submissionId'] = self.submission_id
+            data['passed'] = self.passed
+            data['message'] = 'All tests passed! Great job!' if self.passed else 'Some tests failed. Keep trying!'
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SubmissionQueue:
+    """
+    Fixed pool of executor threads fed by a bounded FIFO queue. The thread
+    count caps concurrent test executions, and each user may have at most
+    ``max_per_user`` jobs queued or running.
+    """
+
+    def __init__(self, app, handler, workers=4, max_pending=100, job_ttl=600, max_per_user=2):
+        self.app = app
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.max_per_user = max_per_user
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._unfinished = Counter()  # user id -> jobs queued or running
+        self._average_seconds = 1.0  # moving average of job duration, for Retry-After
+        self._start_workers()
+
+    def _start_workers(self):
+        self._pending = queue.Queue(maxsize=self.max_pending)
+        for index in range(self.workers):
+            threading.Thread(
+                target=self._work,
+                name=f'submission-executor-{index}',
+                daemon=True
+            ).start()
+
+    def submit(self, challenge_id, user_id, code):
+        """Enqueue a submission, raising ``UserBusy`` or ``QueueFull`` when saturated"""
+        self._purge_expired()
+        job = SubmissionJob(challenge_id, user_id, code)
+        with self._jobs_lock:
+            if self._unfinished[user_id] >= self.max_per_user:
+                raise UserBusy(self._average_seconds)
+            self._enqueue(job)
+            self._unfinished[user_id] += 1
+            self._jobs[job.id] = job
+        return job
+
+    def _enqueue(self, job):
+        try:
+            self._pending.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(self.estimated_wait())
+
+    def _backlog(self):
+        return self._pending.qsize()
+
+    def estimated_wait(self):
+        """Seconds until a newly queued job would start, from the average job duration"""
+        return (self._backlog() / max(self.workers, 1) + 1) * self._average_seconds
+
+    def get(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.job_ttl
+        with self._jobs_lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            started = time.monotonic()
+            try:
+                with self.app.app_context():
+                    self.handler(job)
+            except Exception as e:
+                job.fail(str(e))
+            finally:
+                self._job_finished(job, started)
+                self._pending.task_done()
+
+    def _job_finished(self, job, started):
+        with self._jobs_lock:
+            self._unfinished[job.user_id] -= 1
+            if not self._unfinished[job.user_id]:
+                del self._unfinished[job.user_id]
+            self._average_seconds = 0.9 * self._average_seconds + 0.1 * (time.monotonic() - started)
+
+
+class AsyncSubmissionQueue(SubmissionQueue):
+    """
+    ``SubmissionQueue`` whose executors are coroutines on an event loop, so
+    a job waiting on its Node worker holds no thread. ``handler`` is a
+    coroutine function. Create it on the loop; ``submit`` and ``get`` may be
+    called from any thread.
+    """
+
+    def __init__(self, app, handler, workers=4, max_pending=100, job_ttl=600, max_per_user=2):
+        self.loop = asyncio.get_running_loop()
+        self._queued = 0
+        super().__init__(app, handler, workers, max_pending, job_ttl, max_per_user)
+
+    def _start_workers(self):
+        self._pending = asyncio.Queue()
+        self._tasks = [self.loop.create_task(self._work()) for _ in range(self.workers)]
+
+    def _enqueue(self, job):
+        # Called with the jobs lock held, possibly from a request thread
+        if self._queued >= self.max_pending:
+            raise QueueFull(self.estimated_wait())
+        self._queued += 1
+        self.loop.call_soon_threadsafe(self._pending.put_nowait, job)
+
+    def _backlog(self):
+        return self._queued
+
+    async def _work(self):
+        while True:
+            job = await self._pending.get()
+            with self._jobs_lock:
+                self._queued -= 1
+            started = time.monotonic()
+            try:
+                with self.app.app_context():
+                    await self.handler(job)
+            except Exception as e:
+                job.fail(str(e))
+            finally:
+                self._job_finished(job, started)
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_submission_queue(app, handler):
+    """Return the process-wide submission queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SubmissionQueue(
+                    app,
+                    handler,
+                    workers=app.config.get('SUBMISSION_QUEUE_WORKERS', 4),
+                    max_pending=app.config.get('SUBMISSION_QUEUE_MAX_PENDING', 100),
+                    job_ttl=app.config.get('SUBMISSION_JOB_TTL', 600),
+                    max_per_user=app.config.get('SUBMISSION_MAX_PER_USER', 2)
+                )
+    return _queue
+
+
+def install_submission_queue(submission_queue):
+    """Make ``submission_queue`` the process-wide queue (the ASGI server installs its async one)"""
+    global _queue
+    with _queue_lock:
+        _queue = submission_queue
@@ -0,0 +1,87 @@
+"""
+Maintenance of the deduplicated submission blob store.
+
+``compact`` drops blobs no submission references any more, optionally
+re-encodes every blob with the current encoding (after changing it), and
+vacuums the database so the freed pages go back to the filesystem.
+``storage_report`` summarizes how much the deduplication and compression
+are saving.
+"""
+from sqlalchemy import bindparam, text
+
+from src.models.blob import SubmissionBlob, decode_payload, encode_payload
+
+REENCODE_BATCH = 500
+
+
+def storage_report(connection):
+    submissions = connection.execute(text('SELECT COUNT(*) FROM challenge_submission')).scalar()
+    blobs, raw_bytes, stored_bytes = connection.execute(text(
+        'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length(data)), 0) FROM submission_blob'
+    )).one()
+    # Bytes the submissions would take if every row stored its own payloads
+    logical_bytes = connection.execute(text('''
+        SELECT COALESCE(SUM(code.size + results.size), 0)
+        FROM challenge_submission s
+        JOIN submission_blob code ON code.hash = s.code_hash
+        JOIN submission_blob results ON results.hash = s.results_hash
+    ''')).scalar()
+    page_size = connection.execute(text('PRAGMA page_size')).scalar()
+    return {
+        'submissions': submissions,
+        'blobs': blobs,
+        'logicalBytes': logical_bytes,
+        'uniqueBytes': raw_bytes,
+        'storedBytes': stored_bytes,
+        'databaseBytes': connection.execute(text('PRAGMA page_count')).scalar() * page_size,
+        'freeBytes': connection.execute(text('PRAGMA freelist_count')).scalar() * page_size,
+    }
+
+
+def _drop_orphans(connection):
+    return connection.execute(text('''
+        DELETE FROM submission_blob WHERE hash NOT IN (
+            SELECT code_hash FROM challenge_submission
+            UNION SELECT results_hash FROM challenge_submission
+        )
+    ''')).rowcount
+
+
+def _reencode(connection):
+    """Rewrite blobs whose stored encoding differs from what encode_payload picks now"""
+    table = SubmissionBlob.__table__
+    rewritten = 0
+    last_hash = ''
+    while True:
+        rows = connection.execute(
+            table.select().where(table.c.hash > last_hash).order_by(table.c.hash).limit(REENCODE_BATCH)
+        ).all()
+        if not rows:
+            return rewritten
+        updates = []
+        for row in rows:
+            encoding, data = encode_payload(decode_payload(row.encoding, row.data))
+            if encoding != row.encoding or len(data) < len(row.data):
+                updates.append({'key': row.hash, 'new_encoding': encoding, 'new_data': data})
+        if updates:
+            connection.execute(
+                table.update().where(table.c.hash == bindparam('key')).values(
+                    encoding=bindparam('new_encoding'), data=bindparam('new_data')
+                ),
+                updates
+            )
+            rewritten += len(updates)
+        last_hash = rows[-1].hash
+
+
+def compact(engine, reencode=False):
+    """Garbage-collect (and optionally re-encode) blobs, then VACUUM; returns before/after reports"""
+    with engine.begin() as connection:
+        before = storage_report(connection)
+        orphans = _drop_orphans(connection)
+        reencoded = _reencode(connection) if reencode else 0
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text('VACUUM'))
+        after = storage_report(connection)
+    return {'orphansDropped': orphans, 'reencoded': reencoded, 'before': before, 'after': after}
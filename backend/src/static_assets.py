@@ -0,0 +1,109 @@
+"""
+In-memory, precompressed serving of the built SPA in ``static/``.
+
+The folder is read once at startup into a manifest holding each file's
+bytes, a gzip variant (and a brotli variant when the optional ``brotli``
+package is installed) and strong ETags, so requests never touch the
+filesystem. Vite's content-hashed assets are cached for a year as
+immutable; everything else, including ``index.html``, must revalidate.
+Hashed files are the ones listed in Vite's build manifest; a build without
+one falls back to Vite's default ``assets/<name>-<hash>.<ext>`` naming.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# build.manifest in vite.config: Vite 5+ writes .vite/manifest.json, earlier versions manifest.json
+VITE_MANIFESTS = ('.vite/manifest.json', 'manifest.json')
+# Without a manifest: assets/index-BfRr4v6Q.js, an 8-character base64url hash in the assets dir
+HASHED_NAME = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'application/xml', 'application/manifest+json', 'image/x-icon',
+                      'image/vnd.microsoft.icon')
+MIN_COMPRESS_SIZE = 512
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class StaticAsset:
+    def __init__(self, path, body, hashed=False):
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.cache_control = IMMUTABLE if hashed else REVALIDATE
+        etag = hashlib.sha1(body).hexdigest()
+        # encoding -> (body, etag); each representation needs its own strong ETag
+        self.variants = {'identity': (body, etag)}
+
+        if len(body) >= MIN_COMPRESS_SIZE and self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants['gzip'] = (compressed, f'{etag}-gzip')
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants['br'] = (compressed, f'{etag}-br')
+
+    def choose_encoding(self, accept_encoding):
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encoding[encoding]:
+                return encoding
+        return 'identity'
+
+
+def vite_hashed_files(folder):
+    """Paths of the content-hashed files listed in Vite's build manifest, or None without one"""
+    for name in VITE_MANIFESTS:
+        manifest_path = os.path.join(folder, name)
+        if not os.path.isfile(manifest_path):
+            continue
+        with open(manifest_path, 'rb') as f:
+            chunks = json.load(f)
+        hashed = set()
+        for chunk in chunks.values():
+            hashed.add(chunk['file'])
+            hashed.update(chunk.get('css', ()))
+            hashed.update(chunk.get('assets', ()))
+        return hashed
+    return None
+
+
+class StaticManifest:
+    def __init__(self, folder):
+        self.assets = {}
+        if folder is None or not os.path.isdir(folder):
+            return
+        hashed = vite_hashed_files(folder)
+        for root, _, files in os.walk(folder):
+            for name in files:
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, folder).replace(os.sep, '/')
+                is_hashed = path in hashed if hashed is not None else bool(HASHED_NAME.match(path))
+                with open(full_path, 'rb') as f:
+                    self.assets[path] = StaticAsset(path, f.read(), is_hashed)
+
+    def response(self, path):
+        """Serve ``path``, falling back to index.html for client-side routes"""
+        asset = self.assets.get(path) or self.assets.get('index.html')
+        if asset is None:
+            return Response('index.html not found', status=404)
+
+        encoding = asset.choose_encoding(request.accept_encodings)
+        body, etag = asset.variants[encoding]
+        response = Response(body, mimetype=asset.mimetype)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset.cache_control
+        if len(asset.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        return response.make_conditional(request)
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import create_app
+from src.migrations import migrate
+from src.services import (
+    async_node_pool, dashboard, lesson_graph, node_pool, progress_summary, rate_limit, response_cache,
+    result_cache, submission_queue
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_singletons(monkeypatch):
+    """Process-wide pools, caches and limiters start empty in every test"""
+    for module, name, value in (
+        (node_pool, '_pool', None),
+        (async_node_pool, '_pool', None),
+        (rate_limit, '_limiters', None),
+        (response_cache, '_cache', None),
+        (response_cache, '_versions', (None, {})),
+        (result_cache, '_cache', None),
+        (submission_queue, '_queue', None),
+        (dashboard, '_catalog', (None, None)),
+        (lesson_graph, '_graph', (None, None)),
+        (progress_summary, '_lesson_count', (None, 0)),
+    ):
+        monkeypatch.setattr(module, name, value)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build an app on its own database file; the schema is not created"""
+    def build(**config):
+        return create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            **config
+        })
+    return build
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    migrate(app)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
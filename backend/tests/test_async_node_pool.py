@@ -0,0 +1,49 @@
+import asyncio
+import shutil
+
+import pytest
+
+from src.services.async_node_pool import AsyncNodeWorker, AsyncNodeWorkerPool
+from tests.test_node_pool import ADD, check
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+
+def test_async_pool():
+    async def main():
+        pool = AsyncNodeWorkerPool(size=2, test_timeout=1.0)
+        try:
+            passed = await pool.run(ADD, [check('add(1, 2)', '3'), check('typeof process', '"undefined"')])
+            timed_out = await pool.run('while (true) {}', [check('1', '1')])
+            assert pool._live <= pool.size
+            return passed, timed_out
+        finally:
+            await pool.shutdown()
+
+    passed, timed_out = asyncio.run(main())
+    assert [result['passed'] for result in passed] == [True, True]
+    assert timed_out[0]['error'] == 'Test timed out'
+    assert timed_out[0]['completed'] is False
+
+
+def test_async_workers_run_a_single_job(monkeypatch):
+    used = []
+    run = AsyncNodeWorker.run
+
+    async def record(worker, *args, **kwargs):
+        used.append(worker)
+        return await run(worker, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncNodeWorker, 'run', record)
+
+    async def main():
+        pool = AsyncNodeWorkerPool(size=1, test_timeout=1.0)
+        try:
+            for _ in range(2):
+                await pool.run(ADD, [check('add(1, 2)', '3')])
+        finally:
+            await pool.shutdown()
+
+    asyncio.run(main())
+    assert len({id(worker) for worker in used}) == 2
+    assert not any(worker.is_alive() for worker in used)
@@ -0,0 +1,22 @@
+import json
+
+from src.content_io import import_ndjson
+from src.models.lesson import db, Lesson
+
+
+def lesson_line(**fields):
+    return json.dumps({
+        'type': 'lesson', 'id': 'intro', 'title': 'Intro', 'description': '', 'content': '<p>text</p>',
+        'duration': 5, 'difficulty': 'beginner', 'orderIndex': 0, **fields
+    })
+
+
+def test_reimport_keeps_the_stored_created_at(app):
+    with app.app_context():
+        import_ndjson([lesson_line(createdAt='2024-01-01T00:00:00')])
+        result = import_ndjson([lesson_line(title='Intro, revised', createdAt='2025-06-01T00:00:00')])
+        assert result['lessons'] == 1 and result['errorCount'] == 0
+        db.session.expire_all()
+        lesson = db.session.get(Lesson, 'intro')
+        assert lesson.title == 'Intro, revised'
+        assert lesson.created_at.isoformat() == '2024-01-01T00:00:00'
@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+
+
+def test_failed_statements_do_not_skew_later_timings(app):
+    with app.app_context(), db.engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+        context = connection.execute(text('SELECT 1')).context
+        assert context.metrics_query_started is not None
+        assert 'query_started' not in connection.info
+
+
+def test_request_counts_its_statements(client):
+    response = client.get('/api/users/ada/progress')
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers['Server-Timing']
+    assert 'desc="1 queries"' in response.headers['Server-Timing']
@@ -0,0 +1,30 @@
+from src.models.lesson import db, Lesson
+
+
+def lesson(lesson_id, prerequisites=(), order_index=0):
+    return {
+        'id': lesson_id, 'title': lesson_id, 'description': '', 'content': '<p>text</p>', 'duration': 5,
+        'difficulty': 'beginner', 'prerequisites': list(prerequisites), 'orderIndex': order_index
+    }
+
+
+def test_create_lesson_ignores_unrelated_legacy_cycles(app, client):
+    with app.app_context():
+        # Rows that predate the cycle checks
+        for lesson_id, prerequisite in (('old-a', 'old-b'), ('old-b', 'old-a')):
+            db.session.add(Lesson(
+                id=lesson_id, title=lesson_id, description='', content='', duration=5,
+                difficulty='beginner', prerequisites=[prerequisite], order_index=0
+            ))
+        db.session.commit()
+
+    assert client.post('/api/lessons', json=lesson('intro')).status_code == 201
+    assert client.post('/api/lessons', json=lesson('hooks', ['intro', 'old-a'], 1)).status_code == 201
+
+
+def test_create_lesson_rejects_a_cycle_through_it(client):
+    assert client.post('/api/lessons', json=lesson('intro', ['hooks'])).status_code == 201
+    assert client.post('/api/lessons', json=lesson('hooks', ['state'], 1)).status_code == 201
+    response = client.post('/api/lessons', json=lesson('state', ['intro'], 2))
+    assert response.status_code == 400
+    assert response.get_json()['cycle'] == ['state', 'intro', 'hooks', 'state']
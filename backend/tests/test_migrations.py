@@ -0,0 +1,214 @@
+import pytest
+from sqlalchemy import text
+
+from src.migrations import MIGRATIONS, current_version, migrate
+from src.models.blob import decode_payload
+from src.models.user import db
+
+LATEST = MIGRATIONS[-1][0]
+
+# The tables as the first release created them, before any migration
+LEGACY_SCHEMA = (
+    '''CREATE TABLE lesson (
+        id VARCHAR(50) PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT NOT NULL,
+        content TEXT NOT NULL, duration INTEGER NOT NULL, difficulty VARCHAR(20) NOT NULL,
+        prerequisites TEXT NOT NULL, order_index INTEGER NOT NULL, created_at DATETIME)''',
+    '''CREATE TABLE challenge (
+        id VARCHAR(50) PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT NOT NULL,
+        starter_code TEXT NOT NULL, solution TEXT NOT NULL, tests TEXT NOT NULL, hints TEXT NOT NULL,
+        difficulty VARCHAR(20) NOT NULL, tags TEXT NOT NULL, created_at DATETIME)''',
+    '''CREATE TABLE user_progress (
+        id INTEGER PRIMARY KEY, user_id VARCHAR(50) NOT NULL, lesson_id VARCHAR(50) NOT NULL,
+        completed BOOLEAN, progress_percentage INTEGER, completed_at DATETIME)''',
+    '''CREATE TABLE challenge_submission (
+        id INTEGER PRIMARY KEY, challenge_id VARCHAR(50) NOT NULL, user_id VARCHAR(50) NOT NULL,
+        code TEXT NOT NULL, passed BOOLEAN NOT NULL, test_results TEXT NOT NULL, submitted_at DATETIME)''',
+)
+
+LEGACY_ROWS = (
+    '''INSERT INTO lesson VALUES
+        ('intro', 'Intro', 'First', '<h2>Setup</h2><p>one two</p><h2>Next steps</h2><p>three</p>',
+         10, 'beginner', '', 1, '2024-01-01 00:00:00'),
+        ('hooks', 'Hooks', 'Second', '<p>useState</p>', 20, 'beginner', '[ "intro" ]', 2, '2024-01-01 00:00:00')''',
+    '''INSERT INTO challenge VALUES
+        ('sum', 'Sum', 'Add', 'function add() {}', 'function add(a, b) { return a + b; }',
+         '[ {"input": "1", "expectedOutput": "1", "description": "one"},
+            {"input": "2", "expectedOutput": "2", "description": "two"} ]',
+         'not json', 'easy', '["math"]', '2024-01-01 00:00:00')''',
+    '''INSERT INTO user_progress (user_id, lesson_id, completed, progress_percentage, completed_at) VALUES
+        ('ada', 'intro', 0, 40, NULL),
+        ('ada', 'intro', 1, 100, '2024-01-03 00:00:00'),
+        ('ada', 'hooks', 0, 20, NULL),
+        ('bob', 'intro', 0, 10, NULL)''',
+    '''INSERT INTO challenge_submission (challenge_id, user_id, code, passed, test_results, submitted_at) VALUES
+        ('sum', 'ada', 'return 1', 0, '[{"passed": true}, {"passed": false}]', '2024-01-02 00:00:00'),
+        ('sum', 'ada', 'return 2', 1, '[{"passed": true}, {"passed": true}]', '2024-01-03 00:00:00'),
+        ('sum', 'bob', 'return 1', 0, '[{"passed": true}, {"passed": false}]', '2024-01-04 00:00:00')''',
+)
+
+
+def legacy_app(make_app):
+    app = make_app()
+    with app.app_context(), db.engine.begin() as connection:
+        for statement in LEGACY_SCHEMA + LEGACY_ROWS:
+            connection.execute(text(statement))
+    return app
+
+
+def test_fresh_database_applies_every_migration(make_app):
+    app = make_app()
+    assert migrate(app) == [version for version, _ in MIGRATIONS]
+    assert migrate(app) == []
+    with app.app_context(), db.engine.connect() as connection:
+        assert current_version(connection) == LATEST
+
+
+def test_legacy_database_is_upgraded(make_app):
+    app = legacy_app(make_app)
+    with app.app_context():
+        assert migrate(app) == [version for version, _ in MIGRATIONS]
+
+        with db.engine.connect() as connection:
+            def query(sql):
+                return connection.execute(text(sql)).all()
+
+            # 1: JSON columns are valid and minified
+            assert query("SELECT prerequisites FROM lesson ORDER BY id") == [('["intro"]',), ('[]',)]
+            assert query("SELECT hints, tags FROM challenge") == [('[]', '["math"]')]
+
+            # 2: duplicate progress rows are merged into the oldest one, then indexed
+            assert query(
+                "SELECT id, user_id, lesson_id, completed, progress_percentage FROM user_progress ORDER BY id"
+            ) == [(1, 'ada', 'intro', 1, 100), (3, 'ada', 'hooks', 0, 20), (4, 'bob', 'intro', 0, 10)]
+            indexes = {row[1] for row in query("PRAGMA index_list(user_progress)")}
+            assert {'uq_user_progress_user_lesson', 'ix_user_progress_user_completed'} <= indexes
+
+            # 3: summaries are backfilled from the merged rows
+            assert query(
+                "SELECT user_id, lessons_started, completed_lessons, total_progress "
+                "FROM user_progress_summary ORDER BY user_id"
+            ) == [('ada', 2, 1, 120), ('bob', 1, 0, 10)]
+
+            # 4: existing content is searchable
+            assert query("SELECT COUNT(*) FROM content_search WHERE content_search MATCH 'useState'") == [(1,)]
+
+            # 5: submission bodies move to deduplicated blobs
+            columns = {row[1] for row in query("PRAGMA table_info(challenge_submission)")}
+            assert 'code' not in columns and 'test_results' not in columns
+            assert query("SELECT COUNT(DISTINCT code_hash), COUNT(DISTINCT results_hash) "
+                         "FROM challenge_submission") == [(2, 2)]
+            encoding, data = query(
+                "SELECT encoding, data FROM submission_blob "
+                "JOIN challenge_submission ON hash = code_hash WHERE challenge_submission.id = 2"
+            )[0]
+            assert decode_payload(encoding, data) == b'return 2'
+            assert 'challenge_submission_legacy' not in {row[0] for row in query(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )}
+
+            # 6: test counts are stored on each row
+            assert query("SELECT passed_tests, total_tests FROM challenge_submission ORDER BY id") == [
+                (1, 2), (2, 2), (1, 2)
+            ]
+
+            # 7: lessons are split into sections keyed by anchor
+            assert query("SELECT anchor, position FROM lesson_section WHERE lesson_id = 'intro' "
+                         "ORDER BY position") == [('setup', 0), ('next-steps', 1)]
+
+            # 8: the dashboard's per-user index exists
+            indexes = {row[1] for row in query("PRAGMA index_list(challenge_submission)")}
+            assert {'ix_challenge_submission_challenge_user_submitted',
+                    'ix_challenge_submission_user_challenge'} <= indexes
+
+            # 9: analytics are rebuilt from the history
+            assert query("SELECT attempts, passes, users_attempted, users_passed "
+                         "FROM challenge_stats WHERE challenge_id = 'sum'") == [(3, 1, 2, 1)]
+            assert query("SELECT test_index, runs, failures FROM challenge_test_stats ORDER BY test_index") == [
+                (0, 3, 0), (1, 3, 2)
+            ]
+
+            assert current_version(connection) == LATEST
+
+    assert migrate(app) == []
+
+
+def test_migrations_resume_from_stored_version(make_app):
+    app = make_app()
+    migrate(app)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('PRAGMA user_version = 7'))
+        assert migrate(app) == [version for version, _ in MIGRATIONS if version >= 8]
+
+
+def test_failed_migration_leaves_the_schema_unchanged(make_app, monkeypatch):
+    app = make_app()
+    migrate(app)
+
+    def half_done(connection):
+        connection.execute(text('CREATE TABLE half_done (id INTEGER PRIMARY KEY)'))
+        connection.execute(text('ALTER TABLE lesson ADD COLUMN half_done INTEGER'))
+        connection.execute(text('INSERT INTO half_done VALUES (1)'))
+        raise RuntimeError('interrupted')
+
+    monkeypatch.setattr('src.migrations.MIGRATIONS', MIGRATIONS + [(LATEST + 1, half_done)])
+    with pytest.raises(RuntimeError):
+        migrate(app)
+    with app.app_context(), db.engine.connect() as connection:
+        assert current_version(connection) == LATEST
+        tables = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+        assert 'half_done' not in tables
+        assert 'half_done' not in {row[1] for row in connection.execute(text('PRAGMA table_info(lesson)'))}
+
+
+def test_interrupted_blob_migration_keeps_submissions(make_app, monkeypatch):
+    from src.models import blob
+
+    app = legacy_app(make_app)
+    calls = []
+    store_blobs = blob.store_blobs
+
+    def failing_store_blobs(connection, payloads):
+        calls.append(len(payloads))
+        if len(calls) == 3:
+            raise RuntimeError('disk full')
+        return store_blobs(connection, payloads)
+
+    monkeypatch.setattr('src.migrations.SUBMISSION_BATCH', 1)
+    monkeypatch.setattr(blob, 'store_blobs', failing_store_blobs)
+    with pytest.raises(RuntimeError):
+        migrate(app)
+    with app.app_context(), db.engine.connect() as connection:
+        assert current_version(connection) == 4
+        assert connection.execute(text('SELECT id, code FROM challenge_submission ORDER BY id')).all() == [
+            (1, 'return 1'), (2, 'return 2'), (3, 'return 1')
+        ]
+        assert connection.execute(text('SELECT COUNT(*) FROM submission_blob')).scalar() == 0
+
+    monkeypatch.setattr(blob, 'store_blobs', store_blobs)
+    assert migrate(app) == [version for version, _ in MIGRATIONS if version >= 5]
+    with app.app_context(), db.engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM challenge_submission')).scalar() == 3
+
+
+def test_blob_migration_resumes_from_legacy_table(make_app, monkeypatch):
+    from src.models.challenge import ChallengeSubmission
+
+    app = legacy_app(make_app)
+    # Stop before 5, then leave the state a non-transactional run used to leave
+    monkeypatch.setattr('src.migrations.MIGRATIONS', [item for item in MIGRATIONS if item[0] < 5])
+    migrate(app)
+    monkeypatch.setattr('src.migrations.MIGRATIONS', MIGRATIONS)
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_challenge_submission_challenge_user_submitted'))
+        connection.execute(text('ALTER TABLE challenge_submission RENAME TO challenge_submission_legacy'))
+        ChallengeSubmission.__table__.create(connection)
+
+    assert migrate(app) == [version for version, _ in MIGRATIONS if version >= 5]
+    with app.app_context(), db.engine.connect() as connection:
+        assert connection.execute(text(
+            'SELECT id, user_id, passed_tests, total_tests FROM challenge_submission ORDER BY id'
+        )).all() == [(1, 'ada', 1, 2), (2, 'ada', 2, 2), (3, 'bob', 1, 2)]
+        assert connection.execute(text(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'challenge_submission_legacy'"
+        )).scalar() == 0
@@ -0,0 +1,92 @@
+import json
+import shutil
+
+import pytest
+
+from src.services.node_pool import NodeWorker, NodeWorkerPool
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+ADD = 'function add(a, b) { return a + b; }'
+
+
+def check(expression, expected, description=''):
+    """A challenge test whose input evaluates ``expression`` in the submission's context"""
+    return {'input': json.dumps(expression), 'expectedOutput': expected, 'description': description}
+
+
+@pytest.fixture
+def pool():
+    pool = NodeWorkerPool(size=2, test_timeout=1.0)
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_tests_in_order(pool):
+    results = pool.run(ADD, [check('add(1, 2)', '3', 'adds'), check('add(2, 2)', '5', 'wrong')])
+    assert [result['passed'] for result in results] == [True, False]
+    assert [result['description'] for result in results] == ['adds', 'wrong']
+    assert all(result['completed'] for result in results)
+
+
+def test_reports_errors_as_completed_failures(pool):
+    results = pool.run('function add(', [check('add(1, 2)', '3')])
+    assert results[0]['passed'] is False
+    assert results[0]['completed'] is True
+    assert results[0]['error']
+
+
+@pytest.mark.parametrize('isolation', ['shared', 'per-test'])
+def test_host_is_unreachable(pool, isolation):
+    escapes = [
+        check('typeof process', '"undefined"'),
+        check('typeof require', '"undefined"'),
+        check("Function('return typeof process')()", '"undefined"'),
+        check('(() => { try { return typeof this.constructor.constructor("return process")(); }'
+              ' catch (e) { return "blocked"; } })()', '"blocked"'),
+    ]
+    results = pool.run('', escapes, isolation=isolation)
+    assert [result['passed'] for result in results] == [True] * len(escapes), results
+
+
+def test_user_code_cannot_tamper_with_builtins(pool):
+    code = 'Array.prototype.map = function () { return "tampered"; }; JSON.stringify = () => "true";'
+    results = pool.run(code, [check('[1, 2].map(x => x * 2)', '[2, 4]')])
+    assert results[0]['passed'] is True
+
+
+@pytest.mark.parametrize('code', [
+    'while (true) {}',
+    'Promise.resolve().then(function loop() { return Promise.resolve().then(loop); });',
+])
+def test_runaway_code_times_out(pool, code):
+    results = pool.run(code, [check('1', '1')])
+    assert results[0]['passed'] is False
+    assert results[0]['error'] == 'Test timed out'
+    assert results[0]['completed'] is False
+
+
+def test_workers_run_a_single_job(pool, monkeypatch):
+    used = []
+    run = NodeWorker.run
+
+    def record(worker, *args, **kwargs):
+        used.append(worker)
+        return run(worker, *args, **kwargs)
+
+    monkeypatch.setattr(NodeWorker, 'run', record)
+    for _ in range(3):
+        assert pool.run(ADD, [check('add(1, 2)', '3')])[0]['passed']
+    assert len({id(worker) for worker in used}) == 3
+    assert not any(worker.is_alive() for worker in used)
+    assert pool._spawned <= pool.size
+
+
+def test_ping():
+    worker = NodeWorker()
+    try:
+        assert worker.ping()
+        worker.kill()
+        assert not worker.ping()
+    finally:
+        worker.kill()
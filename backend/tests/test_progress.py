@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.models.lesson import db, Lesson, UserProgress, UserProgressSummary
+
+
+@pytest.fixture
+def lessons(app):
+    with app.app_context():
+        for index, lesson_id in enumerate(('intro', 'hooks', 'state')):
+            db.session.add(Lesson(
+                id=lesson_id, title=lesson_id, description='', content='<p>text</p>', duration=5,
+                difficulty='beginner', prerequisites=[], order_index=index
+            ))
+        db.session.commit()
+
+
+def summary(app, user_id):
+    with app.app_context():
+        row = db.session.get(UserProgressSummary, user_id)
+        return row and (row.lessons_started, row.completed_lessons, row.total_progress)
+
+
+def test_first_write_without_summary_row_rebuilds_it(app, client, lessons):
+    with app.app_context():
+        # Restored progress rows that never went through the summary
+        db.session.add(UserProgress(user_id='ada', lesson_id='intro', completed=True, progress_percentage=100))
+        db.session.commit()
+
+    response = client.post('/api/lessons/hooks/progress', json={'userId': 'ada', 'progressPercentage': 30})
+    assert response.status_code == 200
+    assert summary(app, 'ada') == (2, 1, 130)
+
+    client.post('/api/lessons/state/progress', json={'userId': 'ada', 'progressPercentage': 10})
+    assert summary(app, 'ada') == (3, 1, 140)
+
+
+def test_concurrent_first_writes_share_one_row(app, lessons):
+    def post(user_id):
+        response = app.test_client().post('/api/lessons/intro/progress', json={
+            'userId': user_id, 'progressPercentage': 50
+        })
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(post, ['ada'] * 8))
+    assert statuses == [200] * 8
+    with app.app_context():
+        assert UserProgress.query.filter_by(user_id='ada').count() == 1
+    assert summary(app, 'ada') == (1, 0, 50)
+
+
+@pytest.mark.parametrize('path', ['/api/lessons/intro/progress', '/api/lessons/progress'])
+def test_single_writes_never_go_backwards(app, client, lessons, path):
+    first = client.post(path, json={
+        'userId': 'ada', 'lessonId': 'intro', 'progressPercentage': 100, 'completed': True
+    }).get_json()
+    second = client.post(path, json={
+        'userId': 'ada', 'lessonId': 'intro', 'progressPercentage': 40, 'completed': False
+    }).get_json()
+    assert second['completed'] is True
+    assert second['progressPercentage'] == 100
+    assert second['completedAt'] == first['completedAt']
+    assert summary(app, 'ada') == (1, 1, 100)
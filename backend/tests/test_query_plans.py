@@ -0,0 +1,27 @@
+from src.models.user import db
+from src.query_plans import check_query_plans, hot_queries, plan_problems
+
+
+def test_hot_queries_search_indexes(app):
+    with app.app_context():
+        results = check_query_plans(db.engine)
+    assert set(results) == set(hot_queries())
+    for name, (plan, problems) in results.items():
+        assert plan, name
+        assert problems == [], f'{name}: {plan}'
+
+
+def test_submission_history_joins_blobs_by_key(app):
+    with app.app_context():
+        plan, _ = check_query_plans(db.engine)['submission history']
+    blob_steps = [step for step in plan if 'submission_blob' in step]
+    assert len(blob_steps) == 2
+    assert all(step.startswith('SEARCH ') for step in blob_steps)
+
+
+def test_plan_problems_flags_scans_of_hot_tables():
+    assert plan_problems(['SCAN user_progress']) == ['SCAN user_progress']
+    assert plan_problems(['SCAN challenge_submission USING COVERING INDEX ix_x'])
+    assert plan_problems(['SEARCH challenge_submission USING INDEX ix_x (id=?)', 'SCAN submission_blob_2'])
+    assert plan_problems(['USE TEMP B-TREE FOR ORDER BY'])
+    assert plan_problems(['SCAN lesson', 'SEARCH user_progress USING INDEX ix_x (user_id=?)']) == []
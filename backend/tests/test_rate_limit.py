@@ -0,0 +1,115 @@
+import pytest
+
+from src.migrations import migrate
+from src.models.challenge import db, Challenge
+from src.models.rate_limit import RateLimitBucket
+from src.services import rate_limit
+from src.services.rate_limit import MemoryTokenBuckets, RateLimited, SQLiteTokenBuckets, admit_submission
+from src.services.submission_queue import SubmissionQueue, install_submission_queue
+
+LIMITS = {'ip': (1.0, 2), 'user': (0.5, 1)}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def buckets(request, app):
+    if request.param == 'memory':
+        yield MemoryTokenBuckets(LIMITS)
+    else:
+        with app.app_context():
+            yield SQLiteTokenBuckets(LIMITS, 'test')
+
+
+def test_takes_both_tokens_or_neither(buckets):
+    assert buckets.take({'ip': '10.0.0.1', 'user': 'ada'}, now=1000) is None
+    # The user bucket is empty; the IP bucket keeps its remaining token
+    assert buckets.take({'ip': '10.0.0.1', 'user': 'ada'}, now=1000) == ('user', 2.0)
+    assert buckets.take({'ip': '10.0.0.1', 'user': 'bob'}, now=1000) is None
+    name, wait = buckets.take({'ip': '10.0.0.1', 'user': 'cy'}, now=1000)
+    assert (name, wait) == ('ip', 1.0)
+    # Tokens refill at the bucket's rate
+    assert buckets.take({'ip': '10.0.0.1', 'user': 'ada'}, now=1002) is None
+
+
+def test_sqlite_buckets_prune_full_rows(app, monkeypatch):
+    with app.app_context():
+        buckets = SQLiteTokenBuckets(LIMITS, 'test')
+        buckets.take({'ip': '10.0.0.1', 'user': 'ada'}, now=1000)
+        assert db.session.query(RateLimitBucket).count() == 2
+
+        # Both buckets are full again long before the next sweep
+        monkeypatch.setattr(buckets, '_last_prune', 1000 - rate_limit.PRUNE_INTERVAL)
+        buckets.take({'ip': '10.0.0.2', 'user': 'bob'}, now=1010)
+        assert sorted(row.key for row in db.session.query(RateLimitBucket)) == [
+            'test-ip:10.0.0.2', 'test-user:bob'
+        ]
+
+
+def test_admit_submission_raises_with_retry_after(app):
+    config = dict(app.config, SUBMIT_BURST_PER_USER=1, SUBMIT_RATE_PER_USER=0.1)
+    admit_submission(config, 'ada', '10.0.0.1')
+    with pytest.raises(RateLimited) as limited:
+        admit_submission(config, 'ada', '10.0.0.1')
+    assert limited.value.status == 429
+    assert limited.value.retry_after >= 9
+
+
+@pytest.fixture
+def submit_client(make_app):
+    """Test client for an app built with ``config``; submissions are queued but never run"""
+    def build(**config):
+        app = make_app(**config)
+        migrate(app)
+        with app.app_context():
+            db.session.add(Challenge(
+                id='sum', title='Sum', description='Add', starter_code='', solution='',
+                tests=[], hints=[], difficulty='easy', tags=[]
+            ))
+            db.session.commit()
+        install_submission_queue(SubmissionQueue(app, lambda job: None, workers=0, max_per_user=10))
+        return app.test_client()
+    return build
+
+
+@pytest.mark.parametrize('body, error', [
+    (['code'], 'Request body must be a JSON object'),
+    ({'userId': 'ada'}, 'code must be a non-empty string'),
+    ({'code': '   ', 'userId': 'ada'}, 'code must be a non-empty string'),
+    ({'code': 'x' * 101, 'userId': 'ada'}, 'code must be at most 100 bytes'),
+    ({'code': 'return 1', 'userId': ''}, 'userId must be a non-empty string'),
+    ({'code': 'return 1', 'userId': 7}, 'userId must be a non-empty string'),
+])
+def test_submit_rejects_invalid_requests_without_taking_tokens(submit_client, body, error):
+    client = submit_client(SUBMISSION_MAX_CODE_BYTES=100, SUBMIT_BURST_PER_USER=1, SUBMIT_BURST_PER_IP=1)
+    response = client.post('/api/challenges/sum/submit', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    response = client.post('/api/challenges/sum/submit', json={'code': 'return 1', 'userId': 'ada'})
+    assert response.status_code == 202
+
+
+def test_submit_is_rate_limited_per_user(submit_client):
+    client = submit_client(SUBMIT_BURST_PER_USER=1, SUBMIT_RATE_PER_USER=0.1)
+    assert client.post('/api/challenges/sum/submit', json={'code': 'a', 'userId': 'ada'}).status_code == 202
+    response = client.post('/api/challenges/sum/submit', json={'code': 'a', 'userId': 'ada'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 9
+    assert client.post('/api/challenges/sum/submit', json={'code': 'a', 'userId': 'bob'}).status_code == 202
+
+
+@pytest.mark.parametrize('proxies, second_status', [(0, 429), (1, 202)])
+def test_ip_buckets_use_the_forwarded_address_behind_trusted_proxies(submit_client, proxies, second_status):
+    client = submit_client(TRUSTED_PROXY_COUNT=proxies, SUBMIT_BURST_PER_IP=1, SUBMIT_RATE_PER_IP=0.1)
+    statuses = [
+        client.post('/api/challenges/sum/submit', json={'code': 'a', 'userId': user},
+                    headers={'X-Forwarded-For': address}).status_code
+        for user, address in (('ada', '203.0.113.1'), ('bob', '203.0.113.2'))
+    ]
+    assert statuses == [202, second_status]
+
+
+def test_submit_to_unknown_challenge_is_404_without_taking_tokens(submit_client):
+    client = submit_client(SUBMIT_BURST_PER_USER=1, SUBMIT_BURST_PER_IP=1)
+    response = client.post('/api/challenges/missing/submit', json={'code': 'a', 'userId': 'ada'})
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Challenge not found'
+    assert client.post('/api/challenges/sum/submit', json={'code': 'a', 'userId': 'ada'}).status_code == 202
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import event, text
+
+from src.migrations import migrate
+from src.models.challenge import db, Challenge
+from src.models.lesson import Lesson
+from src.services.response_cache import content_version
+
+
+def add_lesson(lesson_id, index=0):
+    db.session.add(Lesson(
+        id=lesson_id, title=lesson_id, description='', content='<p>text</p>', duration=5,
+        difficulty='beginner', prerequisites=[], order_index=index
+    ))
+    db.session.commit()
+
+
+@pytest.fixture
+def cached_app(make_app):
+    """App whose workers re-read content versions only once a minute"""
+    app = make_app(CONTENT_VERSION_TTL=60)
+    migrate(app)
+    with app.app_context():
+        add_lesson('intro')
+    return app
+
+
+def lesson_ids(client):
+    return [lesson['id'] for lesson in client.get('/api/lessons').get_json()]
+
+
+def test_cached_reads_run_no_queries(cached_app):
+    client = cached_app.test_client()
+    first = client.get('/api/lessons')
+    statements = []
+    with cached_app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    second = client.get('/api/lessons')
+    assert second.get_data() == first.get_data()
+    assert statements == []
+    assert client.get('/api/lessons', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_versions_are_kept_per_kind(cached_app):
+    client = cached_app.test_client()
+    etag = client.get('/api/lessons').headers['ETag']
+    with cached_app.app_context():
+        lesson_version = content_version('lesson')
+        db.session.add(Challenge(
+            id='sum', title='Sum', description='Add', starter_code='', solution='',
+            tests=[], hints=[], difficulty='easy', tags=[]
+        ))
+        db.session.commit()
+        assert content_version('lesson') == lesson_version
+        assert content_version('challenge') == (1,)
+    response = client.get('/api/lessons', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_local_writes_are_seen_at_once(cached_app):
+    client = cached_app.test_client()
+    assert lesson_ids(client) == ['intro']
+    with cached_app.app_context():
+        add_lesson('hooks', 1)
+    assert lesson_ids(client) == ['intro', 'hooks']
+
+
+@pytest.mark.parametrize('ttl, expected', [(60, ['intro']), (0, ['intro', 'hooks'])])
+def test_other_workers_writes_are_seen_after_the_ttl(cached_app, ttl, expected):
+    client = cached_app.test_client()
+    assert lesson_ids(client) == ['intro']
+    cached_app.config['CONTENT_VERSION_TTL'] = ttl
+    with cached_app.app_context(), db.engine.begin() as connection:
+        # What another process's write leaves behind
+        connection.execute(text(
+            "INSERT INTO lesson (id, title, description, content, duration, difficulty, prerequisites, "
+            "order_index) VALUES ('hooks', 'hooks', '', '', 5, 'beginner', '[]', 1)"
+        ))
+        connection.execute(text("UPDATE content_version SET version = version + 1 WHERE kind = 'lesson'"))
+    assert lesson_ids(client) == expected
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from src.services.submission_queue import QueueFull, SubmissionQueue, UserBusy
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the queue'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def release():
+    """Jobs of ``blocking_handler`` run until this is set"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocking_handler(release, started):
+    def handler(job):
+        started.release()
+        assert release.wait(5)
+        job.complete(1, True, [])
+    return handler
+
+
+def test_caps_jobs_per_user_and_pending_jobs(app, release):
+    started = threading.Semaphore(0)
+    submissions = SubmissionQueue(app, blocking_handler(release, started), workers=1, max_pending=1, max_per_user=1)
+    running = submissions.submit('sum', 'ada', 'code')
+    assert started.acquire(timeout=5)
+
+    with pytest.raises(UserBusy) as busy:
+        submissions.submit('sum', 'ada', 'code')
+    assert busy.value.retry_after > 0
+
+    queued = submissions.submit('sum', 'bob', 'code')
+    with pytest.raises(QueueFull) as full:
+        submissions.submit('sum', 'cy', 'code')
+    assert full.value.retry_after > 0
+
+    release.set()
+    wait_until(lambda: running.finished and queued.finished)
+    assert submissions.get(running.id).status == 'completed'
+    # Finished jobs no longer count against their user
+    wait_until(lambda: not submissions._unfinished)
+    assert submissions.submit('sum', 'ada', 'code').status == 'queued'
+
+
+def test_handler_errors_fail_the_job(app):
+    def handler(job):
+        raise RuntimeError('no worker')
+
+    submissions = SubmissionQueue(app, handler, workers=1, max_per_user=1)
+    job = submissions.submit('sum', 'ada', 'code')
+    wait_until(lambda: job.finished)
+    assert job.to_dict()['error'] == 'no worker'
+    wait_until(lambda: not submissions._unfinished)
+    assert submissions.submit('sum', 'ada', 'code')
@@ -12,6 +12,28 @@ export interface Lesson {
   createdAt: string;
 }
 
+export interface LessonTocEntry {
+  index: number;
+  anchor: string;
+  title: string;
+  level: number;
+  wordCount: number;
+  readingMinutes: number;
+}
+
+export interface LessonToc {
+  lessonId: string;
+  title: string;
+  sections: LessonTocEntry[];
+  wordCount: number;
+  readingMinutes: number;
+}
+
+export interface LessonSection extends LessonTocEntry {
+  lessonId: string;
+  html: string;
+}
+
 export interface Challenge {
   id: string;
   title: string;
@@ -39,6 +61,7 @@ export interface TestResult {
   expected?: any;
   actual?: any;
   error?: string;
+  durationMs?: number;
 }
 
 export interface SubmissionResult {
@@ -48,6 +71,60 @@ export interface SubmissionResult {
   message: string;
 }
 
+export interface SubmissionJob {
+  jobId: string;
+  challengeId: string;
+  userId: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  totalTests: number | null;
+  testResults: TestResult[];
+  submissionId?: number;
+  passed?: boolean;
+  message?: string;
+  error?: string;
+}
+
+export interface SubmissionSummary {
+  id: number;
+  passed: boolean;
+  passedTests: number;
+  totalTests: number;
+  submittedAt: string;
+}
+
+export interface ChallengeStats {
+  challengeId: string;
+  attempts: number;
+  passes: number;
+  passRate: number;
+  usersAttempted: number;
+  usersPassed: number;
+  userPassRate: number;
+  averageSecondsToFirstPass: number | null;
+  averageAttemptsToFirstPass: number | null;
+  lastSubmittedAt: string | null;
+}
+
+export interface UserChallengeStats {
+  userId: string;
+  challengeId: string;
+  attempts: number;
+  passes: number;
+  firstAttemptAt: string | null;
+  firstPassAt: string | null;
+  secondsToFirstPass: number | null;
+  attemptsToFirstPass: number | null;
+  lastSubmittedAt: string | null;
+}
+
+export interface ChallengeTestStats {
+  index: number;
+  description: string;
+  runs: number;
+  failures: number;
+  failureRate: number;
+}
+
 export interface UserProgress {
   id: number;
   userId: string;
@@ -92,6 +169,14 @@ class ApiService {
     return this.request<Lesson>(`/lessons/${lessonId}`);
   }
 
+  async getLessonToc(lessonId: string): Promise<LessonToc> {
+    return this.request<LessonToc>(`/lessons/${lessonId}/toc`);
+  }
+
+  async getLessonSection(lessonId: string, anchor: string): Promise<LessonSection> {
+    return this.request<LessonSection>(`/lessons/${lessonId}/sections/${anchor}`);
+  }
+
   async updateLessonProgress(data: {
     lessonId: string;
     userId: string;
@@ -104,6 +189,18 @@ class ApiService {
     });
   }
 
+  // Report many progress updates in one request; progress never decreases
+  async updateLessonProgressBatch(userId: string, updates: {
+    lessonId: string;
+    progressPercentage: number;
+    completed?: boolean;
+  }[]): Promise<UserProgress[]> {
+    return this.request<UserProgress[]>(`/users/${userId}/progress/batch`, {
+      method: 'POST',
+      body: JSON.stringify({ updates }),
+    });
+  }
+
   async getUserProgress(userId: string): Promise<UserProgress[]> {
     return this.request<UserProgress[]>(`/users/${userId}/progress`);
   }
@@ -117,6 +214,44 @@ class ApiService {
     return this.request(`/users/${userId}/progress/summary`);
   }
 
+  async getUnlockedLessons(userId: string): Promise<{
+    completed: string[];
+    unlocked: string[];
+    locked: { id: string; missing: string[]; remaining: number }[];
+    next: string | null;
+  }> {
+    return this.request(`/users/${userId}/lessons/unlocked`);
+  }
+
+  async search(query: string, options: { type?: 'lesson' | 'challenge'; limit?: number } = {}): Promise<{
+    query: string;
+    results: { type: 'lesson' | 'challenge'; id: string; title: string; snippet: string; score: number }[];
+  }> {
+    const params = new URLSearchParams({ q: query });
+    if (options.type) params.set('type', options.type);
+    if (options.limit) params.set('limit', String(options.limit));
+    return this.request(`/search?${params}`);
+  }
+
+  // Everything the dashboard needs for first paint, in one request
+  async getDashboard(userId: string): Promise<{
+    userId: string;
+    lessons: Pick<Lesson, 'id' | 'title' | 'difficulty' | 'duration' | 'orderIndex'>[];
+    challenges: Pick<Challenge, 'id' | 'title' | 'difficulty' | 'tags'>[];
+    progress: Record<string, Pick<UserProgress, 'completed' | 'progressPercentage' | 'completedAt'>>;
+    summary: {
+      totalLessons: number;
+      completedLessons: number;
+      averageProgress: number;
+      completionRate: number;
+    };
+    unlockedLessons: string[];
+    nextLesson: string | null;
+    challengeStatus: Record<string, { attempts: number; passed: boolean; lastSubmittedAt: string | null }>;
+  }> {
+    return this.request(`/users/${userId}/bootstrap`);
+  }
+
   // Challenge endpoints
   async getChallenges(): Promise<Challenge[]> {
     return this.request<Challenge[]>('/challenges');
@@ -130,16 +265,68 @@ class ApiService {
     code: string;
     userId: string;
   }): Promise<SubmissionResult> {
-    return this.request<SubmissionResult>(`/challenges/${challengeId}/submit`, {
+    // Submissions are queued; poll the job until its tests have finished
+    const { jobId } = await this.request<{ jobId: string }>(`/challenges/${challengeId}/submit`, {
       method: 'POST',
       body: JSON.stringify(data),
     });
+
+    let job = await this.getSubmissionJob(jobId);
+    while (job.status === 'queued' || job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, 250));
+      job = await this.getSubmissionJob(jobId);
+    }
+
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Submission failed');
+    }
+
+    return {
+      submissionId: job.submissionId as number,
+      passed: Boolean(job.passed),
+      testResults: job.testResults,
+      message: job.message || '',
+    };
+  }
+
+  async getSubmissionJob(jobId: string): Promise<SubmissionJob> {
+    return this.request<SubmissionJob>(`/submission-jobs/${jobId}`);
   }
 
   async getChallengeSubmissions(challengeId: string, userId: string): Promise<any[]> {
     return this.request<any[]>(`/challenges/${challengeId}/submissions?userId=${userId}`);
   }
 
+  async getSubmissionHistory(challengeId: string, userId: string, options: { cursor?: string; limit?: number } = {}): Promise<{
+    items: SubmissionSummary[];
+    nextCursor: string | null;
+  }> {
+    const params = new URLSearchParams({ userId, view: 'summary', limit: String(options.limit ?? 20) });
+    if (options.cursor) params.set('cursor', options.cursor);
+    return this.request(`/challenges/${challengeId}/submissions?${params}`);
+  }
+
+  async getSubmission(submissionId: number): Promise<SubmissionSummary & {
+    challengeId: string;
+    userId: string;
+    code: string;
+    testResults: TestResult[];
+  }> {
+    return this.request(`/submissions/${submissionId}`);
+  }
+
+  async getChallengeAnalytics(challengeId: string, userId?: string): Promise<ChallengeStats & {
+    tests: ChallengeTestStats[];
+    user?: UserChallengeStats | null;
+  }> {
+    const query = userId ? `?userId=${encodeURIComponent(userId)}` : '';
+    return this.request(`/challenges/${challengeId}/analytics${query}`);
+  }
+
+  async getChallengeAnalyticsOverview(): Promise<(ChallengeStats & { title: string; difficulty: string })[]> {
+    return this.request('/analytics/challenges');
+  }
+
   // Create new lesson (admin function)
   async createLesson(lesson: Omit<Lesson, 'createdAt'>): Promise<Lesson> {
     return this.request<Lesson>('/lessons', {
@@ -4,4 +4,8 @@ import react from '@vitejs/plugin-react'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
+  build: {
+    // The backend reads it to tell content-hashed files apart (static_assets.py)
+    manifest: true,
+  },
 })